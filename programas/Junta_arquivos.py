@@ -3,12 +3,16 @@
 GLDAS -> DataFrames com MultiIndex (context/coords/data)
 - Autentica via .env (earthaccess)
 - Abre via OPeNDAP (testa endpoints) ou baixa autenticado (fallback)
+  (OPeNDAP com restrição: só VARS e o hiperslab do BBOX/ponto — gldas_otf.py)
+- Ou, com GLDAS_CUBE=<caminho .zarr>, lê do cubo consolidado (gldas_cube.py) sem rede
+- Ou, com GLDAS_TILES=<pasta>, lê só os tiles 5°×5° que cobrem BBOX + ponto (gldas_cube.py ingest-tiles)
 - Gera CSVs: ponto, média de área, grade recorte e multi-variáveis
 - Corrigido: latitude ascendente, dtype numérico, resample numeric_only
 - Inclui CSV extra: chuva diária acumulada (a partir de Rainf_tavg)
 """
 
 import os
+import re
 import sys
 from pathlib import Path
 from datetime import datetime, timezone
@@ -19,6 +23,9 @@ import xarray as xr
 from dotenv import load_dotenv
 import earthaccess as ea
 
+from gldas_otf import Regiao, restricao_opendap
+from gldas_store import celula_borda
+
 # =========================
 # ====== CONFIG GERAL =====
 # =========================
@@ -43,6 +50,9 @@ VARS = [
     "SWdown_f_tavg"     # radiação de onda curta incidente (W m-2)
 ]
 
+# cubo/tiles (gldas_cube.CUBE_VARS) só guardam as variáveis do diário → equivalente de cada VAR
+VARS_DO_CUBO = {"Rainf_tavg": "Rainf_f_tavg"}   # chuva: taxa total de precipitação (forçante)
+
 # Ponto (ex.: São Paulo)
 POINT = {"name": "SaoPaulo", "lat": -23.55, "lon": -46.63}
 
@@ -78,24 +88,59 @@ def login_via_env():
 
 
 def probe_dds(session, url):
-    """Verifica se o endpoint OPeNDAP responde ao .dds (metadados)."""
+    """Verifica se o endpoint OPeNDAP responde ao .dds (metadados); devolve o texto do DDS ou None."""
     import requests
     dds = url + ".dds" if not url.endswith(".dds") else url
     try:
         r = session.get(dds, timeout=20)
         r.raise_for_status()
-        return True
+        return r.text or " "
     except Exception:
-        return False
+        return None
+
+
+def regiao_de_interesse(margem=0.25):
+    """BBOX + ponto (com 1 célula de folga) → região pedida ao servidor."""
+    return Regiao(
+        BBOX["name"],
+        min(BBOX["lat_min"], POINT["lat"]) - margem, min(BBOX["lon_min"], POINT["lon"]) - margem,
+        max(BBOX["lat_max"], POINT["lat"]) + margem, max(BBOX["lon_max"], POINT["lon"]) + margem,
+    )
+
+
+def com_vars_do_cubo(ds):
+    """Cubo/tiles: expõe cada VAR ausente pelo nome de VARS a partir do equivalente guardado."""
+    for v, equivalente in VARS_DO_CUBO.items():
+        if v in VARS and v not in ds.data_vars and equivalente in ds.data_vars:
+            ds[v] = ds[equivalente]
+            print(f"[Cubo] {v} ← {equivalente}")
+    return ds
+
+
+def abrir_tiles_da_consulta(raiz):
+    """Tiles que cobrem BBOX + ponto (None se algum ainda não foi ingerido)."""
+    from gldas_cube import abrir_tiles, caminho_tile, tiles_de
+    r = regiao_de_interesse(margem=0.0)
+    tiles = tiles_de((r.s, r.n, r.w, r.e))
+    faltam = [t.nome for t in tiles if not caminho_tile(raiz, t).exists()]
+    if faltam:
+        print(f"[Tiles] faltam {', '.join(faltam)} em {raiz}")
+        return None
+    return com_vars_do_cubo(abrir_tiles(raiz, tiles))
 
 
 def open_dataset_streaming(session):
-    """Tenta abrir via OPeNDAP (pydap). Testa https e dap4+https."""
-    for url in OPENDAP_CANDIDATES:
-        if not probe_dds(session, url):
-            print(f"[OPeNDAP] .dds não disponível: {url}")
+    """Tenta abrir via OPeNDAP (pydap), pedindo só VARS no recorte. Testa https e dap4+https."""
+    regiao = regiao_de_interesse()
+    for base in OPENDAP_CANDIDATES:
+        dds = probe_dds(session, base)
+        if not dds:
+            print(f"[OPeNDAP] .dds não disponível: {base}")
             continue
 
+        # variável inexistente na restrição derruba o pedido inteiro → só as que o DDS lista
+        vars_ = [v for v in VARS if re.search(rf"\b{re.escape(v)}\b", dds)] or VARS
+        url = f"{base}?{restricao_opendap(vars_, regiao, celula_borda)}"
         try:
             ds = xr.open_dataset(url, engine="pydap", backend_kwargs={"session": session})
             print(f"[OPeNDAP] SUCESSO em: {url}")
@@ -104,7 +149,7 @@ def open_dataset_streaming(session):
             print(f"[OPeNDAP] Falhou abrir (https): {url} -> {type(e1).__name__}: {e1}")
 
         # tenta dap4
-        dap4_url = url.replace("https://", "dap4+https://")
+        dap4_url = f"{base.replace('https://', 'dap4+https://')}?{restricao_opendap(vars_, regiao, celula_borda, dap4=True)}"
         try:
             ds = xr.open_dataset(dap4_url, engine="pydap", backend_kwargs={"session": session})
             print(f"[OPeNDAP] SUCESSO em (DAP4): {dap4_url}")
@@ -339,10 +384,22 @@ def df_multi_area_mean(ds, vars_, bbox):
 # =========================
 
 def main():
-    session = login_via_env()
+    load_dotenv()
+    cube = os.getenv("GLDAS_CUBE", "").strip()   # cubo Zarr (gldas_cube.py ingest)
+    tiles = os.getenv("GLDAS_TILES", "").strip()  # pasta dos tiles (gldas_cube.py ingest-tiles)
+    ds = abrir_tiles_da_consulta(Path(tiles)) if tiles else None
+    if ds is not None:
+        used_url = tiles
+        print(f"[Tiles] SUCESSO ao abrir: {used_url}")
+    elif cube and Path(cube).exists():
+        from gldas_cube import abrir_cubo
+        ds, used_url = com_vars_do_cubo(abrir_cubo(Path(cube))), cube
+        print(f"[Cubo] SUCESSO ao abrir: {used_url}")
+    else:
+        session = login_via_env()
+        # tenta streaming
+        ds, used_url = open_dataset_streaming(session)
 
-    # tenta streaming
-    ds, used_url = open_dataset_streaming(session)
     if ds is None:
         print("[INFO] OPeNDAP indisponível. Usando fallback local (download).")
         ds, used_url = download_and_open()
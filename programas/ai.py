@@ -1,23 +1,81 @@
 from __future__ import annotations
-import os, shlex, subprocess, json, re
-from typing import Dict, Any, Optional
+import json, re
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, Any, List, Optional
 from .config import OLLAMA_ENABLE, OLLAMA_MODEL, OLLAMA_HOST, MENTION_PET
+from .ollama_client import cliente_ollama, OLLAMA_TIMEOUT, OLLAMA_NUM_PREDICT
+from .forecast_cache import CacheTTL
+from .llm_cache import LLM_CACHE_ENABLE, LLM_CACHE_TTL, LLM_CACHE_SIZE, LLM_CACHE_DB, chave_contexto
+from .singleflight import SingleFlight
+from .llm_batch import (LLM_BATCH_ENABLE, LLM_BATCH_MODE, LLM_BATCH_CONCURRENCY,
+                        AgrupadorLLM, demultiplexar)
 
-def _ollama_run(model: str, prompt: str, host: str = OLLAMA_HOST, timeout: int = 30) -> str:
-    cmd = f'ollama run {shlex.quote(model)} {shlex.quote(prompt)}'
+# recomendações memoizadas por contexto (números em faixas) + modelo
+_LLM_CACHE = CacheTTL(LLM_CACHE_TTL, 0, LLM_CACHE_SIZE, db=Path(LLM_CACHE_DB) if LLM_CACHE_DB else None,
+                      valido=lambda v: isinstance(v, dict) and "ok" in v, nome="IA")
+_LLM_EM_VOO = SingleFlight()
+
+def _ollama_run(model: str, prompt: str, host: str = OLLAMA_HOST, timeout: Optional[float] = None,
+                opcoes: Optional[Dict[str, Any]] = None) -> str:
     try:
-        proc = subprocess.run(
-            cmd, shell=True, capture_output=True, text=False, timeout=timeout,
-            env={**os.environ, "OLLAMA_HOST": host},
-        )
-        stdout = (proc.stdout or b"").decode("utf-8", errors="replace")
-        stderr = (proc.stderr or b"").decode("utf-8", errors="replace")
-        if proc.returncode != 0:
-            raise RuntimeError(stderr.strip() or "Falha desconhecida no Ollama.")
-        return stdout.strip()
+        return cliente_ollama(host).gerar(model, prompt, timeout=timeout, opcoes=opcoes)
     except Exception as e:
         return f"[Ollama erro] {e}"
 
+_REGRAS = (
+    "Regras ok=false: (prob_chuva>=50 ou chuva_mm>=10) OU (tmax>=35 ou sensacao_max>=35) "
+    "OU (vento_max>=40) OU (vis_km<=5)."
+)
+
+def _interpretar(obj: Any) -> Optional[Dict[str, Any]]:
+    if not isinstance(obj, dict) or "ok" not in obj:
+        return None
+    ok = bool(obj.get("ok"))
+    motivo = str(obj.get("motivo","")).strip() or ("favorable conditions" if ok else "unfavorable conditions")
+    mensagem = str(obj.get("mensagem","")).strip()
+    if len(mensagem) > 220: mensagem = mensagem[:220].rstrip()
+    return {"ok": ok, "motivo": motivo, "mensagem": mensagem}
+
+def _gerar_um(model: str, contexto: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    instrucoes = (
+        "Responda SOMENTE com um JSON de UM objeto (sem texto extra), assim:\n"
+        '{"ok": true|false, "motivo": "up to 8 words", "mensagem": "up to 220 characters in ENGLISH"}\n'
+        + _REGRAS
+    )
+    prompt = f"INSTRUCOES:\n{instrucoes}\n\nCONTEXTO:\n{json.dumps(contexto, ensure_ascii=False, default=str)}\n\nRESPOSTA:"
+    raw = _ollama_run(model, prompt).strip().strip("`").strip()
+    m = re.search(r"\{[^{}]*\}", raw, flags=re.S)
+    if not m:
+        return None
+    try:
+        return _interpretar(json.loads(m.group(0)))
+    except Exception:
+        return None
+
+def _gerar_lote(model: str, contextos: List[Dict[str, Any]]) -> List[Optional[Dict[str, Any]]]:
+    """Vários contextos → um prompt (LLM_BATCH_MODE=prompt) ou chamadas em paralelo; None = fallback do item."""
+    n = len(contextos)
+    if n == 1:
+        return [_gerar_um(model, contextos[0])]
+    if LLM_BATCH_MODE == "parallel":
+        with ThreadPoolExecutor(max_workers=min(n, max(1, LLM_BATCH_CONCURRENCY))) as ex:
+            return list(ex.map(lambda c: _gerar_um(model, c), contextos))
+    instrucoes = (
+        f"Para CADA um dos {n} itens abaixo, avalie o evento. Responda SOMENTE com um JSON (sem texto extra), assim:\n"
+        '{"itens": [{"id": <id do item>, "ok": true|false, "motivo": "up to 8 words", '
+        '"mensagem": "up to 220 characters in ENGLISH"}, ...]}\n'
+        + _REGRAS
+    )
+    itens = "\n".join(json.dumps({"id": k, **c}, ensure_ascii=False, default=str) for k, c in enumerate(contextos))
+    prompt = f"INSTRUCOES:\n{instrucoes}\n\nITENS:\n{itens}\n\nRESPOSTA:"
+    raw = _ollama_run(model, prompt, timeout=OLLAMA_TIMEOUT * min(n, 4),
+                      opcoes={"num_predict": OLLAMA_NUM_PREDICT * n})
+    return [_interpretar(o) for o in demultiplexar(raw, n)]
+
+# pedidos concorrentes (ex.: lote de eventos) → um lote por modelo dentro da janela
+_AGRUPADOR = AgrupadorLLM(_gerar_lote)
+
 def gerar_recomendacao_contextual_ollama(hist: Dict[str,Any], prev: Optional[Dict[str,Any]],
                                          data_evento: str, evento_tipo: str, person_name: str,
                                          pet_name: str, mensagem_fallback: str, model: str = OLLAMA_MODEL) -> Dict[str, Any]:
@@ -42,23 +100,16 @@ def gerar_recomendacao_contextual_ollama(hist: Dict[str,Any], prev: Optional[Dic
         },
         "previsao_dia": item_prev or {},
     }
-    instrucoes = (
-        "Responda SOMENTE com um JSON de UM objeto (sem texto extra), assim:\n"
-        '{"ok": true|false, "motivo": "up to 8 words", "mensagem": "up to 220 characters in ENGLISH"}\n'
-        "Regras ok=false: (prob_chuva>=50 ou chuva_mm>=10) OU (tmax>=35 ou sensacao_max>=35) "
-        "OU (vento_max>=40) OU (vis_km<=5)."
-    )
-    prompt = f"INSTRUCOES:\n{instrucoes}\n\nCONTEXTO:\n{json.dumps(contexto, ensure_ascii=False)}\n\nRESPOSTA:"
-    raw = _ollama_run(model, prompt).strip().strip("`").strip()
-    m = re.search(r"\{[^{}]*\}", raw, flags=re.S)
-    if not m:
-        return {"ok": True, "motivo": "favorable conditions", "mensagem": mensagem_fallback}
-    try:
-        obj = json.loads(m.group(0))
-        ok = bool(obj.get("ok"))
-        motivo = str(obj.get("motivo","")).strip() or ("favorable conditions" if ok else "unfavorable conditions")
-        mensagem = str(obj.get("mensagem","")).strip() or mensagem_fallback
-        if len(mensagem) > 220: mensagem = mensagem[:220].rstrip()
-        return {"ok": ok, "motivo": motivo, "mensagem": mensagem}
-    except Exception:
+    def _gerar() -> Optional[Dict[str, Any]]:
+        if LLM_BATCH_ENABLE:
+            return _AGRUPADOR.pedir(model, contexto, timeout=OLLAMA_TIMEOUT * 5)
+        return _gerar_um(model, contexto)
+    if LLM_CACHE_ENABLE:
+        chave = chave_contexto(contexto, model)
+        out = _LLM_CACHE.obter(chave, lambda: _LLM_EM_VOO.do(chave, _gerar))
+    else:
+        out = _gerar()
+    if not out:
         return {"ok": True, "motivo": "favorable conditions", "mensagem": mensagem_fallback}
+    out["mensagem"] = out["mensagem"] or mensagem_fallback
+    return out
@@ -2,10 +2,11 @@ from datetime import date
 from typing import Optional, Dict, Any, List
 from fastapi import FastAPI, Query, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, PlainTextResponse
 from pydantic import BaseModel
-from meteo_event import avaliar_evento, formatar_card_evento, montar_blocos_front, formatar_bem_amigavel
+from meteo_event import avaliar_evento_async, formatar_card_evento, montar_blocos_front, formatar_bem_amigavel
 import os
+from metrics import render_prometheus
 
 app = FastAPI(title="Evento Meteo API", version="1.0.0")
 CORS_ORIGINS = [o.strip() for o in os.getenv("CORS_ORIGINS", "*").split(",") if o.strip()]
@@ -29,28 +30,32 @@ async def _unhandled(request, exc):
     return JSONResponse(status_code=500, content={"ok": False, "error": str(exc)})
 
 @app.get("/health")
-def health(): return {"ok": True}
+async def health(): return {"ok": True}
+
+@app.get("/metrics")
+async def metrics():
+    return PlainTextResponse(render_prometheus(), media_type="text/plain; version=0.0.4")
 
 @app.get("/v1/card")
-def get_card(lat: float, lon: float, data_evento: date, titulo: Optional[str] = None):
+async def get_card(lat: float, lon: float, data_evento: date, titulo: Optional[str] = None):
     try:
-        payload = avaliar_evento(lat, lon, str(data_evento), event_title=(titulo or ""))
+        payload = await avaliar_evento_async(lat, lon, str(data_evento), event_title=(titulo or ""))
         return formatar_card_evento(payload)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/v1/blocos")
-def get_blocos(lat: float, lon: float, data_evento: date, titulo: Optional[str] = None, dias: int = 7):
+async def get_blocos(lat: float, lon: float, data_evento: date, titulo: Optional[str] = None, dias: int = 7):
     try:
-        payload = avaliar_evento(lat, lon, str(data_evento), event_title=(titulo or ""))
+        payload = await avaliar_evento_async(lat, lon, str(data_evento), event_title=(titulo or ""))
         return montar_blocos_front(payload, limitar_dias=dias)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/v1/amigavel")
-def get_amigavel(lat: float, lon: float, data_evento: date, titulo: Optional[str] = None):
+async def get_amigavel(lat: float, lon: float, data_evento: date, titulo: Optional[str] = None):
     try:
-        payload = avaliar_evento(lat, lon, str(data_evento), event_title=(titulo or ""))
+        payload = await avaliar_evento_async(lat, lon, str(data_evento), event_title=(titulo or ""))
         return formatar_bem_amigavel(payload)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
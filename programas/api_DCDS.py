@@ -7,14 +7,20 @@
 
 from fastapi import FastAPI, Query
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
 from pydantic import BaseModel, Field
-from typing import Optional, Literal, Any, Dict
+from typing import Optional, Literal, Any, Dict, List
 import os
+import asyncio
 from datetime import date
 from pathlib import Path
 
 # importa seu módulo (o arquivo que você já tem)
 import evento_V4 as core
+from metrics import definir, render_prometheus
+from prefetch import iniciar_prefetch, estado_prefetch
+from granule_catalog import estado_catalogos
+from http_client import fechar_clientes_async
 
 # ---------- CORS (ajuste a origem do seu front) ----------
 ALLOWED_ORIGINS = os.getenv("ALLOWED_ORIGINS", "*").split(",")
@@ -88,16 +94,79 @@ class EventQuery(BaseModel):
     output: Literal["blocks", "card", "friendly", "compact", "full"] = "blocks"
     # timezone opcional
     timezone: Optional[str] = Field(None, description="IANA timezone, e.g. America/New_York")
+    # tempos por etapa + contadores da avaliação no payload (campo "debug")
+    debug: bool = Field(False, description="Attach per-stage timings and counters")
+
+class BatchEvent(BaseModel):
+    # só os campos por evento; output/timezone valem para o lote inteiro (BatchQuery)
+    lat: float = Field(..., description="Latitude (decimal degrees)")
+    lon: float = Field(..., description="Longitude (decimal degrees)")
+    date: date = Field(..., description="Event date (YYYY-MM-DD)")
+    title: Optional[str] = Field(None, description="Optional event title")
+
+    class Config:
+        extra = "forbid"   # output/timezone/debug por evento seriam ignorados em silêncio → 422
+
+class BatchQuery(BaseModel):
+    events: List[BatchEvent] = Field(..., description="Events to score (lat, lon, date, title)")
+    output: Literal["blocks", "card", "friendly", "compact", "full"] = "compact"
+    timezone: Optional[str] = Field(None, description="IANA timezone, e.g. America/New_York")
+
+def _formatar_saida(res: Dict[str, Any], output: str) -> Dict[str, Any]:
+    # seleciona o formato de saída (espelhando seus flags, mas via API)
+    if output == "compact":
+        return res.get("analise_evento", {}).get("decisao_binaria", {"ok": False, "motivo": "insufficient data"})
+    if output == "blocks":
+        return normalize_payload("blocks", core.montar_blocos_front(res))
+    if output == "card":
+        return normalize_payload("card", core.formatar_card_evento(res))
+    if output == "friendly":
+        return core.formatar_bem_amigavel(res)
+    return res  # "full"
+
+# ---------- Prefetch (locais/datas quentes aquecidos em 2º plano, PREFETCH_ENABLE) ----------
+@app.on_event("startup")
+def _startup_prefetch():
+    iniciar_prefetch()
+
+@app.on_event("shutdown")
+async def _shutdown_clientes():
+    # fecha os AsyncClient (pool de conexões keep-alive) criados neste loop
+    await fechar_clientes_async()
 
 # ---------- Rota principal ----------
 @app.get("/health")
 def health():
     return {"status": "ok"}
 
+@app.get("/health/providers")
+def health_providers():
+    """Estado dos disjuntores (closed/open/half_open) + contadores de latência/erro por provedor."""
+    return {"providers": core.estado_disjuntores()}
+
+@app.get("/health/prefetch")
+def health_prefetch():
+    """Fila/contadores do agendador de prefetch."""
+    return estado_prefetch()
+
+@app.get("/health/raw-cache")
+def health_raw_cache():
+    """Diretório raw: arquivos/bytes, limite, dias fixados, hit/miss e despejos."""
+    return {"raw": estado_catalogos()}
+
+@app.get("/metrics")
+def metrics():
+    """Agregado estilo Prometheus: histograma por etapa, contadores (cache, arquivos, bytes, provedor)."""
+    for nome, est in core.estado_disjuntores().items():
+        definir("provider_circuit_open", 1 if est.get("state") == "open" else 0, provider=nome)
+    for raiz, est in estado_catalogos().items():
+        definir("raw_cache_bytes", est["bytes"], raw=raiz)
+    return PlainTextResponse(render_prometheus(), media_type="text/plain; version=0.0.4")
+
 @app.post("/event")
-def event_endpoint(q: EventQuery):
-    # roda seu núcleo
-    res = core.avaliar_evento(
+async def event_endpoint(q: EventQuery):
+    # roda seu núcleo (versão async: histórico e previsão em paralelo, sem bloquear o loop)
+    res = await core.avaliar_evento_async(
         lat=q.lat,
         lon=q.lon,
         data_evento=str(q.date),
@@ -107,20 +176,25 @@ def event_endpoint(q: EventQuery):
         gldas_raw_dir=Path(os.getenv("GLDAS_RAW_SUBDIR", str(core.GLDAS_RAW_DIR))),
         max_files=core.MAX_FILES,
         janela_hist=1,
+        debug=q.debug,
     )
 
-    # seleciona o formato de saída (espelhando seus flags, mas via API)
-    if q.output == "compact":
-        payload = res.get("analise_evento", {}).get("decisao_binaria", {"ok": False, "motivo": "insufficient data"})
-    elif q.output == "blocks":
-        payload = core.montar_blocos_front(res)
-        payload = normalize_payload("blocks", payload)
-    elif q.output == "card":
-        payload = core.formatar_card_evento(res)
-        payload = normalize_payload("card", payload)
-    elif q.output == "friendly":
-        payload = core.formatar_bem_amigavel(res)
-    else:  # "full"
-        payload = res
+    out = _formatar_saida(res, q.output)
+    if "debug" in res and isinstance(out, dict):
+        out = {**out, "debug": res["debug"]}
+    return out
 
-    return payload
+@app.post("/v1/batch")
+async def batch_endpoint(q: BatchQuery):
+    # lote: agrupa por célula GLDAS/datas e calcula tudo de uma vez (em thread, não bloqueia o loop)
+    pedidos = [{"lat": e.lat, "lon": e.lon, "data_evento": str(e.date), "event_title": e.title} for e in q.events]
+    resultados = await asyncio.to_thread(
+        core.avaliar_eventos_lote,
+        pedidos,
+        subset_txt=Path(os.getenv("SUBSET_FILE",  "") or core.SUBSET_FILE),
+        gldas_raw_dir=Path(os.getenv("GLDAS_RAW_SUBDIR", str(core.GLDAS_RAW_DIR))),
+        max_files=core.MAX_FILES,
+        janela_hist=1,
+        timezone=q.timezone or os.getenv("TIMEZONE", "America/Sao_Paulo"),
+    )
+    return {"count": len(resultados), "results": [_formatar_saida(r, q.output) for r in resultados]}
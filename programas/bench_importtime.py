@@ -0,0 +1,117 @@
+# -*- coding: utf-8 -*-
+"""
+bench_importtime.py — custo de cold start (import) dos pontos de entrada
+
+- Roda `python -X importtime -c "import <alvo>"` em subprocesso limpo, N vezes, e reporta
+  a mediana do tempo cumulativo do alvo e os pacotes mais caros (tempo 'self' somado por pacote raiz)
+- Alvos padrão: evento_V4 (o que main.py carrega antes de avaliar), api_DCDS e api
+  (main.py executa uma avaliação ao ser importado → mede-se o módulo que ele importa)
+- Sinaliza pacotes pesados (xarray, earthaccess, metpy) carregados já no import
+- --baseline arquivo.json compara com uma medição anterior e falha se piorar além de --tolerancia
+
+Uso:
+  python bench_importtime.py [alvos...] [--repeat 5] [--top 12] [--json saida.json] [--baseline base.json]
+"""
+from __future__ import annotations
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from collections import defaultdict
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+ALVOS_PADRAO = ("evento_V4", "api_DCDS", "api")
+PESADOS = ("xarray", "earthaccess", "metpy", "netCDF4", "dask", "zarr")
+
+def _medir_uma(alvo: str, cwd: Path) -> Tuple[Optional[float], Dict[str, float], str]:
+    """(cumulativo do alvo em ms | None se falhou, self por pacote raiz em ms, erro)."""
+    env = {**os.environ, "PYTHONDONTWRITEBYTECODE": "0"}
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {alvo}"],
+                          cwd=str(cwd), env=env, capture_output=True, text=True, encoding="utf-8", errors="replace")
+    por_pacote: Dict[str, float] = defaultdict(float)
+    total: Optional[float] = None
+    for ln in proc.stderr.splitlines():
+        if not ln.startswith("import time:") or "|" not in ln:
+            continue
+        partes = ln[len("import time:"):].split("|")
+        if len(partes) != 3:
+            continue
+        try:
+            self_us, cum_us = int(partes[0]), int(partes[1])
+        except ValueError:
+            continue   # cabeçalho
+        nome = partes[2].strip()
+        por_pacote[nome.split(".")[0]] += self_us / 1000.0
+        if nome == alvo and partes[2].startswith(" ") and not partes[2].startswith("  "):
+            total = cum_us / 1000.0
+    erro = ""
+    if proc.returncode != 0:
+        total = None
+        erro = (proc.stderr.strip().splitlines() or ["?"])[-1]
+    return total, dict(por_pacote), erro
+
+def medir(alvo: str, cwd: Path, repeticoes: int = 5) -> Dict[str, object]:
+    tempos: List[float] = []
+    pacotes: Dict[str, List[float]] = defaultdict(list)
+    erro = ""
+    for _ in range(max(1, repeticoes)):
+        total, por_pacote, erro = _medir_uma(alvo, cwd)
+        if total is None:
+            break
+        tempos.append(total)
+        for k, v in por_pacote.items():
+            pacotes[k].append(v)
+    if not tempos:
+        return {"alvo": alvo, "ok": False, "erro": erro}
+    med = {k: statistics.median(v) for k, v in pacotes.items()}
+    return {
+        "alvo": alvo, "ok": True,
+        "ms": round(statistics.median(tempos), 1),
+        "ms_min": round(min(tempos), 1),
+        "pacotes": {k: round(v, 1) for k, v in sorted(med.items(), key=lambda kv: -kv[1])},
+        "pesados": sorted(p for p in PESADOS if p in med),
+    }
+
+def _main(argv: List[str]) -> int:
+    ap = argparse.ArgumentParser(description="Tempo de import (cold start) dos pontos de entrada")
+    ap.add_argument("alvos", nargs="*", default=list(ALVOS_PADRAO))
+    ap.add_argument("--repeat", type=int, default=5)
+    ap.add_argument("--top", type=int, default=12)
+    ap.add_argument("--json", help="grava o resultado (serve de baseline depois)")
+    ap.add_argument("--baseline", help="resultado anterior (--json) para comparar")
+    ap.add_argument("--tolerancia", type=float, default=0.20, help="piora relativa aceita (0.20 = 20%%)")
+    args = ap.parse_args(argv)
+
+    cwd = Path(__file__).resolve().parent
+    resultados = [medir(a, cwd, args.repeat) for a in args.alvos]
+    for r in resultados:
+        if not r["ok"]:
+            print(f"❌ {r['alvo']}: import falhou — {r['erro']}")
+            continue
+        print(f"⏱️ {r['alvo']}: {r['ms']:.1f} ms (mediana de {args.repeat}, mín {r['ms_min']:.1f} ms)")
+        for nome, ms in list(r["pacotes"].items())[:args.top]:
+            print(f"   {ms:9.1f} ms  {nome}")
+        if r["pesados"]:
+            print(f"   ⚠️ pesados carregados no import: {', '.join(r['pesados'])}")
+
+    if args.json:
+        Path(args.json).write_text(json.dumps(resultados, ensure_ascii=False, indent=2), encoding="utf-8")
+    status = 0
+    if args.baseline:
+        base = {r["alvo"]: r for r in json.loads(Path(args.baseline).read_text(encoding="utf-8")) if r.get("ok")}
+        for r in resultados:
+            b = base.get(r["alvo"])
+            if not (r["ok"] and b):
+                continue
+            delta = (r["ms"] - b["ms"]) / b["ms"] if b["ms"] else 0.0
+            marca = "❌" if delta > args.tolerancia else "✅"
+            print(f"{marca} {r['alvo']}: {b['ms']:.1f} → {r['ms']:.1f} ms ({delta:+.0%})")
+            if delta > args.tolerancia:
+                status = 1
+    return status
+
+if __name__ == "__main__":
+    sys.exit(_main(sys.argv[1:]))
@@ -0,0 +1,122 @@
+# -*- coding: utf-8 -*-
+"""
+circuit_breaker.py — disjuntor por provedor externo (Google Weather, Open-Meteo, ERA5)
+
+- fechado: chamadas normais; N falhas seguidas (erro/timeout/5xx) → aberto
+- aberto: chamadas são recusadas na hora (cache negativo) → quem chama vai direto ao fallback
+- meio-aberto: depois do resfriamento, 1 chamada de teste; sucesso fecha, falha reabre
+- Contadores de chamadas, falhas, curto-circuitos e latência para monitoramento
+"""
+from __future__ import annotations
+import os
+import threading
+import time
+from typing import Any, Dict, Optional
+
+CB_FALHAS   = int(os.getenv("CB_FALHAS", "3"))          # falhas seguidas para abrir
+CB_ABERTO_S = float(os.getenv("CB_ABERTO_S", "60"))     # resfriamento antes do teste (s)
+CB_ABERTO_MAX_S = float(os.getenv("CB_ABERTO_MAX_S", "900"))  # teto do resfriamento com backoff
+
+FECHADO, ABERTO, MEIO_ABERTO = "closed", "open", "half_open"
+
+class CircuitBreaker:
+    def __init__(self, nome: str, falhas: int = CB_FALHAS, aberto_s: float = CB_ABERTO_S):
+        self.nome = nome
+        self.limite = max(1, int(falhas))
+        self.aberto_s = float(aberto_s)
+        self._lock = threading.Lock()
+        self.estado = FECHADO
+        self._seguidas = 0
+        self._aberturas = 0          # aberturas consecutivas (backoff do resfriamento)
+        self._aberto_ate = 0.0
+        self._teste_em_voo = False
+        self.chamadas = self.sucessos = self.falhas = self.curto_circuitos = 0
+        self.lat_total = 0.0
+        self.lat_max = 0.0
+        self.ultimo_erro: Optional[str] = None
+        self.ultima_mudanca = time.time()
+
+    def _mudar(self, estado: str) -> None:
+        if estado != self.estado:
+            self.estado = estado
+            self.ultima_mudanca = time.time()
+            print(f"🔌 Disjuntor {self.nome}: {estado}")
+
+    def permitir(self) -> bool:
+        """True se a chamada pode seguir; False → usar o fallback sem esperar o timeout."""
+        with self._lock:
+            if self.estado == ABERTO:
+                if time.monotonic() < self._aberto_ate:
+                    self.curto_circuitos += 1
+                    return False
+                self._mudar(MEIO_ABERTO)
+            if self.estado == MEIO_ABERTO:
+                if self._teste_em_voo:
+                    self.curto_circuitos += 1
+                    return False
+                self._teste_em_voo = True
+            self.chamadas += 1
+            return True
+
+    def sucesso(self, latencia: float = 0.0) -> None:
+        with self._lock:
+            self.sucessos += 1
+            self._medir(latencia)
+            self._seguidas = 0
+            self._aberturas = 0
+            self._teste_em_voo = False
+            self._mudar(FECHADO)
+
+    def falha(self, latencia: float = 0.0, erro: Any = None, abrir: bool = False) -> None:
+        """Registra falha; abrir=True abre na hora (ex.: 403 — chave sem permissão)."""
+        with self._lock:
+            self.falhas += 1
+            self._medir(latencia)
+            self._seguidas += 1
+            self.ultimo_erro = None if erro is None else str(erro)[:200]
+            if abrir or self.estado == MEIO_ABERTO or self._seguidas >= self.limite:
+                self._aberturas += 1
+                espera = min(CB_ABERTO_MAX_S, self.aberto_s * (2 ** (self._aberturas - 1)))
+                self._aberto_ate = time.monotonic() + espera
+                self._mudar(ABERTO)
+            self._teste_em_voo = False
+
+    def liberar(self) -> None:
+        """Chamada interrompida sem resultado (ex.: CancelledError) → solta o teste do meio-aberto."""
+        with self._lock:
+            if self.estado == MEIO_ABERTO:
+                self._teste_em_voo = False
+
+    def _medir(self, latencia: float) -> None:
+        self.lat_total += latencia
+        self.lat_max = max(self.lat_max, latencia)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            medidas = self.sucessos + self.falhas
+            return {
+                "state": self.estado,
+                "consecutive_failures": self._seguidas,
+                "open_for_s": round(max(0.0, self._aberto_ate - time.monotonic()), 1) if self.estado == ABERTO else 0.0,
+                "calls": self.chamadas, "successes": self.sucessos, "failures": self.falhas,
+                "short_circuited": self.curto_circuitos,
+                "latency_avg_ms": round(1000 * self.lat_total / medidas, 1) if medidas else None,
+                "latency_max_ms": round(1000 * self.lat_max, 1),
+                "last_error": self.ultimo_erro,
+                "since": self.ultima_mudanca,
+            }
+
+_LOCK = threading.Lock()
+_DISJUNTORES: Dict[str, CircuitBreaker] = {}
+
+def disjuntor(nome: str) -> CircuitBreaker:
+    with _LOCK:
+        cb = _DISJUNTORES.get(nome)
+        if cb is None:
+            cb = _DISJUNTORES[nome] = CircuitBreaker(nome)
+        return cb
+
+def estado_disjuntores() -> Dict[str, Dict[str, Any]]:
+    with _LOCK:
+        itens = list(_DISJUNTORES.items())
+    return {nome: cb.snapshot() for nome, cb in itens}
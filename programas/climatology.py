@@ -1,77 +1,143 @@
 from __future__ import annotations
+import calendar
+import os
+from datetime import date, datetime, timedelta
+from pathlib import Path
 from typing import Any, Dict
 import numpy as np
 import pandas as pd
-import requests
+from .config import HIST_ANOS, GLDAS_OUT_DIR
+from .http_client import http_get
 
-def climatologia(df_daily: pd.DataFrame, target_date: str,
-                 anos=(2020,2021,2022,2023,2024), janela=1) -> Dict[str,Any]:
+def _faixa_anos(anos) -> str:
+    anos = sorted(int(a) for a in anos)
+    if not anos:
+        return "—"
+    return str(anos[0]) if anos[0] == anos[-1] else f"{anos[0]}–{anos[-1]}"
+
+HIST_COLS = ["temp_mean_c", "temp_min_c", "temp_max_c", "wind_mean_kmh", "rain_mm_day",
+             "rh_mean_pct", "pressure_mean_hpa", "solar_mean_wm2"]
+
+def _aniversario(target: pd.Timestamp, ano: int) -> pd.Timestamp:
+    """Mesmo mês/dia em outro ano (29/02 vira 28/02 em ano não bissexto)."""
+    dia = 28 if (target.month, target.day) == (2, 29) and not calendar.isleap(ano) else target.day
+    return pd.Timestamp(ano, target.month, dia)
+
+def _datas_alvo(target_date: str, anos, janela: int) -> pd.DatetimeIndex:
     tg = pd.to_datetime(target_date)
-    rows = []
-    for y in anos:
-        base = tg.replace(year=y)
-        for d in range(-janela, janela+1):
-            day = (base + pd.Timedelta(days=d)).date()
-            if day in df_daily.index:
-                rows.append(df_daily.loc[[day]])
-    if not rows:
+    bases = np.array([_aniversario(tg, int(y)).to_datetime64() for y in anos], dtype="datetime64[ns]")
+    desloc = np.arange(-janela, janela + 1).astype("timedelta64[D]")
+    return pd.DatetimeIndex((bases[:, None] + desloc[None, :]).ravel()).unique()
+
+def climatologia(df_daily: pd.DataFrame, target_date: str,
+                 anos=HIST_ANOS, janela=1) -> Dict[str,Any]:
+    # um único filtro por máscara (datas-alvo de todos os anos) + uma passada de estatísticas
+    dias = pd.DatetimeIndex(pd.to_datetime(df_daily.index)).normalize()
+    base = df_daily[dias.isin(_datas_alvo(target_date, anos, janela))]
+    if base.empty:
         return {"ok": False, "msg": "Sem dados históricos nessa janela."}
-    base = pd.concat(rows)
+
+    cols = [c for c in HIST_COLS if c in base]
+    num = base[cols].apply(pd.to_numeric, errors="coerce")
+    agg = num.agg(["mean", "min", "max", "count"]) if cols else None
+    q = num.quantile([0.25, 0.5, 0.75]) if cols else None
 
     def stats(col):
-        if col not in base: return None
-        s = pd.to_numeric(base[col], errors="coerce").dropna()
-        if s.empty: return None
-        return {"mean": float(s.mean()), "p25": float(s.quantile(0.25)),
-                "p50": float(s.quantile(0.5)), "p75": float(s.quantile(0.75)),
-                "min": float(s.min()), "max": float(s.max()), "n": int(s.shape[0])}
+        if col not in cols or not agg.at["count", col]: return None
+        return {"mean": float(agg.at["mean", col]), "p25": float(q.at[0.25, col]),
+                "p50": float(q.at[0.5, col]), "p75": float(q.at[0.75, col]),
+                "min": float(agg.at["min", col]), "max": float(agg.at["max", col]),
+                "n": int(agg.at["count", col])}
 
-    out = {
-        "ok": True,
-        "amostra": int(base.shape[0]),
-        "temp_mean_c":   stats("temp_mean_c"),
-        "temp_min_c":    stats("temp_min_c"),
-        "temp_max_c":    stats("temp_max_c"),
-        "wind_mean_kmh": stats("wind_mean_kmh"),
-        "rain_mm_day":   stats("rain_mm_day"),
-        "rh_mean_pct":   stats("rh_mean_pct"),
-        "pressure_mean_hpa": stats("pressure_mean_hpa"),
-        "solar_mean_wm2":    stats("solar_mean_wm2"),
-    }
+    out = {"ok": True, "amostra": int(base.shape[0])}
+    out.update({c: stats(c) for c in HIST_COLS})
     pm = (out.get("rain_mm_day") or {}).get("mean", 0.0)
     tm = (out.get("temp_mean_c") or {}).get("mean", float("nan"))
     chuva_txt = "tende a ser seco" if pm < 1 else ("há chance de chuva" if pm < 20 else "chuva forte é comum")
     if not np.isnan(tm):
         temp_txt  = "bem quente" if tm >= 30 else ("quente" if tm >= 25 else ("frio" if tm <= 15 else "ameno"))
-        out["resumo"] = f"Histórico (2020–2024 ±{janela}d): {chuva_txt}; média {tm:.1f}°C ({temp_txt})."
+        out["resumo"] = f"Histórico ({_faixa_anos(anos)} ±{janela}d): {chuva_txt}; média {tm:.1f}°C ({temp_txt})."
     else:
-        out["resumo"] = f"Histórico (2020–2024 ±{janela}d): {chuva_txt}."
+        out["resumo"] = f"Histórico ({_faixa_anos(anos)} ±{janela}d): {chuva_txt}."
     return out
 
-def hist_fallback_era5_openmeteo(lat: float, lon: float, data_evento: str, janela:int=1,
-                                 anos=(2020,2021,2022,2023,2024)) -> Dict[str,Any]:
-    base_url = "https://archive-api.open-meteo.com/v1/era5"
-    rows = []
-    for y in anos:
-        target = pd.to_datetime(data_evento).replace(year=y)
-        start = (target - pd.Timedelta(days=janela)).date().isoformat()
-        end   = (target + pd.Timedelta(days=janela)).date().isoformat()
-        params = dict(
-            latitude=lat, longitude=lon, timezone="UTC",
-            start_date=start, end_date=end,
-            daily="temperature_2m_max,temperature_2m_min,precipitation_sum,wind_speed_10m_max"
-        )
+ERA5_URL        = "https://archive-api.open-meteo.com/v1/era5"
+ERA5_DAILY      = "temperature_2m_max,temperature_2m_min,precipitation_sum,wind_speed_10m_max"
+ERA5_CACHE_DIR  = Path(os.getenv("ERA5_CACHE_DIR", "") or (GLDAS_OUT_DIR / "era5_cache"))
+ERA5_CHUNK_ANOS = int(os.getenv("ERA5_CHUNK_ANOS", "10"))
+
+def _era5_blocos(anos) -> list:
+    """Anos faltantes → faixas contíguas de até ERA5_CHUNK_ANOS anos (1 requisição cada)."""
+    hoje = datetime.utcnow().date()
+    blocos = []
+    for y in sorted(set(anos)):
+        if blocos and y == blocos[-1][1] + 1 and y - blocos[-1][0] < max(1, ERA5_CHUNK_ANOS):
+            blocos[-1] = (blocos[-1][0], y)
+        else:
+            blocos.append((y, y))
+    out = []
+    for y0, y1 in blocos:
+        fim = min(date(y1, 12, 31), hoje - timedelta(days=1))
+        if fim >= date(y0, 1, 1):
+            out.append((y0, y1, fim))
+    return out
+
+def _era5_anos_completos(serie: pd.DataFrame, ano_atual: int) -> pd.DataFrame:
+    """Só anos encerrados com 31/12 preenchido (o ERA5 chega com ~5 dias de atraso → nulos no fim)."""
+    datas = pd.to_datetime(serie["date"])
+    cheio = serie.drop(columns=["date"]).apply(pd.to_numeric, errors="coerce").notna().all(axis=1).to_numpy()
+    fechados = {d.year for d, ok in zip(datas, cheio) if ok and d.month == 12 and d.day == 31 and d.year < ano_atual}
+    return serie[datas.dt.year.isin(fechados).to_numpy()]
+
+def _era5_serie(lat: float, lon: float, anos_necessarios) -> pd.DataFrame:
+    """Série diária multi-ano da coordenada arredondada (0.25°): cache em disco + blocos contíguos de até N anos."""
+    lat_r, lon_r = round(lat * 4) / 4, round(lon * 4) / 4
+    cache_p = ERA5_CACHE_DIR / f"era5_{lat_r:+08.3f}_{lon_r:+09.3f}.csv"
+    cache = pd.DataFrame()
+    if cache_p.is_file():
         try:
-            r = requests.get(base_url, params=params, timeout=30)
+            cache = pd.read_csv(cache_p)
+            cache["date"] = pd.to_datetime(cache["date"]).dt.date
+        except Exception:
+            cache = pd.DataFrame()
+    hoje = datetime.utcnow().date()
+    tem = set(pd.to_datetime(cache["date"]).dt.year) if not cache.empty else set()
+    faltam = sorted(y for y in set(anos_necessarios) if y not in tem or y >= hoje.year)
+
+    novos = []
+    for y0, y1, fim in _era5_blocos(faltam):
+        params = dict(latitude=lat_r, longitude=lon_r, timezone="UTC",
+                      start_date=f"{y0}-01-01", end_date=fim.isoformat(), daily=ERA5_DAILY)
+        try:
+            r = http_get("era5", ERA5_URL, params=params)
             r.raise_for_status()
             d = r.json().get("daily", {})
             if not d: continue
             df = pd.DataFrame(d)
             df["date"] = pd.to_datetime(df["time"]).dt.date
             df = df.drop(columns=["time"])
-            rows.append(df)
+            novos.append(df[df["date"].map(lambda x: x.year in faltam)])
         except Exception:
             continue
+    if not novos:
+        return cache
+    serie = pd.concat([cache, *novos], ignore_index=True).drop_duplicates("date", keep="last").sort_values("date")
+    try:
+        ERA5_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        tmp = cache_p.with_name(cache_p.name + ".tmp")
+        _era5_anos_completos(serie, hoje.year).to_csv(tmp, index=False)
+        os.replace(tmp, cache_p)
+    except OSError:
+        pass
+    return serie
+
+def hist_fallback_era5_openmeteo(lat: float, lon: float, data_evento: str, janela:int=1,
+                                 anos=HIST_ANOS) -> Dict[str,Any]:
+    # série inteira em poucas requisições (e cache) → janela recortada localmente
+    datas = {d.date() for d in _datas_alvo(data_evento, anos, janela)}
+    serie = _era5_serie(lat, lon, {d.year for d in datas})
+    rows = [] if serie.empty else [serie[serie["date"].isin(datas)]]
+    rows = [r for r in rows if not r.empty]
 
     if not rows:
         return {"ok": False, "msg": "ERA5 (fallback) não retornou dados."}
@@ -94,5 +160,5 @@ def hist_fallback_era5_openmeteo(lat: float, lon: float, data_evento: str, janel
     pm = out["rain_mm_day"]["mean"]; tm = out["temp_mean_c"]["mean"]
     chuva_txt = "tende a ser seco" if pm < 1 else ("há chance de chuva" if pm < 20 else "chuva forte é comum")
     temp_txt  = "bem quente" if tm >= 30 else ("quente" if tm >= 25 else ("frio" if tm <= 15 else "ameno"))
-    out["resumo"] = f"Histórico (ERA5, 2020–2024 ±{janela}d): {chuva_txt}; média {tm:.1f}°C ({temp_txt})."
+    out["resumo"] = f"Histórico (ERA5, {_faixa_anos(anos)} ±{janela}d): {chuva_txt}; média {tm:.1f}°C ({temp_txt})."
     return out
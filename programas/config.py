@@ -19,6 +19,18 @@ GLDAS_OUT_DIR = DATA_DIR / os.getenv("GLDAS_OUT_SUBDIR", r"gldas\out")
 TIMEZONE      = os.getenv("TIMEZONE", "America/Sao_Paulo")
 MAX_FILES     = int(os.getenv("MAX_FILES", "0"))
 
+def parse_anos(txt: str) -> tuple:
+    """'2020-2024' ou '1995,2000,2010-2012' → tupla ordenada de anos."""
+    anos = set()
+    for parte in (txt or "").replace(" ", "").split(","):
+        if parte:
+            a, _, b = parte.partition("-")
+            anos.update(range(int(a), int(b or a) + 1))
+    return tuple(sorted(anos))
+
+# faixa de anos da climatologia (normais de 20–30 anos: HIST_ANOS=1995-2024)
+HIST_ANOS     = parse_anos(os.getenv("HIST_ANOS", "2020-2024")) or (2020, 2021, 2022, 2023, 2024)
+
 GOOGLE_WEATHER_API_KEY = (os.getenv("GOOGLE_WEATHER_API_KEY", "") or "").strip()
 
 # IA (Ollama)
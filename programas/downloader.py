@@ -0,0 +1,228 @@
+# -*- coding: utf-8 -*-
+"""
+downloader.py — download paralelo e retomável de granules (.nc4)
+
+- Pool de workers limitado sobre a mesma sessão (earthaccess/requests)
+- Baixa em <dest>.part e retoma com HTTP Range; rename atômico só no final
+- Valida tamanho (Content-Length/Content-Range), assinatura HDF5/NetCDF e EOF declarado
+  no superbloco HDF5 (pega arquivo truncado), e checksum opcional
+- Limitador de taxa por host (token bucket) no lugar do sleep fixo
+- Um download por destino: lock por thread + <dest>.lock (O_EXCL) entre processos
+"""
+from __future__ import annotations
+import hashlib
+import os
+import re
+import struct
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Iterator, Optional
+from urllib.parse import urlsplit
+
+DOWNLOAD_WORKERS  = int(os.getenv("DOWNLOAD_WORKERS", "4"))
+DOWNLOAD_RATE     = float(os.getenv("DOWNLOAD_RATE_PER_HOST", "2"))   # requisições/s por host
+DOWNLOAD_RETRIES  = int(os.getenv("DOWNLOAD_RETRIES", "3"))
+DOWNLOAD_LOCK_S   = float(os.getenv("DOWNLOAD_LOCK_S", "900"))   # .lock sem atividade há mais que isso = órfão
+
+HDF5_SIG   = b"\x89HDF\r\n\x1a\n"
+NETCDF_SIG = (b"CDF\x01", b"CDF\x02", b"CDF\x05")
+
+class RateLimiter:
+    """Token bucket por host: no máximo `rate` requisições/s (rajada de `burst`)."""
+
+    def __init__(self, rate: float = DOWNLOAD_RATE, burst: int = 1):
+        self.rate = max(0.0, float(rate))
+        self.burst = max(1, int(burst))
+        self._lock = threading.Lock()
+        self._hosts: Dict[str, list] = {}   # host -> [tokens, último instante]
+
+    def aguardar(self, url: str) -> None:
+        if self.rate <= 0:
+            return
+        host = urlsplit(url).netloc
+        while True:
+            with self._lock:
+                tokens, ts = self._hosts.get(host, [float(self.burst), time.monotonic()])
+                agora = time.monotonic()
+                tokens = min(float(self.burst), tokens + (agora - ts) * self.rate)
+                if tokens >= 1.0:
+                    self._hosts[host] = [tokens - 1.0, agora]
+                    return
+                self._hosts[host] = [tokens, agora]
+                espera = (1.0 - tokens) / self.rate
+            time.sleep(espera)
+
+def _hdf5_eof(head: bytes) -> Optional[int]:
+    """EOF declarado no superbloco HDF5 (versões 0–3); None se não der para ler."""
+    if not head.startswith(HDF5_SIG) or len(head) < 12:
+        return None
+    versao = head[8]
+    if versao in (0, 1):
+        size_off = head[13]
+        pos = 24 + (4 if versao == 1 else 0) + 2 * size_off   # base, free-space → EOF
+    elif versao in (2, 3):
+        size_off = head[9]
+        pos = 12 + 2 * size_off                                # base, extensão → EOF
+    else:
+        return None
+    fmt = {4: "<I", 8: "<Q"}.get(size_off)
+    if fmt is None or len(head) < pos + size_off:
+        return None
+    return struct.unpack_from(fmt, head, pos)[0]
+
+def arquivo_valido(path: Path, tamanho: Optional[int] = None,
+                   checksum: Optional[str] = None, algo: str = "md5") -> bool:
+    """Confere se o .nc4 está íntegro (tamanho, assinatura/EOF HDF5 e checksum opcional)."""
+    try:
+        size = path.stat().st_size
+        if size == 0 or (tamanho is not None and size != tamanho):
+            return False
+        with open(path, "rb") as f:
+            head = f.read(64)
+        if head.startswith(HDF5_SIG):
+            eof = _hdf5_eof(head)
+            if eof is not None and size < eof:
+                return False
+        elif not head.startswith(NETCDF_SIG):
+            return False
+        if checksum:
+            h = hashlib.new(algo)
+            with open(path, "rb") as f:
+                for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                    h.update(chunk)
+            if h.hexdigest().lower() != checksum.lower():
+                return False
+        return True
+    except OSError:
+        return False
+
+def _total_da_resposta(r, offset: int) -> Optional[int]:
+    cr = r.headers.get("Content-Range")
+    if cr:
+        m = re.search(r"/(\d+)\s*$", cr)
+        if m:
+            return int(m.group(1))
+    cl = r.headers.get("Content-Length")
+    if cl and cl.isdigit() and "gzip" not in (r.headers.get("Content-Encoding") or ""):
+        return int(cl) + (offset if r.status_code == 206 else 0)
+    return None
+
+_TRAVAS: Dict[str, threading.Lock] = {}
+_TRAVAS_LOCK = threading.Lock()
+
+def _lock_arquivo(dest: Path) -> Path:
+    return dest.with_name(dest.name + ".lock")
+
+@contextmanager
+def trava_destino(dest: Path, orfao: float = DOWNLOAD_LOCK_S) -> Iterator[None]:
+    """Exclusão por destino: threading.Lock por caminho + arquivo .lock (O_EXCL) entre processos."""
+    with _TRAVAS_LOCK:
+        trava = _TRAVAS.setdefault(os.path.abspath(dest), threading.Lock())
+    with trava:
+        lock = _lock_arquivo(dest)
+        while True:
+            try:
+                fd = os.open(lock, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+                break
+            except FileExistsError:
+                # outro processo baixando; o dono renova o mtime a cada bloco → parado = órfão
+                try:
+                    if time.time() - lock.stat().st_mtime > orfao:
+                        lock.unlink(missing_ok=True)
+                        continue
+                except FileNotFoundError:
+                    continue
+                time.sleep(0.5)
+        try:
+            os.write(fd, str(os.getpid()).encode())
+            os.close(fd)
+            yield
+        finally:
+            lock.unlink(missing_ok=True)
+
+def baixar_arquivo(sess, url: str, dest: Path, limiter: Optional[RateLimiter] = None,
+                   timeout: int = 300, checksum: Optional[str] = None, algo: str = "md5",
+                   retries: int = DOWNLOAD_RETRIES) -> int:
+    """Baixa url → dest via dest.part (retomando com Range). Retorna bytes recebidos.
+
+    Chamadas concorrentes p/ o mesmo dest (threads ou processos) são serializadas; quem
+    chega depois encontra o arquivo pronto e retorna 0.
+    """
+    with trava_destino(dest):
+        part = dest.with_name(dest.name + ".part")
+        if dest.exists():
+            if arquivo_valido(dest, checksum=checksum, algo=algo):
+                return 0
+            # truncado (ex.: crash de versões antigas) → vira .part e é retomado
+            os.replace(dest, part)
+        return _baixar(sess, url, dest, part, limiter, timeout, checksum, algo, retries)
+
+def _baixar(sess, url: str, dest: Path, part: Path, limiter: Optional[RateLimiter],
+            timeout: int, checksum: Optional[str], algo: str, retries: int) -> int:
+    lock = _lock_arquivo(dest)
+    recebidos = 0
+    ultimo_erro: Optional[Exception] = None
+    for _ in range(max(1, retries)):
+        offset = part.stat().st_size if part.exists() else 0
+        headers = {"Range": f"bytes={offset}-"} if offset else {}
+        if limiter:
+            limiter.aguardar(url)
+        r = None
+        try:
+            r = sess.get(url, stream=True, allow_redirects=True, timeout=timeout, headers=headers)
+            if r.status_code == 416 and offset:
+                # servidor diz que não há mais nada além do que já temos
+                total = offset
+            else:
+                r.raise_for_status()
+                if offset and r.status_code != 206:
+                    offset = 0   # Range ignorado → recomeça do zero
+                total = _total_da_resposta(r, offset)
+                with open(part, "ab" if offset else "wb") as f:
+                    for chunk in r.iter_content(1024 * 1024):
+                        if chunk:
+                            f.write(chunk)
+                            recebidos += len(chunk)
+                            try: os.utime(lock)   # sinal de vida p/ outros processos
+                            except OSError: pass
+            if arquivo_valido(part, total, checksum, algo):
+                os.replace(part, dest)
+                return recebidos
+            if total is not None and part.stat().st_size >= total:
+                part.unlink(missing_ok=True)   # completo mas inválido → descarta
+            ultimo_erro = IOError(f"arquivo incompleto/inválido ({part.stat().st_size if part.exists() else 0} bytes)")
+        except Exception as e:
+            ultimo_erro = e
+            if getattr(getattr(e, "response", None), "status_code", 0) in (401, 403, 404):
+                break
+        finally:
+            if r is not None:
+                try: r.close()
+                except Exception: pass
+    raise ultimo_erro or IOError("falha no download")
+
+def preparar_sessao(sess, workers: int = DOWNLOAD_WORKERS):
+    """Ajusta o pool de conexões da sessão para o nº de workers."""
+    try:
+        from requests.adapters import HTTPAdapter
+        adapter = HTTPAdapter(pool_connections=max(4, workers), pool_maxsize=max(4, workers))
+        sess.mount("https://", adapter)
+        sess.mount("http://", adapter)
+    except Exception:
+        pass
+    return sess
+
+def executar_pool(tarefas: Iterable[Any], fn: Callable[[Any], int],
+                  workers: int = DOWNLOAD_WORKERS) -> int:
+    """Roda fn(tarefa) em paralelo (máx. `workers`) e soma os retornos (nº de arquivos baixados)."""
+    tarefas = list(tarefas)
+    if not tarefas:
+        return 0
+    total = 0
+    with ThreadPoolExecutor(max_workers=max(1, min(workers, len(tarefas)))) as ex:
+        for fut in as_completed([ex.submit(fn, t) for t in tarefas]):
+            total += fut.result() or 0
+    return total
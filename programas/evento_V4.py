@@ -6,32 +6,75 @@ from __future__ import annotations
 evento_meteo_assistente.py (GLDAS/ERA5 + Previsão + IA local via Ollama opcional)
 
 Pipeline:
- - Lê SUBSET_FILE (TXT do GES DISC) e filtra SOMENTE os dias relevantes (mês/dia do evento ± janela) para 2020–2024
- - Baixa os .nc4 (GLDAS) usando earthaccess (EARTHDATA_USER/PASS no .env ou ~/.netrc)
- - Converte GLDAS 3h -> diário para o ponto (lat, lon) com variáveis essenciais + secundárias
- - Calcula climatologia (GLDAS). Se faltar dado, fallback ERA5 (Open-Meteo archive)
+ - Lê SUBSET_FILE (TXT do GES DISC) e filtra SOMENTE os dias relevantes (mês/dia do evento ± janela) nos anos de HIST_ANOS (padrão 2020–2024)
+   (índice url → data persistido em <subset>.idx.json, ver link_index.py)
+ - Baixa os .nc4 (GLDAS) usando earthaccess (EARTHDATA_USER/PASS no .env ou ~/.netrc), em paralelo e retomável (downloader.py)
+ - Converte GLDAS 3h -> diário para o ponto (lat, lon) com variáveis essenciais + secundárias (só a célula do ponto, gldas_point.py)
+ - (opcional) Consolida os granules num cubo Zarr chunked no tempo (gldas_cube.py) e lê o ponto dele
+   (ou em tiles de 5°×5°, GLDAS_TILES_ENABLE: granule recortado uma vez por tile; pontos próximos leem o mesmo tile)
+ - Guarda os diários por célula 0.25°/ano em SQLite (gldas_store.py); só reprocessa .nc4 das datas que faltam
+ - Catálogo SQLite dos granules no disco (granule_catalog.py): baixa só o delta e abre só os .nc4 da janela
+   (diretório raw com orçamento de disco RAW_CACHE_MAX_GB: despejo LRU/LFU, dias em uso/quentes fixados)
+ - Download recortado na origem (gldas_otf.py): BBOX da região de serviço + só as 6 variáveis do diário
+   (OTF reescrito ou OPeNDAP com restrição); ponto fora das regiões → granule global
+ - Qualquer faixa de anos (HIST_ANOS)/janela sai dos diários guardados, com estatísticas exatas, sem reler .nc4
+ - Avaliações concorrentes da mesma célula/data/janela/anos compartilham um único cálculo (singleflight.py)
+ - avaliar_eventos_lote: milhares de (lat, lon, data) de uma vez — extração vetorizada por célula e climatologia via groupby
+ - avaliar_evento_async: histórico (GLDAS → ERA5) e previsão rodam em paralelo (httpx + asyncio)
+ - Calcula climatologia (GLDAS). Se faltar dado, fallback ERA5 (Open-Meteo archive): série multi-ano
+   em poucas requisições, cache em disco por coordenada arredondada e recorte local da janela
  - Previsão 7 dias: Google Weather (se GOOGLE_WEATHER_API_KEY) → fallback Open-Meteo (com umidade, visibilidade, sensação)
+ - Chamadas HTTP aos provedores por sessões keep-alive compartilhadas (http_client.py)
+ - Disjuntor por provedor: Google fora do ar/403 → vai direto ao Open-Meteo sem esperar timeout (circuit_breaker.py)
+ - Previsão em cache por coordenada arredondada/dias/timezone/provedor com TTL e revalidação em 2º plano (forecast_cache.py)
  - Gera recomendação determinística e, opcionalmente, recomendação contextual (IA local via Ollama)
+   (recomendações da IA memoizadas pelo contexto em faixas + modelo, llm_cache.py)
+   (no lote, pedidos à IA são agrupados em prompts multi-item ou chamadas paralelas, llm_batch.py)
  - Entrega payload completo OU JSONs “amigáveis” para o front (card, blocos, etc.)
+ - Prefetch em 2º plano dos locais/datas quentes (fins de semana, feriados) → requisições já chegam no cache (prefetch.py)
+ - CLI em fluxo: --input eventos.csv|.ndjson|- → uma linha JSON por evento assim que termina (pool de workers)
 
 Requisitos:
- pip install python-dotenv xarray netCDF4 pandas numpy requests earthaccess
+ pip install python-dotenv xarray netCDF4 pandas numpy requests httpx earthaccess
  (opcional) pip install metpy
- (IA local) Instalar Ollama e um modelo (ex.: `ollama pull phi3`)
+ (IA local) Instalar Ollama e um modelo (ex.: `ollama pull phi3`); servidor em OLLAMA_HOST (`ollama serve`)
 """
 import unicodedata
 
-import os, re, time, json, math, subprocess, shlex
+import os, re, time, json, math, copy, calendar, threading, asyncio, sqlite3, contextlib
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Sequence, Dict, Any, Optional, List, Tuple
+from typing import TYPE_CHECKING, Sequence, Dict, Any, Optional, List, Tuple, Iterator
 from datetime import datetime, timedelta
 from urllib.parse import urlparse, parse_qs, unquote
 
 import numpy as np
 import pandas as pd
-import xarray as xr
 import requests
-import earthaccess as ea
+
+if TYPE_CHECKING:   # xarray é carregado sob demanda; aqui só para as anotações
+    import xarray as xr
+
+from config import parse_anos
+from gldas_store import DailyStore, snap_gldas_cell, celula_borda, cell_center
+from singleflight import SingleFlight, AsyncSingleFlight
+from link_index import carregar_indice
+from gldas_point import GLDAS_VARS, extrair_ponto, agregar_diario
+from gldas_cube import (ingerir_granulos, ler_ponto_cubo, abrir_cubo, tile_de, tile_do_nome,
+                        caminho_tile, ingerir_tiles)
+from http_client import http_get, cliente_async
+from forecast_cache import CacheTTL
+from circuit_breaker import disjuntor, estado_disjuntores
+from metrics import METRICS_DEBUG, avaliacao, etapa, contar, anotar
+from ollama_client import cliente_ollama, OLLAMA_TIMEOUT, OLLAMA_NUM_PREDICT
+from llm_batch import (LLM_BATCH_ENABLE, LLM_BATCH_MODE, LLM_BATCH_MAX, LLM_BATCH_CONCURRENCY,
+                       AgrupadorLLM, demultiplexar)
+from llm_cache import LLM_CACHE_ENABLE, LLM_CACHE_TTL, LLM_CACHE_SIZE, LLM_CACHE_DB, chave_contexto
+from granule_catalog import GRANULE_CATALOG_ENABLE, RAW_CACHE_MAX_GB, catalogo
+from gldas_otf import (GLDAS_OTF_SUBSET, REGIOES, Regiao, regiao_para, regiao_do_nome, nome_destino,
+                       nome_global, reescrever_url, cobre_regiao)
+from downloader import (DOWNLOAD_WORKERS, DOWNLOAD_RATE, RateLimiter, arquivo_valido,
+                        baixar_arquivo, executar_pool, preparar_sessao)
 
 # ===================== .env / Config =====================
 try:
@@ -56,6 +99,18 @@ GLDAS_OUT_DIR   = DATA_DIR / os.getenv("GLDAS_OUT_SUBDIR",  r"gldas\out")
 MAX_FILES       = int(os.getenv("MAX_FILES", "0"))   # 0 = baixa todos os links filtrados
 TIMEZONE        = os.getenv("TIMEZONE", "America/Sao_Paulo")
 GOOGLE_WEATHER_API_KEY = os.getenv("GOOGLE_WEATHER_API_KEY", "").strip()
+# cache persistente dos diários GLDAS (por célula 0.25° e ano)
+GLDAS_STORE_ENABLE = os.getenv("GLDAS_STORE_ENABLE", "true").lower() in ("1","true","yes","y")
+POINT_EXTRACT_ENABLE = os.getenv("POINT_EXTRACT_ENABLE", "true").lower() in ("1","true","yes","y")
+GLDAS_STORE_FILE   = Path(os.getenv("GLDAS_STORE_FILE", "") or (GLDAS_OUT_DIR / "diario_gldas.sqlite"))
+# faixa de anos da climatologia (normais de 20–30 anos: HIST_ANOS=1995-2024)
+HIST_ANOS = parse_anos(os.getenv("HIST_ANOS", "2020-2024")) or (2020, 2021, 2022, 2023, 2024)
+# cubo Zarr consolidado dos granules (gldas_cube.py; requer zarr)
+GLDAS_CUBE_ENABLE  = os.getenv("GLDAS_CUBE_ENABLE", "false").lower() in ("1","true","yes","y")
+GLDAS_CUBE         = Path(os.getenv("GLDAS_CUBE", "") or (GLDAS_OUT_DIR / "gldas_cube.zarr"))
+# tiles regionais (um cubo por tile de GLDAS_TILE_GRAUS; têm precedência sobre o cubo global)
+GLDAS_TILES_ENABLE = os.getenv("GLDAS_TILES_ENABLE", "false").lower() in ("1","true","yes","y")
+GLDAS_TILES_DIR    = Path(os.getenv("GLDAS_TILES_DIR", "") or (GLDAS_OUT_DIR / "gldas_tiles"))
 
 # ---- IA via Ollama (opcional) ----
 OLLAMA_ENABLE   = os.getenv("OLLAMA_ENABLE", "false").lower() in ("1","true","yes","y")
@@ -80,10 +135,17 @@ for p in (DATA_DIR, GLDAS_RAW_DIR, GLDAS_OUT_DIR):
     p.mkdir(parents=True, exist_ok=True)
 
 # ===================== Utils: subset TXT / download =====================
+# resultado do rglob em DATA_DIR reaproveitado por alguns minutos (evita varrer o disco a cada request)
+SUBSET_AUTODISCOVER_TTL = float(os.getenv("SUBSET_AUTODISCOVER_TTL", "300"))
+_SUBSET_AUTO: Dict[str, Tuple[float, Path]] = {}
+
 def autodiscover_subset_file(explicit: Path, root: Path) -> Path:
     if explicit and explicit.is_file():
         print(f"[OK] SUBSET_FILE (env/CLI): {explicit}")
         return explicit
+    memo = _SUBSET_AUTO.get(str(root))
+    if memo and time.monotonic() - memo[0] < SUBSET_AUTODISCOVER_TTL and memo[1].is_file():
+        return memo[1]
     print(f"[AUTO] Procurando subset TXT em: {root}")
     patterns = ["subset_GLDAS*.txt", "*subset*GLDAS*.txt", "subset_*.txt"]
     cand: List[Path] = []
@@ -93,6 +155,7 @@ def autodiscover_subset_file(explicit: Path, root: Path) -> Path:
         raise SystemExit("❌ subset TXT não encontrado. Ajuste SUBSET_FILE no .env.")
     cand.sort(key=lambda p: (p.stat().st_size, p.stat().st_mtime), reverse=True)
     print(f"[AUTO] Usando: {cand[0]}")
+    _SUBSET_AUTO[str(root)] = (time.monotonic(), cand[0])
     return cand[0]
 
 def fix_gldas_url(u: str) -> str:
@@ -155,15 +218,33 @@ def parse_y_doy_hhmm_from_url(url: str) -> tuple[int,int,int,int]:
 def dt_from_year_doy(year: int, doy: int) -> datetime:
     return datetime(year, 1, 1) + timedelta(days=doy - 1)
 
+def _instante_link(url: str) -> Optional[datetime]:
+    """Instante (UTC) do passo GLDAS de um link do subset; None se não der para extrair."""
+    try:
+        y, doy, hh, mm = parse_y_doy_hhmm_from_url(url)
+    except ValueError:
+        return None
+    return dt_from_year_doy(y, doy).replace(hour=hh, minute=mm)
+
+def _aniversario(target: pd.Timestamp, ano: int) -> pd.Timestamp:
+    """Mesmo mês/dia em outro ano (29/02 vira 28/02 em ano não bissexto)."""
+    dia = 28 if (target.month, target.day) == (2, 29) and not calendar.isleap(ano) else target.day
+    return pd.Timestamp(ano, target.month, dia)
+
+def _datas_alvo(data_evento: str, anos, janela: int) -> pd.DatetimeIndex:
+    """Mês/dia do evento ± janela em cada ano, montado de uma vez (anos × deslocamentos)."""
+    tg = pd.to_datetime(data_evento)
+    bases = np.array([_aniversario(tg, int(y)).to_datetime64() for y in anos], dtype="datetime64[ns]")
+    desloc = np.arange(-janela, janela + 1).astype("timedelta64[D]")
+    return pd.DatetimeIndex((bases[:, None] + desloc[None, :]).ravel()).unique()
+
+def datas_janela(data_evento: str, janela:int=1, anos=HIST_ANOS) -> set:
+    """Todas as datas (mês/dia do evento ± janela) nos anos pedidos."""
+    return {d.date() for d in _datas_alvo(data_evento, anos, janela)}
+
 def filter_links_for_event_window(links: list[str], data_evento: str, janela:int=1,
-                                  anos=(2020,2021,2022,2023,2024)) -> list[str]:
-    target = pd.to_datetime(data_evento)
-    md = (target.month, target.day)
-    allow_dates = set()
-    for y in anos:
-        base = datetime(y, md[0], md[1])
-        for d in range(-janela, janela+1):
-            allow_dates.add((base + timedelta(days=d)).date())
+                                  anos=HIST_ANOS) -> list[str]:
+    allow_dates = datas_janela(data_evento, janela, anos)
 
     kept = []
     for u in links:
@@ -205,51 +286,129 @@ def derive_dest_name(url: str, for_direct: bool = False) -> str:
     last = Path(p.path).name
     return sanitize(last + ".nc4")
 
-def download_gldas(links: list[str], out_dir: Path, max_files: int) -> int:
-    # Auth via earthaccess (EARTHDATA_* no .env ou ~/.netrc)
-    ea.login(strategy="environment", persist=True)
-    sess = ea.get_requests_https_session()
-    out_dir.mkdir(parents=True, exist_ok=True)
+def _catalogo(raw_dir: Path):
+    """Catálogo de granules do diretório raw (None = desligado/indisponível → varre o diretório)."""
+    if not GRANULE_CATALOG_ENABLE:
+        return None
+    try:
+        return catalogo(raw_dir, data_do_arquivo, _granulo_valido, regiao_do_nome)
+    except (OSError, sqlite3.Error) as e:
+        print(f"⚠️ Catálogo de granules indisponível ({e}); varrendo o diretório.")
+        return None
 
+def _regiao_do_arquivo(path):
+    """Região do recorte pela marca no nome: região configurada ou tile (None = global/desconhecida)."""
+    nome = regiao_do_nome(path)
+    if not nome:
+        return None
+    regiao = next((r for r in REGIOES if r.nome == nome), None)
+    if regiao is None:
+        tile = tile_do_nome(nome)
+        regiao = Regiao(*tile) if tile is not None else None
+    return regiao
+
+def _granulo_valido(path) -> bool:
+    """Íntegro e, se for recorte, cobrindo a região inteira (senão o catálogo o serviria como válido)."""
+    if not arquivo_valido(path):
+        return False
+    regiao = _regiao_do_arquivo(path)
+    return regiao is None or cobre_regiao(path, regiao)
+
+def _regioes_aceitas(regiao) -> Tuple[str, ...]:
+    """Granules que servem para a região: o global ('') e o recorte dela."""
+    return ("", regiao.nome) if regiao is not None else ("",)
+
+def _regiao_download(pontos):
+    if GLDAS_TILES_ENABLE:
+        # todos no mesmo tile → baixa já recortado nele; espalhados → global (recortado na ingestão)
+        tiles = {tile_de(lat, lon) for lat, lon in pontos}
+        return Regiao(*tiles.pop()) if GLDAS_OTF_SUBSET and len(tiles) == 1 else None
+    # o cubo Zarr é global (grade fixa) → granules recortados não entram nele
+    return None if GLDAS_CUBE_ENABLE else regiao_para(pontos)
+
+def download_gldas(links: list[str], out_dir: Path, max_files: int,
+                   workers: int = DOWNLOAD_WORKERS, regiao=None) -> int:
+    out_dir.mkdir(parents=True, exist_ok=True)
+    # só o delta: passos que ainda não têm granule válido no disco
+    cat = _catalogo(out_dir)
+    if cat is not None:
+        pendentes = cat.faltantes(links, _instante_link, _regioes_aceitas(regiao))
+        contar("granulos_no_disco", len(links) - len(pendentes))
+        contar("granulos_faltando", len(pendentes))
+        if len(pendentes) < len(links):
+            print(f"🗃️ {len(links) - len(pendentes)} de {len(links)} granule(s) já no disco; baixando {len(pendentes)}.")
+        links = pendentes
     total = len(links) if max_files == 0 else min(max_files, len(links))
-    count = 0
-    for raw_url in links[:total]:
+    if not total:
+        return 0
+
+    # Auth via earthaccess (EARTHDATA_* no .env ou ~/.netrc); import pesado → só aqui
+    import earthaccess as ea
+    ea.login(strategy="environment", persist=True)
+    sess = preparar_sessao(ea.get_requests_https_session(), workers)
+    limiter = RateLimiter(DOWNLOAD_RATE)   # por host, no lugar do sleep fixo
+    baixados = [0]                         # bytes recebidos (todas as threads do pool)
+    trava_bytes = threading.Lock()
+
+    def _baixa_um(raw_url: str) -> int:
         url = prefer_data_host(fix_gldas_url(raw_url))
-        dest_name = derive_dest_name(url)
+        # pede só a região/variáveis (OTF: BBOX/VARIABLES; link direto: OPeNDAP com restrição)
+        pedido = reescrever_url(url, GLDAS_VARS, regiao, celula_borda)
+        dest_name = nome_destino(derive_dest_name(url), regiao if pedido != url else None)
         dest = out_dir / dest_name
+        recorte = regiao if pedido != url else None
         if dest.exists():
-            print(f"✅ Já existe: {dest.name}")
-            continue
+            if arquivo_valido(dest):
+                if recorte is None or cobre_regiao(dest, recorte):
+                    print(f"✅ Já existe: {dest.name}")
+                    if cat is not None:
+                        cat.registrar(dest)
+                    return 0
+                print(f"♻️ Recorte não cobre a região {recorte.nome}, descartando: {dest.name}")
+                dest.unlink(missing_ok=True)
+            # truncado (ex.: crash de versões antigas) → baixar_arquivo o retoma como .part (com a trava)
+            print(f"♻️ Incompleto, retomando: {dest.name}")
 
         print(f"⬇️ Baixando (OTF): {dest.name}")
         try:
-            r = sess.get(url, stream=True, allow_redirects=True, timeout=300)
-            if r.status_code >= 400:
-                r.close()
-                qs = parse_qs(urlparse(url).query)
-                fn = (qs.get("FILENAME") or qs.get("filename") or [None])[0]
-                if not fn:
-                    raise requests.HTTPError(f"OTF {r.status_code} e sem FILENAME para fallback.")
-                direct = "https://data.gesdisc.earthdata.nasa.gov" + fn
-                dest = out_dir / derive_dest_name(direct, for_direct=True)
-                print(f"   ↪ OTF {r.status_code}. Tentando direto: {direct}")
-                r = sess.get(direct, stream=True, allow_redirects=True, timeout=600)
-
-            r.raise_for_status()
-            with open(dest, "wb") as f:
-                for chunk in r.iter_content(1024 * 1024):
-                    if chunk:
-                        f.write(chunk)
+            try:
+                n = baixar_arquivo(sess, pedido, dest, limiter, timeout=300)
+                if recorte is not None and not cobre_regiao(dest, recorte):
+                    dest.unlink(missing_ok=True)
+                    raise requests.HTTPError(f"recorte não cobre a região {recorte.nome}")
+            except requests.HTTPError as e:
+                status = getattr(e.response, "status_code", "?")
+                if pedido != url and "HTTP_services.cgi" not in url:
+                    # OPeNDAP recusou → granule inteiro pelo link original
+                    direct = url
+                    dest = out_dir / derive_dest_name(url)
+                else:
+                    qs = parse_qs(urlparse(url).query)
+                    fn = (qs.get("FILENAME") or qs.get("filename") or [None])[0]
+                    if not fn:
+                        raise requests.HTTPError(f"OTF {status} e sem FILENAME para fallback.")
+                    direct = "https://data.gesdisc.earthdata.nasa.gov" + fn
+                    dest = out_dir / derive_dest_name(direct, for_direct=True)
+                print(f"   ↪ HTTP {status}. Tentando direto: {direct}")
+                n = 0
+                if not (dest.exists() and arquivo_valido(dest)):
+                    n = baixar_arquivo(sess, direct, dest, limiter, timeout=600)
+            with trava_bytes:
+                baixados[0] += n or 0
+            if cat is not None:
+                cat.registrar(dest)
             print(f"✔ Concluído: {dest.name}")
-            count += 1
+            return 1
         except Exception as e:
             print(f"⚠️ Falha em {dest_name}: {e}")
-        finally:
-            try: r.close()
-            except: pass
-        time.sleep(0.5)
+            return 0
 
+    count = executar_pool(links[:total], _baixa_um, workers=workers)
+    contar("arquivos_baixados", count)
+    contar("bytes_baixados", baixados[0])
     print(f"🛰️ Total baixado nesta execução: {count}")
+    if cat is not None and count and RAW_CACHE_MAX_GB > 0:
+        contar("bytes_despejados", cat.despejar(int(RAW_CACHE_MAX_GB * 1e9))["bytes"])
     return count
 
 # ===================== GLDAS 3h -> diário (ponto) =====================
@@ -261,7 +420,45 @@ def list_nc4(paths: Sequence[str|Path] | str | Path) -> list[str]:
         files = [str(Path(x)) for x in paths if Path(x).exists()]
     return [f for f in files if f.lower().endswith(".nc4")]
 
+def data_do_arquivo(path: str|Path) -> Optional[datetime]:
+    """Data/hora (UTC) do passo GLDAS a partir do nome do .nc4 (…A20200630.0900…)."""
+    m = re.search(r"A(\d{4})(\d{2})(\d{2})\.(\d{2})(\d{2})", Path(str(path).replace("\\", "/")).name)
+    if not m:
+        return None
+    y, mo, da, hh, mm = map(int, m.groups())
+    return datetime(y, mo, da, hh, mm)
+
+def usando_raw(raw_dir: Path, datas):
+    """Fixa os dias no cache raw enquanto são baixados/abertos (o despejo não os apaga)."""
+    cat = _catalogo(raw_dir)
+    return cat.usando(datas) if cat is not None else contextlib.nullcontext()
+
+def arquivos_por_dia(raw_dir: Path, datas, regiao=None) -> Dict[Any, List[str]]:
+    """{dia: [.nc4]} só das datas pedidas — pelo catálogo ou, sem ele, varrendo o diretório."""
+    aceitas = _regioes_aceitas(regiao)
+    cat = _catalogo(raw_dir)
+    if cat is not None:
+        return cat.arquivos_por_dia(datas, aceitas)
+    datas = set(datas)
+    cands = []
+    for f in list_nc4(raw_dir):
+        dt = data_do_arquivo(f)
+        reg = regiao_do_nome(f)
+        if dt is not None and dt.date() in datas and reg in aceitas:
+            cands.append((reg == "", f, dt))
+    # como o catálogo: um arquivo por passo (recorte antes do global) e só os válidos
+    # → o global e o recorte do mesmo instante não entram os dois (chuva somada em dobro)
+    por_dia: Dict[Any, List[str]] = {}
+    vistos = set()
+    for _, f, dt in sorted(cands):
+        if dt in vistos or not _granulo_valido(Path(f)):
+            continue
+        vistos.add(dt)
+        por_dia.setdefault(dt.date(), []).append(f)
+    return por_dia
+
 def open_many(files: Sequence[str|Path]) -> xr.Dataset:
+    import xarray as xr
     files = list_nc4(files)
     if not files:
         raise FileNotFoundError("Nenhum .nc4 disponível.")
@@ -377,6 +574,37 @@ def _indice_atividade(temp_c: float | None, chuva_mm: float | None, vento_kmh: f
     return int(score)
 
 def process_gldas_to_daily(files, lat, lon) -> pd.DataFrame:
+    # tile: recorta os granules novos no tile do ponto e lê a célula dele
+    if GLDAS_TILES_ENABLE:
+        try:
+            nc4 = list_nc4(files)
+            tile = tile_de(lat, lon)
+            ingerir_tiles(nc4, GLDAS_TILES_DIR, [tile], chave=nome_global)
+            datas = {d.date() for d in map(data_do_arquivo, nc4) if d}
+            df3h = ler_ponto_cubo(caminho_tile(GLDAS_TILES_DIR, tile), lat, lon, datas=datas or None)
+            if not df3h.empty:
+                return agregar_diario(df3h)
+        except (ImportError, ValueError, KeyError, OSError) as e:
+            print(f"⚠️ Tiles GLDAS indisponíveis ({e}); lendo os .nc4.")
+    # cubo: anexa os granules novos e lê a série da célula numa leitura contígua
+    elif GLDAS_CUBE_ENABLE:
+        try:
+            nc4 = list_nc4(files)
+            ingerir_granulos(nc4, GLDAS_CUBE)
+            datas = {d.date() for d in map(data_do_arquivo, nc4) if d}
+            df3h = ler_ponto_cubo(GLDAS_CUBE, lat, lon, datas=datas or None)
+            if not df3h.empty:
+                return agregar_diario(df3h)
+        except (ImportError, ValueError, KeyError, OSError) as e:
+            print(f"⚠️ Cubo GLDAS indisponível ({e}); lendo os .nc4.")
+
+    # caminho rápido: lê só a célula (i, j) de cada .nc4 (netCDF4 + pool de processos)
+    if POINT_EXTRACT_ENABLE:
+        try:
+            return agregar_diario(extrair_ponto(list_nc4(files), lat, lon))
+        except ImportError:
+            pass   # sem netCDF4 → caminho xarray abaixo
+
     K2C       = lambda x: x - 273.15
     MS2KMH    = lambda x: x * 3.6
     KGm2S2MMH = lambda x: x * 3600.0  # kg m-2 s-1 -> mm/h
@@ -385,6 +613,7 @@ def process_gldas_to_daily(files, lat, lon) -> pd.DataFrame:
     ds = open_many(files)
     ds = subset_point(ds, lat, lon).load()
 
+    import xarray as xr
     out = xr.Dataset()
     if "Tair_f_inst"  in ds: out["temp_c"]       = K2C(ds["Tair_f_inst"])
     if "Wind_f_inst"  in ds: out["wind_kmh"]     = MS2KMH(ds["Wind_f_inst"])
@@ -430,76 +659,147 @@ def process_gldas_to_daily(files, lat, lon) -> pd.DataFrame:
     return df.set_index("date")
 
 # ===================== Climatologia (GLDAS) + fallback ERA5 =====================
-def climatologia(df_daily: pd.DataFrame, target_date: str,
-                 anos=(2020,2021,2022,2023,2024), janela=1) -> Dict[str,Any]:
-    tg = pd.to_datetime(target_date)
-    rows = []
-    for y in anos:
-        base = tg.replace(year=y)
-        for d in range(-janela, janela+1):
-            day = (base + pd.Timedelta(days=d)).date()
-            if day in df_daily.index:
-                rows.append(df_daily.loc[[day]])
-    if not rows:
-        return {"ok": False, "msg": "Sem dados históricos nessa janela."}
-    base = pd.concat(rows)
+HIST_COLS = ["temp_mean_c", "temp_min_c", "temp_max_c", "wind_mean_kmh", "rain_mm_day",
+             "rh_mean_pct", "pressure_mean_hpa", "solar_mean_wm2"]
 
+def _faixa_anos(anos) -> str:
+    anos = sorted(int(a) for a in anos)
+    if not anos:
+        return "—"
+    return str(anos[0]) if anos[0] == anos[-1] else f"{anos[0]}–{anos[-1]}"
+
+def _hist_de_estatisticas(est: Dict[str, Dict[str, Any]], amostra: int, janela: int, anos=HIST_ANOS) -> Dict[str,Any]:
+    """Dict de climatologia (stats por coluna + resumo) a partir de {coluna: {mean, p25, …}}; usado também pelo lote."""
     def stats(col):
-        if col not in base: return None
-        s = pd.to_numeric(base[col], errors="coerce").dropna()
-        if s.empty: return None
-        return {"mean": float(s.mean()), "p25": float(s.quantile(0.25)),
-                "p50": float(s.quantile(0.5)), "p75": float(s.quantile(0.75)),
-                "min": float(s.min()), "max": float(s.max()), "n": int(s.shape[0])}
+        e = est.get(col)
+        if not e or not e.get("n"): return None
+        return {"mean": float(e["mean"]), "p25": float(e["p25"]), "p50": float(e["p50"]),
+                "p75": float(e["p75"]), "min": float(e["min"]), "max": float(e["max"]), "n": int(e["n"])}
 
-    out = {
-        "ok": True,
-        "amostra": int(base.shape[0]),
-        "temp_mean_c":   stats("temp_mean_c"),
-        "temp_min_c":    stats("temp_min_c"),
-        "temp_max_c":    stats("temp_max_c"),
-        "wind_mean_kmh": stats("wind_mean_kmh"),
-        "rain_mm_day":   stats("rain_mm_day"),
-        "rh_mean_pct":   stats("rh_mean_pct"),
-        "pressure_mean_hpa": stats("pressure_mean_hpa"),
-        "solar_mean_wm2":    stats("solar_mean_wm2"),
-    }
+    out = {"ok": True, "amostra": int(amostra)}
+    out.update({c: stats(c) for c in HIST_COLS})
     pm = (out.get("rain_mm_day") or {}).get("mean", 0.0)
     tm = (out.get("temp_mean_c") or {}).get("mean", float("nan"))
     chuva_txt = "tende a ser seco" if pm < 1 else ("há chance de chuva" if pm < 20 else "chuva forte é comum")
     if not np.isnan(tm):
         temp_txt  = "bem quente" if tm >= 30 else ("quente" if tm >= 25 else ("frio" if tm <= 15 else "ameno"))
-        out["resumo"] = f"Histórico (2020–2024 ±{janela}d): {chuva_txt}; média {tm:.1f}°C ({temp_txt})."
+        out["resumo"] = f"Histórico ({_faixa_anos(anos)} ±{janela}d): {chuva_txt}; média {tm:.1f}°C ({temp_txt})."
     else:
-        out["resumo"] = f"Histórico (2020–2024 ±{janela}d): {chuva_txt}."
+        out["resumo"] = f"Histórico ({_faixa_anos(anos)} ±{janela}d): {chuva_txt}."
     return out
 
-def hist_fallback_era5_openmeteo(lat: float, lon: float, data_evento: str, janela:int=1,
-                                 anos=(2020,2021,2022,2023,2024)) -> Dict[str,Any]:
-    base_url = "https://archive-api.open-meteo.com/v1/era5"
-    rows = []
-    for y in anos:
-        target = pd.to_datetime(data_evento).replace(year=y)
-        start = (target - pd.Timedelta(days=janela)).date().isoformat()
-        end   = (target + pd.Timedelta(days=janela)).date().isoformat()
-        params = dict(
-            latitude=lat, longitude=lon, timezone="UTC",
-            start_date=start, end_date=end,
-            daily="temperature_2m_max,temperature_2m_min,precipitation_sum,wind_speed_10m_max"
-        )
+def climatologia(df_daily: pd.DataFrame, target_date: str,
+                 anos=HIST_ANOS, janela=1) -> Dict[str,Any]:
+    # um único filtro por máscara (datas-alvo de todos os anos) + uma passada de estatísticas
+    alvo = _datas_alvo(target_date, anos, janela)
+    dias = pd.DatetimeIndex(pd.to_datetime(df_daily.index)).normalize()
+    base = df_daily[dias.isin(alvo)]
+    if base.empty:
+        return {"ok": False, "msg": "Sem dados históricos nessa janela."}
+
+    cols = [c for c in HIST_COLS if c in base]
+    est: Dict[str, Dict[str, Any]] = {}
+    if cols:
+        num = base[cols].apply(pd.to_numeric, errors="coerce")
+        agg = num.agg(["mean", "min", "max", "count"])
+        q = num.quantile([0.25, 0.5, 0.75])
+        est = {c: {"mean": agg.at["mean", c], "p25": q.at[0.25, c], "p50": q.at[0.5, c], "p75": q.at[0.75, c],
+                   "min": agg.at["min", c], "max": agg.at["max", c], "n": agg.at["count", c]} for c in cols}
+    return _hist_de_estatisticas(est, base.shape[0], janela, anos)
+
+ERA5_URL = "https://archive-api.open-meteo.com/v1/era5"
+ERA5_DAILY = "temperature_2m_max,temperature_2m_min,precipitation_sum,wind_speed_10m_max"
+# série diária multi-ano por coordenada arredondada (grade ERA5 0.25°), em disco
+ERA5_CACHE_DIR  = Path(os.getenv("ERA5_CACHE_DIR", "") or (GLDAS_OUT_DIR / "era5_cache"))
+ERA5_CHUNK_ANOS = int(os.getenv("ERA5_CHUNK_ANOS", "10"))   # anos por requisição ao archive
+_ERA5_LOCK = threading.Lock()
+
+def _era5_params(lat: float, lon: float, inicio: str, fim: str) -> Dict[str,Any]:
+    return dict(latitude=lat, longitude=lon, timezone="UTC",
+                start_date=inicio, end_date=fim, daily=ERA5_DAILY)
+
+def _era5_coord(lat: float, lon: float) -> Tuple[float, float]:
+    return round(float(lat) * 4) / 4, round(float(lon) * 4) / 4
+
+def _era5_cache_path(lat_r: float, lon_r: float) -> Path:
+    return ERA5_CACHE_DIR / f"era5_{lat_r:+08.3f}_{lon_r:+09.3f}.csv"
+
+def _era5_ler_cache(lat_r: float, lon_r: float) -> pd.DataFrame:
+    p = _era5_cache_path(lat_r, lon_r)
+    if not p.is_file():
+        return pd.DataFrame()
+    try:
+        df = pd.read_csv(p)
+        df["date"] = pd.to_datetime(df["date"]).dt.date
+        return df
+    except Exception:
+        return pd.DataFrame()
+
+def _era5_blocos(anos: Sequence[int]) -> List[Tuple[str, str]]:
+    """Anos faltantes → faixas contíguas de até ERA5_CHUNK_ANOS anos (1 requisição cada)."""
+    hoje = datetime.utcnow().date()
+    blocos: List[Tuple[int, int]] = []
+    for y in sorted(set(anos)):
+        if blocos and y == blocos[-1][1] + 1 and y - blocos[-1][0] < max(1, ERA5_CHUNK_ANOS):
+            blocos[-1] = (blocos[-1][0], y)
+        else:
+            blocos.append((y, y))
+    out = []
+    for y0, y1 in blocos:
+        fim = min(datetime(y1, 12, 31).date(), hoje - timedelta(days=1))
+        if fim >= datetime(y0, 1, 1).date():
+            out.append((f"{y0}-01-01", fim.isoformat()))
+    return out
+
+def _era5_anos_completos(serie: pd.DataFrame, ano_atual: int) -> pd.DataFrame:
+    """Só anos encerrados com 31/12 preenchido (o ERA5 chega com ~5 dias de atraso → nulos no fim)."""
+    datas = pd.to_datetime(serie["date"])
+    cheio = serie.drop(columns=["date"]).apply(pd.to_numeric, errors="coerce").notna().all(axis=1).to_numpy()
+    fechados = {d.year for d, ok in zip(datas, cheio) if ok and d.month == 12 and d.day == 31 and d.year < ano_atual}
+    return serie[datas.dt.year.isin(fechados).to_numpy()]
+
+def _era5_planejar(lat: float, lon: float, data_evento: str, janela: int, anos):
+    """Datas da janela, série em cache e faixas que ainda precisam ser buscadas."""
+    datas = datas_janela(data_evento, janela, anos)
+    lat_r, lon_r = _era5_coord(lat, lon)
+    cache = _era5_ler_cache(lat_r, lon_r)
+    tem = set(pd.to_datetime(cache["date"]).dt.year) if not cache.empty else set()
+    ano_atual = datetime.utcnow().year
+    # ano corrente nunca fica "completo" no cache → sempre rebusca
+    faltam = sorted({d.year for d in datas if d.year not in tem or d.year >= ano_atual})
+    return datas, lat_r, lon_r, cache, _era5_blocos(faltam)
+
+def _era5_concluir(datas: set, lat_r: float, lon_r: float, cache: pd.DataFrame,
+                   novos: List[Optional[pd.DataFrame]], janela: int, anos) -> Dict[str,Any]:
+    """Junta cache + blocos novos, persiste anos completos e recorta a janela localmente."""
+    novos = [df for df in novos if df is not None and not df.empty]
+    serie = pd.concat([cache, *novos], ignore_index=True) if novos else cache
+    if serie.empty:
+        return _era5_climatologia([], janela, anos)
+    serie = serie.drop_duplicates("date", keep="last").sort_values("date")
+    if novos:
+        completos = _era5_anos_completos(serie, datetime.utcnow().year)
         try:
-            r = requests.get(base_url, params=params, timeout=30)
-            r.raise_for_status()
-            d = r.json().get("daily", {})
-            if not d:
-                continue
-            df = pd.DataFrame(d)
-            df["date"] = pd.to_datetime(df["time"]).dt.date
-            df = df.drop(columns=["time"])
-            rows.append(df)
-        except Exception:
-            continue
+            with _ERA5_LOCK:
+                ERA5_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+                p = _era5_cache_path(lat_r, lon_r)
+                tmp = p.with_name(p.name + ".tmp")
+                completos.to_csv(tmp, index=False)
+                os.replace(tmp, p)
+        except OSError:
+            pass
+    janela_df = serie[serie["date"].isin(datas)]
+    return _era5_climatologia([janela_df] if not janela_df.empty else [], janela, anos)
 
+def _era5_daily_df(jd: Dict[str,Any]) -> Optional[pd.DataFrame]:
+    d = jd.get("daily", {})
+    if not d:
+        return None
+    df = pd.DataFrame(d)
+    df["date"] = pd.to_datetime(df["time"]).dt.date
+    return df.drop(columns=["time"])
+
+def _era5_climatologia(rows: List[pd.DataFrame], janela: int, anos=HIST_ANOS) -> Dict[str,Any]:
     if not rows:
         return {"ok": False, "msg": "ERA5 (fallback) não retornou dados."}
 
@@ -521,17 +821,46 @@ def hist_fallback_era5_openmeteo(lat: float, lon: float, data_evento: str, janel
     pm = out["rain_mm_day"]["mean"]; tm = out["temp_mean_c"]["mean"]
     chuva_txt = "tende a ser seco" if pm < 1 else ("há chance de chuva" if pm < 20 else "chuva forte é comum")
     temp_txt  = "bem quente" if tm >= 30 else ("quente" if tm >= 25 else ("frio" if tm <= 15 else "ameno"))
-    out["resumo"] = f"Histórico (ERA5, 2020–2024 ±{janela}d): {chuva_txt}; média {tm:.1f}°C ({temp_txt})."
+    out["resumo"] = f"Histórico (ERA5, {_faixa_anos(anos)} ±{janela}d): {chuva_txt}; média {tm:.1f}°C ({temp_txt})."
     return out
 
+def hist_fallback_era5_openmeteo(lat: float, lon: float, data_evento: str, janela:int=1,
+                                 anos=HIST_ANOS) -> Dict[str,Any]:
+    """Série diária multi-ano (cache em disco + poucas requisições em blocos) → recorte local da janela."""
+    datas, lat_r, lon_r, cache, blocos = _era5_planejar(lat, lon, data_evento, janela, anos)
+    novos = []
+    for ini, fim in blocos:
+        try:
+            r = http_get("era5", ERA5_URL, params=_era5_params(lat_r, lon_r, ini, fim))
+            r.raise_for_status()
+            novos.append(_era5_daily_df(r.json()))
+        except Exception:
+            continue
+    return _era5_concluir(datas, lat_r, lon_r, cache, novos, janela, anos)
+
+async def hist_fallback_era5_openmeteo_async(lat: float, lon: float, data_evento: str, janela:int=1,
+                                             anos=HIST_ANOS) -> Dict[str,Any]:
+    """Igual a hist_fallback_era5_openmeteo, mas com os blocos buscados em paralelo."""
+    datas, lat_r, lon_r, cache, blocos = _era5_planejar(lat, lon, data_evento, janela, anos)
+
+    async def _bloco(client, ini: str, fim: str) -> Optional[pd.DataFrame]:
+        try:
+            r = await client.get(ERA5_URL, params=_era5_params(lat_r, lon_r, ini, fim))
+            r.raise_for_status()
+            return _era5_daily_df(r.json())
+        except Exception:
+            return None
+
+    client = cliente_async("era5")
+    novos = await asyncio.gather(*(_bloco(client, ini, fim) for ini, fim in blocos))
+    return await asyncio.to_thread(_era5_concluir, datas, lat_r, lon_r, cache, list(novos), janela, anos)
+
 # ===================== Previsão 7 dias (Google/Open-Meteo) =====================
-def forecast_google(lat: float, lon: float, days:int=7, timezone="auto") -> Dict[str,Any]:
-    key = GOOGLE_WEATHER_API_KEY
-    if not key:
-        return {"ok": False, "msg": "GOOGLE_WEATHER_API_KEY ausente; usando Open-Meteo."}
+GOOGLE_WEATHER_URL = "https://weather.googleapis.com/v1/weather:forecast"
+OPENMETEO_URL      = "https://api.open-meteo.com/v1/forecast"
 
-    endpoint = "https://weather.googleapis.com/v1/weather:forecast"
-    params = {
+def _google_params(lat: float, lon: float, key: str) -> Dict[str,Any]:
+    return {
         "location": f"{lat},{lon}",
         "timesteps": "daily",
         "units": "metric",
@@ -542,41 +871,76 @@ def forecast_google(lat: float, lon: float, days:int=7, timezone="auto") -> Dict
         ]),
         "key": key,
     }
+
+def _google_parse(data: Dict[str,Any]) -> Dict[str,Any]:
+    daily = []
+    for d in (data.get("dailyForecasts", []) or data.get("daily", [])):
+        daily.append({
+            "date": d.get("date") or d.get("time"),
+            "tmax": d.get("temperatureMax"),
+            "tmin": d.get("temperatureMin"),
+            "humidity_mean": d.get("humidityAvg"),
+            "visibility_km": d.get("visibilityAvg"),
+            "precip_mm": d.get("precipitationAmount"),
+            "wind_max": d.get("windSpeedMax"),
+            "apparent_max": d.get("apparentTemperatureMax"),
+            "provider": "google",
+        })
+    if not daily:
+        return {"ok": False, "msg": "Google Weather sem 'daily'. Fallback Open-Meteo."}
+    return {"ok": True, "daily": daily, "provider": "google"}
+
+def _google_resposta(cb, t0: float, status: int, raise_for_status, json_) -> Dict[str,Any]:
+    """Resposta HTTP do Google → resultado + registro no disjuntor (403 abre na hora)."""
+    if status == 403:
+        cb.falha(time.perf_counter() - t0, "HTTP 403", abrir=True)
+        return {"ok": False, "msg": "Google Weather não habilitado (403). Fallback Open-Meteo."}
+    raise_for_status()
+    out = _google_parse(json_())
+    cb.sucesso(time.perf_counter() - t0)
+    return out
+
+def forecast_google(lat: float, lon: float, days:int=7, timezone="auto") -> Dict[str,Any]:
+    key = GOOGLE_WEATHER_API_KEY
+    if not key:
+        return {"ok": False, "msg": "GOOGLE_WEATHER_API_KEY ausente; usando Open-Meteo."}
+    cb = disjuntor("google")
+    if not cb.permitir():
+        return {"ok": False, "msg": "Google Weather em circuito aberto; usando Open-Meteo."}
+    t0 = time.perf_counter()
     try:
-        r = requests.get(endpoint, params=params, timeout=20)
-        if r.status_code == 403:
-            return {"ok": False, "msg": "Google Weather não habilitado (403). Fallback Open-Meteo."}
-        r.raise_for_status()
-        data = r.json()
-        daily = []
-        for d in (data.get("dailyForecasts", []) or data.get("daily", [])):
-            daily.append({
-                "date": d.get("date") or d.get("time"),
-                "tmax": d.get("temperatureMax"),
-                "tmin": d.get("temperatureMin"),
-                "humidity_mean": d.get("humidityAvg"),
-                "visibility_km": d.get("visibilityAvg"),
-                "precip_mm": d.get("precipitationAmount"),
-                "wind_max": d.get("windSpeedMax"),
-                "apparent_max": d.get("apparentTemperatureMax"),
-                "provider": "google",
-            })
-        if not daily:
-            return {"ok": False, "msg": "Google Weather sem 'daily'. Fallback Open-Meteo."}
-        return {"ok": True, "daily": daily, "provider": "google"}
+        r = http_get("google", GOOGLE_WEATHER_URL, params=_google_params(lat, lon, key))
+        return _google_resposta(cb, t0, r.status_code, r.raise_for_status, r.json)
     except Exception as e:
+        cb.falha(time.perf_counter() - t0, e)
         return {"ok": False, "msg": f"Google Weather falhou: {e}. Fallback Open-Meteo."}
 
-def forecast_openmeteo(lat: float, lon: float, days:int=7, timezone="auto") -> Dict[str,Any]:
-    url = "https://api.open-meteo.com/v1/forecast"
-    params = dict(
+async def forecast_google_async(lat: float, lon: float, days:int=7, timezone="auto") -> Dict[str,Any]:
+    key = GOOGLE_WEATHER_API_KEY
+    if not key:
+        return {"ok": False, "msg": "GOOGLE_WEATHER_API_KEY ausente; usando Open-Meteo."}
+    cb = disjuntor("google")
+    if not cb.permitir():
+        return {"ok": False, "msg": "Google Weather em circuito aberto; usando Open-Meteo."}
+    t0 = time.perf_counter()
+    try:
+        r = await cliente_async("google").get(GOOGLE_WEATHER_URL, params=_google_params(lat, lon, key))
+        return _google_resposta(cb, t0, r.status_code, r.raise_for_status, r.json)
+    except Exception as e:
+        cb.falha(time.perf_counter() - t0, e)
+        return {"ok": False, "msg": f"Google Weather falhou: {e}. Fallback Open-Meteo."}
+    except BaseException:   # cancelada (CancelledError) → não prende o disjuntor em meio-aberto
+        cb.liberar()
+        raise
+
+def _openmeteo_params(lat: float, lon: float, days: int, timezone: str) -> Dict[str,Any]:
+    return dict(
         latitude=lat, longitude=lon, timezone=timezone, forecast_days=days,
         daily="temperature_2m_max,temperature_2m_min,precipitation_sum,precipitation_probability_mean,wind_speed_10m_max,apparent_temperature_max",
         hourly="relative_humidity_2m,visibility,apparent_temperature,temperature_2m,wind_speed_10m,precipitation"
     )
-    r = requests.get(url, params=params, timeout=30)
-    r.raise_for_status()
-    jd = r.json()
+
+def _openmeteo_parse(jd: Dict[str,Any]) -> Dict[str,Any]:
     d_d = jd.get("daily", {}); d_h = jd.get("hourly", {})
     if not d_d:
         return {"ok": False, "msg": "Sem dados diários do Open-Meteo."}
@@ -603,34 +967,107 @@ def forecast_openmeteo(lat: float, lon: float, days:int=7, timezone="auto") -> D
     for r_ in daily: r_["provider"] = "open-meteo"
     return {"ok": True, "daily": daily, "provider": "open-meteo"}
 
-def previsao_7_dias(lat: float, lon: float, days=7, timezone="auto") -> Dict[str,Any]:
+def forecast_openmeteo(lat: float, lon: float, days:int=7, timezone="auto") -> Dict[str,Any]:
+    cb = disjuntor("openmeteo")
+    if not cb.permitir():
+        raise RuntimeError("Open-Meteo em circuito aberto.")
+    t0 = time.perf_counter()
+    try:
+        r = http_get("openmeteo", OPENMETEO_URL, params=_openmeteo_params(lat, lon, days, timezone))
+        r.raise_for_status()
+        jd = r.json()
+    except Exception as e:
+        cb.falha(time.perf_counter() - t0, e)
+        raise
+    cb.sucesso(time.perf_counter() - t0)
+    return _openmeteo_parse(jd)
+
+async def forecast_openmeteo_async(lat: float, lon: float, days:int=7, timezone="auto") -> Dict[str,Any]:
+    cb = disjuntor("openmeteo")
+    if not cb.permitir():
+        raise RuntimeError("Open-Meteo em circuito aberto.")
+    t0 = time.perf_counter()
+    try:
+        r = await cliente_async("openmeteo").get(OPENMETEO_URL, params=_openmeteo_params(lat, lon, days, timezone))
+        r.raise_for_status()
+        jd = r.json()
+    except Exception as e:
+        cb.falha(time.perf_counter() - t0, e)
+        raise
+    except BaseException:   # cancelada (CancelledError) → não prende o disjuntor em meio-aberto
+        cb.liberar()
+        raise
+    cb.sucesso(time.perf_counter() - t0)
+    return _openmeteo_parse(jd)
+
+def _previsao_7_dias(lat: float, lon: float, days=7, timezone="auto") -> Dict[str,Any]:
     g = forecast_google(lat, lon, days=days, timezone=timezone)
     if g.get("ok"): return g
     return forecast_openmeteo(lat, lon, days=days, timezone=timezone)
 
+async def _previsao_7_dias_async(lat: float, lon: float, days=7, timezone="auto") -> Dict[str,Any]:
+    g = await forecast_google_async(lat, lon, days=days, timezone=timezone)
+    if g.get("ok"): return g
+    return await forecast_openmeteo_async(lat, lon, days=days, timezone=timezone)
+
+# ---- cache da previsão (TTL + stale-while-revalidate) ----
+FORECAST_CACHE_ENABLE = os.getenv("FORECAST_CACHE_ENABLE", "true").lower() in ("1","true","yes","y")
+FORECAST_CACHE_GRID   = float(os.getenv("FORECAST_CACHE_GRID", "0.1"))     # graus (arredondamento da chave)
+FORECAST_TTL          = float(os.getenv("FORECAST_TTL", "1800"))           # s: resposta fresca
+FORECAST_STALE        = float(os.getenv("FORECAST_STALE", "21600"))        # s: serve velho e revalida
+FORECAST_FALLBACK_TTL = float(os.getenv("FORECAST_FALLBACK_TTL", "300"))   # s: fallback Open-Meteo com chave Google
+FORECAST_CACHE_DB     = os.getenv("FORECAST_CACHE_DB", "").strip()         # SQLite opcional (vazio = só memória)
+
+def _ttl_previsao(v: Dict[str,Any]) -> float:
+    # com chave Google, o Open-Meteo é fallback: vale pouco, p/ o Google ser consultado de novo logo
+    if GOOGLE_WEATHER_API_KEY and v.get("provider") != "google":
+        return FORECAST_FALLBACK_TTL
+    return FORECAST_TTL
+
+_PREV_CACHE = CacheTTL(FORECAST_TTL, FORECAST_STALE, int(os.getenv("FORECAST_CACHE_SIZE", "2048")),
+                       db=Path(FORECAST_CACHE_DB) if FORECAST_CACHE_DB else None,
+                       ao_consultar=lambda estado: contar(f"previsao_cache_{estado}"),
+                       ttl_de=_ttl_previsao, nome="previsão")
+
+def _chave_previsao(lat: float, lon: float, days: int, timezone: str) -> Tuple[Tuple, float, float]:
+    """Chave do cache + coordenada arredondada (a busca usa a mesma coordenada da chave).
+    O provedor da chave é o preferido; quem respondeu de fato (provider) define o TTL (_ttl_previsao)."""
+    g = FORECAST_CACHE_GRID if FORECAST_CACHE_GRID > 0 else 0.01
+    lat_r = round(round(float(lat) / g) * g, 4)
+    lon_r = round(round(float(lon) / g) * g, 4)
+    provedor = "google" if GOOGLE_WEATHER_API_KEY else "open-meteo"
+    return (lat_r, lon_r, int(days), str(timezone), provedor), lat_r, lon_r
+
+def previsao_7_dias(lat: float, lon: float, days=7, timezone="auto") -> Dict[str,Any]:
+    if not FORECAST_CACHE_ENABLE:
+        return _previsao_7_dias(lat, lon, days=days, timezone=timezone)
+    chave, lat_r, lon_r = _chave_previsao(lat, lon, days, timezone)
+    return _PREV_CACHE.obter(chave, lambda: _previsao_7_dias(lat_r, lon_r, days=days, timezone=timezone))
+
+async def previsao_7_dias_async(lat: float, lon: float, days=7, timezone="auto") -> Dict[str,Any]:
+    if not FORECAST_CACHE_ENABLE:
+        return await _previsao_7_dias_async(lat, lon, days=days, timezone=timezone)
+    chave, lat_r, lon_r = _chave_previsao(lat, lon, days, timezone)
+    return await _PREV_CACHE.obter_async(chave, lambda: _previsao_7_dias_async(lat_r, lon_r, days=days, timezone=timezone))
+
 # ===================== IA local via Ollama (opcional) =====================
-def _ollama_run(model: str, prompt: str, host: str = OLLAMA_HOST, timeout: int = 30) -> str:
+def _ollama_run(model: str, prompt: str, host: str = OLLAMA_HOST, timeout: Optional[float] = None,
+                opcoes: Optional[Dict[str,Any]] = None) -> str:
     """
-    Chama o Ollama via CLI, decodificando a saída como UTF-8 (seguro no Windows).
+    Gera via HTTP (/api/generate) com sessão persistente e keep_alive (ollama_client.py):
+    o modelo fica carregado e cada chamada não paga fork do CLI nem warm-up.
     """
-    cmd = f'ollama run {shlex.quote(model)} {shlex.quote(prompt)}'
     try:
-        proc = subprocess.run(
-            cmd,
-            shell=True,
-            capture_output=True,
-            text=False,  # lê bytes
-            timeout=timeout,
-            env={**os.environ, "OLLAMA_HOST": host},
-        )
-        stdout = (proc.stdout or b"").decode("utf-8", errors="replace")
-        stderr = (proc.stderr or b"").decode("utf-8", errors="replace")
-        if proc.returncode != 0:
-            raise RuntimeError(stderr.strip() or "Falha desconhecida no Ollama.")
-        return stdout.strip()
+        return cliente_ollama(host).gerar(model, prompt, timeout=timeout, opcoes=opcoes)
     except Exception as e:
         return f"[Ollama erro] {e}"
 
+# cache das recomendações da IA (LRU + SQLite opcional); só respostas interpretáveis entram
+_LLM_CACHE = CacheTTL(LLM_CACHE_TTL, 0, LLM_CACHE_SIZE, db=Path(LLM_CACHE_DB) if LLM_CACHE_DB else None,
+                      valido=lambda v: isinstance(v, dict) and "ok" in v,
+                      ao_consultar=lambda estado: contar(f"ia_cache_{estado}"), nome="IA")
+_LLM_EM_VOO = SingleFlight()
+
 def _pega_prev_no_dia(prev: Optional[Dict[str,Any]], data_evento: str) -> Optional[Dict[str,Any]]:
     if not prev or not prev.get("ok"): return None
     try:
@@ -697,6 +1134,70 @@ def _mensagem_deterministica(hist: dict, prev: dict | None, data_evento: str,
     partes.append("Looks good! 👍" if det.get("ok") else "Consider a plan B.")
     return "".join(partes).strip()
 
+# instruções seguem em pt-br (dev/log), mas pedimos saída em inglês
+_IA_REGRAS = (
+    "Regras ok=false: (prob_chuva>=50 ou chuva_mm>=10) OU (tmax>=35 ou sensacao_max>=35) "
+    "OU (vento_max>=40) OU (vis_km<=5). Se pet_name existir e envolver passeio/corrida, seja mais cauteloso com calor. "
+    "A 'mensagem' deve ser EM INGLÊS, natural e útil ao usuário, citando temperatura e chuva quando relevante."
+)
+
+def _interpretar_ia(obj: Any) -> Optional[Dict[str,Any]]:
+    """Objeto JSON do modelo → {ok, motivo, mensagem}; None se não servir (não entra no cache)."""
+    if not isinstance(obj, dict) or "ok" not in obj:
+        return None
+    ok = bool(obj.get("ok"))
+    motivo = " ".join(str(obj.get("motivo","")).split()[:8]).strip() or ("favorable conditions" if ok else "unfavorable conditions")
+    mensagem = str(obj.get("mensagem","")).strip()
+    if len(mensagem) > 220:
+        mensagem = mensagem[:220].rstrip()
+    return {"ok": ok, "motivo": motivo, "mensagem": mensagem}
+
+def _gerar_ia_um(model: str, contexto: Dict[str,Any]) -> Optional[Dict[str,Any]]:
+    instrucoes = (
+        "Responda SOMENTE com um JSON de UM objeto (sem texto extra), assim:\n"
+        '{"ok": true|false, "motivo": "up to 8 words", "mensagem": "up to 220 characters in ENGLISH"}\n'
+        + _IA_REGRAS
+    )
+    prompt = (
+        f"INSTRUCOES:\n{instrucoes}\n\n"
+        f"CONTEXTO:\n{json.dumps(contexto, ensure_ascii=False, default=str)}\n\n"
+        "RESPOSTA:"
+    )
+    raw = (_ollama_run(model, prompt) or "").strip().strip("`").strip()
+    m = re.search(r"\{[^{}]*\}", raw, flags=re.S)
+    if not m:
+        return None
+    try:
+        return _interpretar_ia(json.loads(m.group(0)))
+    except Exception:
+        return None
+
+def _gerar_ia_lote(model: str, contextos: List[Dict[str,Any]]) -> List[Optional[Dict[str,Any]]]:
+    """
+    Vários contextos de uma vez: um prompt com itens numerados (LLM_BATCH_MODE=prompt) ou
+    chamadas em paralelo (parallel). Item ausente/ilegível → None → fallback determinístico dele.
+    """
+    n = len(contextos)
+    if n == 1:
+        return [_gerar_ia_um(model, contextos[0])]
+    if LLM_BATCH_MODE == "parallel":
+        with ThreadPoolExecutor(max_workers=min(n, max(1, LLM_BATCH_CONCURRENCY))) as ex:
+            return list(ex.map(lambda c: _gerar_ia_um(model, c), contextos))
+    instrucoes = (
+        f"Para CADA um dos {n} itens abaixo, avalie o evento. Responda SOMENTE com um JSON (sem texto extra), assim:\n"
+        '{"itens": [{"id": <id do item>, "ok": true|false, "motivo": "up to 8 words", '
+        '"mensagem": "up to 220 characters in ENGLISH"}, ...]}\n'
+        + _IA_REGRAS
+    )
+    itens = "\n".join(json.dumps({"id": k, **c}, ensure_ascii=False, default=str) for k, c in enumerate(contextos))
+    prompt = f"INSTRUCOES:\n{instrucoes}\n\nITENS:\n{itens}\n\nRESPOSTA:"
+    raw = _ollama_run(model, prompt, timeout=OLLAMA_TIMEOUT * min(n, 4),
+                      opcoes={"num_predict": OLLAMA_NUM_PREDICT * n})
+    return [_interpretar_ia(o) for o in demultiplexar(raw, n)]
+
+# pedidos concorrentes (ex.: avaliar_eventos_lote) → um lote por modelo dentro da janela
+_AGRUPADOR_IA = AgrupadorLLM(_gerar_ia_lote)
+
 def gerar_recomendacao_contextual_ollama(
     hist: Dict[str,Any],
     prev: Optional[Dict[str,Any]],
@@ -735,40 +1236,22 @@ def gerar_recomendacao_contextual_ollama(
         "previsao_dia": item_prev or {},
     }
 
-    # instruções seguem em pt-br (dev/log), mas pedimos saída em inglês
-    instrucoes = (
-        "Responda SOMENTE com um JSON de UM objeto (sem texto extra), assim:\n"
-        '{"ok": true|false, "motivo": "up to 8 words", "mensagem": "up to 220 characters in ENGLISH"}\n'
-        "Regras ok=false: (prob_chuva>=50 ou chuva_mm>=10) OU (tmax>=35 ou sensacao_max>=35) "
-        "OU (vento_max>=40) OU (vis_km<=5). Se pet_name existir e envolver passeio/corrida, seja mais cauteloso com calor. "
-        "A 'mensagem' deve ser EM INGLÊS, natural e útil ao usuário, citando temperatura e chuva quando relevante."
-    )
+    def _gerar() -> Optional[Dict[str,Any]]:
+        if LLM_BATCH_ENABLE:
+            return _AGRUPADOR_IA.pedir(model, contexto, timeout=OLLAMA_TIMEOUT * 5)
+        return _gerar_ia_um(model, contexto)
 
-    prompt = (
-        f"INSTRUCOES:\n{instrucoes}\n\n"
-        f"CONTEXTO:\n{json.dumps(contexto, ensure_ascii=False)}\n\n"
-        "RESPOSTA:"
-    )
-
-    raw = _ollama_run(model, prompt)
-    raw = (raw or "").strip().strip("`").strip()
-
-    import re as _re, json as _json
-    m = _re.search(r"\{[^{}]*\}", raw, flags=_re.S)
-    if not m:
-        return _deterministico_ok_motivo_msg()
-    try:
-        obj = _json.loads(m.group(0))
-        ok = bool(obj.get("ok"))
-        motivo = " ".join(str(obj.get("motivo","")).split()[:8]).strip() or ("favorable conditions" if ok else "unfavorable conditions")
-        mensagem = str(obj.get("mensagem","")).strip()
-        if len(mensagem) > 220:
-            mensagem = mensagem[:220].rstrip()
-        if not mensagem:
-            mensagem = _mensagem_deterministica(hist, prev, data_evento, evento_tipo, person_name, pet_name)
-        return {"ok": ok, "motivo": motivo, "mensagem": mensagem}
-    except Exception:
+    # contexto idêntico (números em faixas) + mesmo modelo → reaproveita a geração
+    if LLM_CACHE_ENABLE:
+        chave = chave_contexto(contexto, model)
+        out = _LLM_CACHE.obter(chave, lambda: _LLM_EM_VOO.do(chave, _gerar))
+    else:
+        out = _gerar()
+    if not out:
         return _deterministico_ok_motivo_msg()
+    if not out["mensagem"]:
+        out["mensagem"] = _mensagem_deterministica(hist, prev, data_evento, evento_tipo, person_name, pet_name)
+    return out
 
 # ======== decisão binária ultra-curta ========
 def decide_passeio_curto(hist: dict, prev: dict | None, data_evento: str, evento_tipo: str = "passeio"):
@@ -806,13 +1289,14 @@ def decisao_binaria_evento(hist, prev, data_evento, evento_tipo="", person_name=
     if OLLAMA_ENABLE:
         try:
             pet_safe = (pet_name or PET_NAME) if MENTION_PET else ""
-            out_ai = gerar_recomendacao_contextual_ollama(
-                hist, prev, data_evento,
-                evento_tipo=evento_tipo or EVENT_TYPE,
-                person_name=person_name or PERSON_NAME,
-                pet_name=pet_safe,
-                model=OLLAMA_MODEL
-            )
+            with etapa("ia"):
+                out_ai = gerar_recomendacao_contextual_ollama(
+                    hist, prev, data_evento,
+                    evento_tipo=evento_tipo or EVENT_TYPE,
+                    person_name=person_name or PERSON_NAME,
+                    pet_name=pet_safe,
+                    model=OLLAMA_MODEL
+                )
             if isinstance(out_ai, dict) and "ok" in out_ai and "motivo" in out_ai:
                 # motivo já em EN, mensagem em EN
                 payload = {"ok": bool(out_ai.get("ok")), "motivo": str(out_ai.get("motivo","")).strip()[:120]}
@@ -1349,48 +1833,173 @@ def gerar_recomendacao_texto(hist: dict, prev: dict | None, data_evento: str, cu
     return " ".join(x for x in linhas if x).strip() or "Not enough data for a recommendation."
 
 # ===================== Orquestração =====================
-def avaliar_evento(lat: float, lon: float, data_evento: str,
-                   subset_txt: Path = SUBSET_FILE,
-                   gldas_raw_dir: Path = GLDAS_RAW_DIR,
-                   max_files:int = MAX_FILES,
-                   janela_hist:int = 1,
-                   anos_hist= (2020,2021,2022,2023,2024),
-                   timezone:str = TIMEZONE,
-                   event_title: Optional[str] = None) -> Dict[str,Any]:
-    # 1) subset
-    txt = autodiscover_subset_file(subset_txt, DATA_DIR)
-
-    # 2) links + filtro
-    links_all = read_links_from_txt(txt)
-    links = filter_links_for_event_window(links_all, data_evento,
-                                          janela=janela_hist, anos=anos_hist)
+# avaliações idênticas concorrentes (mesma célula GLDAS/data/janela/anos) compartilham 1 cálculo
+COALESCE_ENABLE = os.getenv("COALESCE_ENABLE", "true").lower() in ("1","true","yes","y")
+_EM_VOO = SingleFlight()
+
+def _chave_avaliacao(lat: float, lon: float, data_evento: str, janela_hist: int, anos_hist,
+                     timezone: str, subset_txt: Path, gldas_raw_dir: Path, max_files: int) -> tuple:
+    return (snap_gldas_cell(lat, lon), str(pd.to_datetime(data_evento).date()), int(janela_hist),
+            tuple(int(a) for a in anos_hist), timezone, str(subset_txt), str(gldas_raw_dir), int(max_files))
+
+def _historico_gldas(lat: float, lon: float, data_evento: str,
+                     subset_txt: Path, gldas_raw_dir: Path, max_files: int,
+                     janela_hist: int, anos_hist) -> Dict[str,Any]:
+    """Passos 0–4: climatologia a partir do GLDAS (cache + .nc4 das datas que faltam)."""
+    datas = datas_janela(data_evento, janela_hist, anos_hist)
+    # 0) diários já calculados para esta célula (cache persistente)
+    store = DailyStore(GLDAS_STORE_FILE) if GLDAS_STORE_ENABLE else None
+    df_cache = store.get(lat, lon, datas) if store else pd.DataFrame()
+    faltando = {d for d in datas if d not in df_cache.index}
+    contar("store_dias_hit", len(datas) - len(faltando))
+    contar("store_dias_miss", len(faltando))
 
-    # 3) download
-    limite = len(links) if max_files == 0 else min(max_files, len(links))
-    download_gldas(links, gldas_raw_dir, max_files=limite)
-
-    # 4) GLDAS -> diário
-    files = list_nc4(gldas_raw_dir)
     hist: Dict[str, Any] = {"ok": False, "msg": "Sem dados GLDAS para a janela."}
-    if files:
+    df_daily = df_cache
+    if faltando:
+        # 1) subset
+        with etapa("subset"):
+            txt = autodiscover_subset_file(subset_txt, DATA_DIR)
+
+        # 2) links das datas que faltam no cache (índice pré-compilado do subset TXT)
+        with etapa("links"):
+            idx = carregar_indice(txt, read_links_from_txt, parse_y_doy_hhmm_from_url, derive_dest_name)
+            links = idx.links_para_datas(faltando)
+        print(f"🎯 Filtro (±{janela_hist}d, anos {anos_hist}): {len(links)} de {len(idx)} links mantidos.")
+
+        regiao = _regiao_download([(lat, lon)])
+        with usando_raw(gldas_raw_dir, faltando):
+            # 3) download (recortado na região de serviço que contém o ponto, se houver)
+            limite = len(links) if max_files == 0 else min(max_files, len(links))
+            with etapa("download"):
+                download_gldas(links, gldas_raw_dir, max_files=limite, regiao=regiao)
+
+            # 4) GLDAS -> diário (apenas os .nc4 das datas faltantes)
+            por_dia = arquivos_por_dia(gldas_raw_dir, faltando, regiao)
+            files = [f for fs in por_dia.values() for f in fs]
+            if files:
+                try:
+                    contar("arquivos_abertos", len(files))
+                    with etapa("gldas"):
+                        df_novo = process_gldas_to_daily(files, lat, lon)
+                    # resample preenche os buracos entre anos; fica só com dias que têm arquivo
+                    df_novo = df_novo[df_novo.index.isin(list(por_dia))]
+                    if store:
+                        # só persiste dias completos (8 passos de 3h)
+                        completos = [d for d, fs in por_dia.items() if len(fs) >= 8]
+                        store.put(lat, lon, df_novo, only_dates=completos)
+                    df_daily = pd.concat([df_cache, df_novo]) if not df_cache.empty else df_novo
+                except Exception as e:
+                    hist = {"ok": False, "msg": f"Falha ao processar GLDAS: {e}"}
+
+    if not df_daily.empty:
         try:
-            df_daily = process_gldas_to_daily(files, lat, lon)
-            hist = climatologia(df_daily, data_evento,
-                                anos=anos_hist, janela=janela_hist)
+            with etapa("climatologia"):
+                hist = climatologia(df_daily, data_evento,
+                                    anos=anos_hist, janela=janela_hist)
             if hist.get("ok"):
                 hist["fonte"] = "GLDAS/Earthdata"
         except Exception as e:
             hist = {"ok": False, "msg": f"Falha ao processar GLDAS: {e}"}
+    return hist
+
+def _historico_e_previsao(lat: float, lon: float, data_evento: str,
+                          subset_txt: Path, gldas_raw_dir: Path, max_files: int,
+                          janela_hist: int, anos_hist, timezone: str) -> Tuple[Dict[str,Any], Dict[str,Any]]:
+    """Passos 0–6 (pesados): climatologia GLDAS/ERA5 + previsão 7 dias."""
+    hist = _historico_gldas(lat, lon, data_evento, subset_txt, gldas_raw_dir, max_files, janela_hist, anos_hist)
 
     # 5) fallback histórico
     if not hist.get("ok"):
         print("… GLDAS insuficiente → usando fallback ERA5.")
-        hist = hist_fallback_era5_openmeteo(lat, lon, data_evento,
-                                            janela=janela_hist, anos=anos_hist)
+        with etapa("era5"):
+            hist = hist_fallback_era5_openmeteo(lat, lon, data_evento,
+                                                janela=janela_hist, anos=anos_hist)
+    anotar("fonte_historico", hist.get("fonte") or "indisponivel")
 
     # 6) Previsão 7 dias
-    prev = previsao_7_dias(lat, lon, days=7, timezone=timezone)
+    with etapa("previsao"):
+        prev = previsao_7_dias(lat, lon, days=7, timezone=timezone)
+    anotar("provedor_previsao", prev.get("provider") or "indisponivel")
+    return hist, prev
 
+def avaliar_evento(lat: float, lon: float, data_evento: str,
+                   subset_txt: Path = SUBSET_FILE,
+                   gldas_raw_dir: Path = GLDAS_RAW_DIR,
+                   max_files:int = MAX_FILES,
+                   janela_hist:int = 1,
+                   anos_hist=HIST_ANOS,
+                   timezone:str = TIMEZONE,
+                   event_title: Optional[str] = None,
+                   debug: bool = False) -> Dict[str,Any]:
+    # 0–6) histórico + previsão (coalescido por célula GLDAS/data/janela/anos)
+    args = (lat, lon, data_evento, subset_txt, gldas_raw_dir, max_files, janela_hist, anos_hist, timezone)
+    with avaliacao() as med:
+        if COALESCE_ENABLE:
+            chave = _chave_avaliacao(lat, lon, data_evento, janela_hist, anos_hist,
+                                     timezone, subset_txt, gldas_raw_dir, max_files)
+            hist, prev = _EM_VOO.do(chave, _historico_e_previsao, *args)
+        else:
+            hist, prev = _historico_e_previsao(*args)
+        res = _montar_resultado(lat, lon, data_evento, hist, prev, event_title)
+    # tempos por etapa/contadores desta avaliação (metrics.py)
+    if debug or METRICS_DEBUG:
+        res["debug"] = med.resumo()
+    return res
+
+async def _historico_e_previsao_async(lat: float, lon: float, data_evento: str,
+                                      subset_txt: Path, gldas_raw_dir: Path, max_files: int,
+                                      janela_hist: int, anos_hist, timezone: str) -> Tuple[Dict[str,Any], Dict[str,Any]]:
+    """Como _historico_e_previsao, mas o ramo histórico (GLDAS em thread → ERA5) e a previsão rodam juntos."""
+    async def _historico() -> Dict[str,Any]:
+        hist = await asyncio.to_thread(_historico_gldas, lat, lon, data_evento, subset_txt,
+                                       gldas_raw_dir, max_files, janela_hist, anos_hist)
+        if not hist.get("ok"):
+            print("… GLDAS insuficiente → usando fallback ERA5.")
+            with etapa("era5"):
+                hist = await hist_fallback_era5_openmeteo_async(lat, lon, data_evento,
+                                                                janela=janela_hist, anos=anos_hist)
+        anotar("fonte_historico", hist.get("fonte") or "indisponivel")
+        return hist
+
+    async def _previsao() -> Dict[str,Any]:
+        with etapa("previsao"):
+            prev = await previsao_7_dias_async(lat, lon, days=7, timezone=timezone)
+        anotar("provedor_previsao", prev.get("provider") or "indisponivel")
+        return prev
+
+    hist, prev = await asyncio.gather(_historico(), _previsao())
+    return hist, prev
+
+_EM_VOO_ASYNC = AsyncSingleFlight()
+
+async def avaliar_evento_async(lat: float, lon: float, data_evento: str,
+                               subset_txt: Path = SUBSET_FILE,
+                               gldas_raw_dir: Path = GLDAS_RAW_DIR,
+                               max_files:int = MAX_FILES,
+                               janela_hist:int = 1,
+                               anos_hist=HIST_ANOS,
+                               timezone:str = TIMEZONE,
+                               event_title: Optional[str] = None,
+                               debug: bool = False) -> Dict[str,Any]:
+    """Versão asyncio de avaliar_evento (mesmo payload); não bloqueia o event loop."""
+    args = (lat, lon, data_evento, subset_txt, gldas_raw_dir, max_files, janela_hist, anos_hist, timezone)
+    with avaliacao() as med:
+        if COALESCE_ENABLE:
+            chave = _chave_avaliacao(lat, lon, data_evento, janela_hist, anos_hist,
+                                     timezone, subset_txt, gldas_raw_dir, max_files)
+            hist, prev = await _EM_VOO_ASYNC.do(chave, _historico_e_previsao_async, *args)
+        else:
+            hist, prev = await _historico_e_previsao_async(*args)
+        # decisão pode chamar o Ollama (bloqueante) → thread
+        res = await asyncio.to_thread(_montar_resultado, lat, lon, data_evento, hist, prev, event_title)
+    if debug or METRICS_DEBUG:
+        res["debug"] = med.resumo()
+    return res
+
+def _montar_resultado(lat: float, lon: float, data_evento: str, hist: Dict[str,Any],
+                      prev: Dict[str,Any], event_title: Optional[str]) -> Dict[str,Any]:
+    """Passos 7–9 (por requisição): recomendação, contexto do título e decisão."""
     # 7) Recomendação determinística (string) — agora em EN/US
     texto = gerar_recomendacao_texto(hist, prev, data_evento, curto=True)
 
@@ -1420,6 +2029,282 @@ def avaliar_evento(lat: float, lon: float, data_evento: str,
         }
     }
 
+# ===================== Lote (muitos pontos/datas de uma vez) =====================
+LOTE_WORKERS = int(os.getenv("LOTE_WORKERS", "8"))   # previsões/fallbacks ERA5 em paralelo no lote
+def _extrair_celulas(files: List[str], celulas: List[Tuple[int,int]]) -> pd.DataFrame:
+    """Série 3h de várias células num único sel vetorizado (indexadores DataArray) → colunas ci, cj."""
+    alvo = pd.DatetimeIndex(sorted({pd.Timestamp(d.date()) for d in map(data_do_arquivo, files) if d}))
+    if GLDAS_TILES_ENABLE:
+        # granule aberto uma vez e recortado em todos os tiles do lote; cada tile responde às suas células
+        try:
+            por_tile: Dict[Any, List[Tuple[int,int]]] = {}
+            for c in celulas:
+                por_tile.setdefault(tile_de(*cell_center(*c)), []).append(c)
+            ingerir_tiles(files, GLDAS_TILES_DIR, list(por_tile), chave=nome_global)
+            partes = []
+            for tile, cels in por_tile.items():
+                ds = abrir_cubo(caminho_tile(GLDAS_TILES_DIR, tile))
+                ds = ds.isel(time=np.flatnonzero(pd.DatetimeIndex(ds.time.values).normalize().isin(alvo)))
+                partes.append(_sel_celulas(ds, cels))
+            return pd.concat(partes).sort_index()
+        except (ImportError, ValueError, KeyError, OSError) as e:
+            print(f"⚠️ Tiles GLDAS indisponíveis ({e}); lendo os .nc4.")
+            return _sel_celulas(open_many(files), celulas)
+    if GLDAS_CUBE_ENABLE:
+        try:
+            ingerir_granulos(files, GLDAS_CUBE)
+            ds = abrir_cubo(GLDAS_CUBE)
+            dias = pd.DatetimeIndex(ds.time.values).normalize()
+            ds = ds.isel(time=np.flatnonzero(dias.isin(alvo)))
+        except (ImportError, ValueError, KeyError, OSError) as e:
+            print(f"⚠️ Cubo GLDAS indisponível ({e}); lendo os .nc4.")
+            ds = open_many(files)
+    else:
+        ds = open_many(files)
+    return _sel_celulas(ds, celulas)
+
+def _sel_celulas(ds, celulas: List[Tuple[int,int]]) -> pd.DataFrame:
+    centros = [cell_center(i, j) for i, j in celulas]
+    lats = np.asarray([c[0] for c in centros])
+    lons = np.asarray([c[1] for c in centros])
+    if float(ds.lon.max()) > 180:
+        lons = (lons + 360) % 360
+    # células fora do recorte dos arquivos ficam de fora (nearest pegaria a borda)
+    dentro = ((lats >= float(ds.lat.min()) - 0.125) & (lats <= float(ds.lat.max()) + 0.125) &
+              (lons >= float(ds.lon.min()) - 0.125) & (lons <= float(ds.lon.max()) + 0.125))
+    if not dentro.any():
+        raise ValueError("Nenhuma célula do lote dentro da grade dos arquivos.")
+    sel = np.flatnonzero(dentro)
+    vars_ = [v for v in ("Tair_f_inst", "Wind_f_inst", "Rainf_f_tavg", "Psurf_f_inst",
+                         "SWdown_f_tavg", "Qair_f_inst") if v in ds.data_vars]
+    import xarray as xr
+    pts = ds[vars_].sel(lat=xr.DataArray(lats[sel], dims="ponto"),
+                        lon=xr.DataArray(lons[sel], dims="ponto"), method="nearest").load().astype("float64")
+    df = pts.drop_vars(["lat", "lon"], errors="ignore").to_dataframe().reset_index()
+    ponto = sel[df["ponto"].to_numpy()]
+    df["ci"] = np.asarray([c[0] for c in celulas])[ponto]
+    df["cj"] = np.asarray([c[1] for c in celulas])[ponto]
+    return df.drop(columns=["ponto"]).set_index("time").sort_index()
+
+def _diarios_gldas_lote(datas_por_celula: Dict[Tuple[int,int], set], subset_txt: Path,
+                        gldas_raw_dir: Path, max_files: int) -> pd.DataFrame:
+    """Diários GLDAS (formato longo: ci, cj, date + colunas) de todas as células do lote."""
+    store = DailyStore(GLDAS_STORE_FILE) if GLDAS_STORE_ENABLE else None
+    partes: List[pd.DataFrame] = []
+    faltando: Dict[Tuple[int,int], set] = {}
+    for cel, datas in datas_por_celula.items():
+        df = store.get(*cell_center(*cel), datas) if store else pd.DataFrame()
+        if not df.empty:
+            partes.append(df.assign(ci=cel[0], cj=cel[1]))
+        falta = {d for d in datas if d not in df.index}
+        if falta:
+            faltando[cel] = falta
+
+    if faltando:
+        todas = set().union(*faltando.values())
+        try:
+            # um único filtro/download para a união das datas que faltam em qualquer célula
+            txt = autodiscover_subset_file(subset_txt, DATA_DIR)
+            idx = carregar_indice(txt, read_links_from_txt, parse_y_doy_hhmm_from_url, derive_dest_name)
+            links = idx.links_para_datas(todas)
+            print(f"🎯 Lote: {len(faltando)} célula(s), {len(todas)} dia(s) → {len(links)} link(s).")
+            limite = len(links) if max_files == 0 else min(max_files, len(links))
+            regiao = _regiao_download([cell_center(*c) for c in faltando])
+            with usando_raw(gldas_raw_dir, todas):
+                download_gldas(links, gldas_raw_dir, max_files=limite, regiao=regiao)
+                por_dia = arquivos_por_dia(gldas_raw_dir, todas, regiao)
+                files = [f for fs in por_dia.values() for f in fs]
+                df3h = _extrair_celulas(files, list(faltando)) if files else None
+            if files:
+                completos = [d for d, fs in por_dia.items() if len(fs) >= 8]
+                for (ci, cj), g in df3h.groupby(["ci", "cj"]):
+                    cel = (int(ci), int(cj))
+                    df_novo = agregar_diario(g.drop(columns=["ci", "cj"]))
+                    df_novo = df_novo[df_novo.index.isin([d for d in faltando[cel] if d in por_dia])]
+                    if store:
+                        store.put(*cell_center(*cel), df_novo, only_dates=completos)
+                    partes.append(df_novo.assign(ci=cel[0], cj=cel[1]))
+        except Exception as e:
+            print(f"⚠️ Lote: falha ao processar GLDAS: {e}")
+
+    if not partes:
+        return pd.DataFrame(columns=["ci", "cj", "date"])
+    longo = pd.concat(partes)
+    longo.index.name = "date"
+    return longo.reset_index()
+
+def avaliar_eventos_lote(pedidos: Sequence[Dict[str,Any]],
+                         subset_txt: Path = SUBSET_FILE,
+                         gldas_raw_dir: Path = GLDAS_RAW_DIR,
+                         max_files:int = MAX_FILES,
+                         janela_hist:int = 1,
+                         anos_hist=HIST_ANOS,
+                         timezone:str = TIMEZONE) -> List[Dict[str,Any]]:
+    """
+    Avalia muitos eventos de uma vez. pedidos: [{"lat", "lon", "data_evento", "event_title"?}, …]
+    Retorna os payloads de avaliar_evento na mesma ordem.
+    - agrupa por célula GLDAS: cache/download/extração uma vez para a união das datas
+    - climatologia de todos os pedidos num único groupby
+    - previsão 1x por célula; fallback ERA5 só para quem ficou sem GLDAS
+    """
+    if not pedidos:
+        return []
+    reqs = pd.DataFrame({
+        "lat": [float(p["lat"]) for p in pedidos],
+        "lon": [float(p["lon"]) for p in pedidos],
+        "data_evento": [str(pd.to_datetime(p.get("data_evento") or p.get("date")).date()) for p in pedidos],
+    })
+    celulas = [snap_gldas_cell(a, b) for a, b in zip(reqs["lat"], reqs["lon"])]
+    reqs["ci"] = [c[0] for c in celulas]
+    reqs["cj"] = [c[1] for c in celulas]
+
+    # 1) datas-alvo por pedido (formato longo) e união por célula
+    janelas = {d: datas_janela(d, janela_hist, anos_hist) for d in reqs["data_evento"].unique()}
+    alvo = pd.DataFrame([(k, ci, cj, d) for k, (ci, cj, de) in enumerate(zip(reqs["ci"], reqs["cj"], reqs["data_evento"]))
+                         for d in janelas[de]], columns=["k", "ci", "cj", "date"])
+    datas_por_celula = {(int(ci), int(cj)): set(g["date"]) for (ci, cj), g in alvo.groupby(["ci", "cj"])}
+
+    # 2) diários GLDAS de todas as células
+    longo = _diarios_gldas_lote(datas_por_celula, subset_txt, gldas_raw_dir, max_files)
+
+    # 3) climatologia vetorizada: junta pedido×dia com os diários e agrega por pedido
+    hists: Dict[int, Dict[str,Any]] = {}
+    cols = [c for c in HIST_COLS if c in longo.columns]
+    if cols and not longo.empty:
+        base = alvo.merge(longo, on=["ci", "cj", "date"], how="inner")
+        if not base.empty:
+            base[cols] = base[cols].apply(pd.to_numeric, errors="coerce")
+            g = base.groupby("k")[cols]
+            q = g.quantile([0.25, 0.5, 0.75]).unstack()
+            est = pd.concat({"mean": g.mean(), "min": g.min(), "max": g.max(), "n": g.count(),
+                             "p25": q.xs(0.25, axis=1, level=1), "p50": q.xs(0.5, axis=1, level=1),
+                             "p75": q.xs(0.75, axis=1, level=1)}, axis=1)
+            amostra = g.size()
+            for k, linha in est.iterrows():
+                por_col = {c: {s: linha[(s, c)] for s in ("mean", "p25", "p50", "p75", "min", "max", "n")} for c in cols}
+                hist = _hist_de_estatisticas(por_col, amostra[k], janela_hist, anos_hist)
+                hist["fonte"] = "GLDAS/Earthdata"
+                hists[int(k)] = hist
+
+    # 4) fallback ERA5 (por pedido sem GLDAS) e previsão (1x por célula) em paralelo
+    sem_gldas = [k for k in range(len(reqs)) if k not in hists]
+    cel_rep = {c: k for k, c in reversed(list(enumerate(celulas)))}   # 1º pedido de cada célula
+    with ThreadPoolExecutor(max_workers=max(1, LOTE_WORKERS)) as ex:
+        fut_era5 = {k: ex.submit(hist_fallback_era5_openmeteo, reqs.at[k, "lat"], reqs.at[k, "lon"],
+                                 reqs.at[k, "data_evento"], janela=janela_hist, anos=anos_hist) for k in sem_gldas}
+        fut_prev = {c: ex.submit(previsao_7_dias, reqs.at[k, "lat"], reqs.at[k, "lon"], days=7, timezone=timezone)
+                    for c, k in cel_rep.items()}
+        for k, f in fut_era5.items():
+            hists[k] = f.result()
+        prevs = {c: f.result() for c, f in fut_prev.items()}
+    if sem_gldas:
+        print(f"… Lote: {len(sem_gldas)} pedido(s) sem GLDAS → fallback ERA5.")
+
+    # 5) payload por pedido (recomendação/decisão)
+    def _montar(k: int) -> Dict[str,Any]:
+        p = pedidos[k]
+        return _montar_resultado(reqs.at[k, "lat"], reqs.at[k, "lon"], reqs.at[k, "data_evento"],
+                                 copy.deepcopy(hists[k]), copy.deepcopy(prevs[celulas[k]]),
+                                 p.get("event_title") or p.get("title"))
+
+    # IA em lote: montar em paralelo deixa o agrupador juntar as recomendações em poucos prompts
+    if OLLAMA_ENABLE and LLM_BATCH_ENABLE and len(pedidos) > 1:
+        with ThreadPoolExecutor(max_workers=min(len(pedidos), LLM_BATCH_MAX * max(1, LLM_BATCH_CONCURRENCY))) as ex:
+            return list(ex.map(_montar, range(len(pedidos))))
+    return [_montar(k) for k in range(len(pedidos))]
+
+# ===================== CLI em fluxo (NDJSON) =====================
+CLI_WORKERS = int(os.getenv("CLI_WORKERS", "4"))   # avaliações simultâneas no modo --input
+
+def formatar_saida_cli(res: Dict[str,Any], modo: str = "full") -> Any:
+    """Mesma prioridade do __main__: compact → blocks → min → friendly → payload completo."""
+    if modo == "compact":
+        return res.get("analise_evento", {}).get("decisao_binaria", {"ok": False, "motivo": "insufficient data"})
+    if modo == "blocks":
+        return montar_blocos_front(res)
+    if modo == "min":
+        return formatar_card_evento(res)
+    if modo == "friendly":
+        return formatar_bem_amigavel(res)
+    return res
+
+def _linha_ndjson(ln: str):
+    """Uma linha NDJSON → dict, ou a exceção (sem interromper a leitura das demais)."""
+    try:
+        r = json.loads(ln)
+    except ValueError as e:
+        return e
+    return r if isinstance(r, dict) else ValueError(f"linha não é um objeto JSON: {ln.strip()[:80]}")
+
+def _ler_eventos(fonte) -> Iterator[Dict[str,Any]]:
+    """Eventos de um arquivo/stdin NDJSON (1 objeto por linha) ou CSV com cabeçalho; lidos sob demanda."""
+    import csv, itertools
+    primeira = ""
+    for primeira in fonte:
+        if primeira.strip():
+            break
+    if not primeira.strip():
+        return
+    linhas = itertools.chain([primeira], fonte)
+    if primeira.lstrip().startswith("{"):
+        registros = (_linha_ndjson(ln) for ln in linhas if ln.strip())
+    else:
+        registros = csv.DictReader(linhas)
+    for n, r in enumerate(registros):
+        if isinstance(r, Exception):   # linha NDJSON malformada → erro só desta linha
+            yield {"id": n, "erro": f"entrada inválida: {r}"}
+            continue
+        r = {str(k).strip().lower(): v for k, v in r.items() if k is not None}
+        ev = {"id": r.get("id") if r.get("id") not in (None, "") else n}
+        try:
+            data = r.get("data_evento") or r.get("date") or r.get("target_date")
+            if not data:
+                raise ValueError("data do evento ausente (data_evento/date/target_date)")
+            ev.update(lat=float(r["lat"]), lon=float(r["lon"]), data_evento=str(data),
+                      event_title=r.get("event_title") or r.get("title") or "")
+        except (KeyError, TypeError, ValueError) as e:
+            ev["erro"] = f"entrada inválida: {e}"   # só esta linha falha; o fluxo segue
+        yield ev
+
+def avaliar_eventos_stream(fonte, saida, modo: str = "full", workers: int = CLI_WORKERS,
+                           em_voo: Optional[int] = None) -> Dict[str,int]:
+    """
+    Lê eventos de `fonte` e escreve em `saida` uma linha JSON por evento assim que cada um termina
+    ({"id", "result"} ou {"id", "error"}). No máximo `em_voo` eventos lidos e ainda não
+    escritos → memória limitada mesmo com milhões de linhas. Logs vão para o stderr.
+    """
+    workers = max(1, int(workers))
+    vagas = threading.BoundedSemaphore(max(workers, int(em_voo or 2 * workers)))
+    trava = threading.Lock()
+    cont = {"ok": 0, "erro": 0}
+    t0 = time.perf_counter()
+
+    def _escrever(linha: Dict[str,Any], tipo: str) -> None:
+        txt = json.dumps(linha, ensure_ascii=False, default=str)
+        with trava:
+            saida.write(txt + "\n")
+            saida.flush()
+            cont[tipo] += 1
+
+    def _um(ev: Dict[str,Any]) -> None:
+        try:
+            res = avaliar_evento(ev["lat"], ev["lon"], ev["data_evento"], event_title=ev["event_title"])
+            _escrever({"id": ev["id"], "result": formatar_saida_cli(res, modo)}, "ok")
+        except (Exception, SystemExit) as e:   # SystemExit do autodiscover também vira linha de erro (Ctrl-C interrompe)
+            _escrever({"id": ev["id"], "error": str(e) or type(e).__name__}, "erro")
+        finally:
+            vagas.release()
+
+    with contextlib.redirect_stdout(sys.stderr), ThreadPoolExecutor(max_workers=workers) as ex:
+        for ev in _ler_eventos(fonte):
+            if "erro" in ev:
+                _escrever({"id": ev["id"], "error": ev["erro"]}, "erro")
+                continue
+            vagas.acquire()
+            ex.submit(_um, ev)
+    print(f"✅ {cont['ok']} evento(s), {cont['erro']} erro(s) em {time.perf_counter() - t0:.1f}s", file=sys.stderr)
+    return cont
+
 # ===================== Main (exemplo CLI) =====================
 if __name__ == "__main__":
     import sys, os, json
@@ -1441,6 +2326,23 @@ if __name__ == "__main__":
     if any(a in ("--blocks","--blocos") for a in sys.argv[1:]): FRONT_BLOCKS = True
     if any(a in ("--friendly","--amigavel") for a in sys.argv[1:]): FRIENDLY_OUTPUT = True
 
+    # modo em fluxo: --input eventos.csv|eventos.ndjson|- (stdin) [--workers N]
+    # → uma linha JSON por evento, na ordem em que terminam
+    def _valor_arg(*nomes, padrao=None):
+        args = sys.argv[1:]
+        return next((args[k + 1] for k, a in enumerate(args[:-1]) if a in nomes), padrao)
+    ENTRADA = _valor_arg("--input", "-i")
+    if ENTRADA:
+        modo = ("compact" if COMPACT_JSON else "blocks" if FRONT_BLOCKS else "min" if FRONT_MIN
+                else "friendly" if FRIENDLY_OUTPUT else "full")
+        workers = int(_valor_arg("--workers", "-w", padrao=CLI_WORKERS))
+        if ENTRADA == "-":
+            cont = avaliar_eventos_stream(sys.stdin, sys.stdout, modo, workers)
+        else:
+            with open(ENTRADA, encoding="utf-8") as f:
+                cont = avaliar_eventos_stream(f, sys.stdout, modo, workers)
+        sys.exit(1 if cont["erro"] and not cont["ok"] else 0)
+
     res = avaliar_evento(LAT, LON, DATA_EVENTO, event_title=EVENT_TITLE)
 
     # Ordem de prioridade de saída (para o front internacional):
@@ -1,8 +1,10 @@
 from __future__ import annotations
+import time
 from typing import Any, Dict
 import pandas as pd
-import requests
 from .config import GOOGLE_WEATHER_API_KEY
+from .http_client import http_get
+from .circuit_breaker import disjuntor
 
 def forecast_google(lat: float, lon: float, days:int=7, timezone="auto") -> Dict[str,Any]:
     key = GOOGLE_WEATHER_API_KEY
@@ -20,12 +22,18 @@ def forecast_google(lat: float, lon: float, days:int=7, timezone="auto") -> Dict
         ]),
         "key": key,
     }
+    cb = disjuntor("google")
+    if not cb.permitir():
+        return {"ok": False, "msg": "Google Weather em circuito aberto."}
+    t0 = time.perf_counter()
     try:
-        r = requests.get(endpoint, params=params, timeout=20)
+        r = http_get("google", endpoint, params=params)
         if r.status_code == 403:
+            cb.falha(time.perf_counter() - t0, "HTTP 403", abrir=True)
             return {"ok": False, "msg": "Google Weather 403."}
         r.raise_for_status()
         data = r.json()
+        cb.sucesso(time.perf_counter() - t0)
         daily = []
         for d in (data.get("dailyForecasts", []) or data.get("daily", [])):
             daily.append({
@@ -43,6 +51,7 @@ def forecast_google(lat: float, lon: float, days:int=7, timezone="auto") -> Dict
             return {"ok": False, "msg": "Google Weather sem daily."}
         return {"ok": True, "daily": daily, "provider": "google"}
     except Exception as e:
+        cb.falha(time.perf_counter() - t0, e)
         return {"ok": False, "msg": f"Google Weather falhou: {e}"}
 
 def forecast_openmeteo(lat: float, lon: float, days:int=7, timezone="auto") -> Dict[str,Any]:
@@ -52,9 +61,18 @@ def forecast_openmeteo(lat: float, lon: float, days:int=7, timezone="auto") -> D
         daily="temperature_2m_max,temperature_2m_min,precipitation_sum,precipitation_probability_mean,wind_speed_10m_max,apparent_temperature_max",
         hourly="relative_humidity_2m,visibility,apparent_temperature,temperature_2m,wind_speed_10m,precipitation"
     )
-    r = requests.get(url, params=params, timeout=30)
-    r.raise_for_status()
-    jd = r.json()
+    cb = disjuntor("openmeteo")
+    if not cb.permitir():
+        raise RuntimeError("Open-Meteo em circuito aberto.")
+    t0 = time.perf_counter()
+    try:
+        r = http_get("openmeteo", url, params=params)
+        r.raise_for_status()
+        jd = r.json()
+    except Exception as e:
+        cb.falha(time.perf_counter() - t0, e)
+        raise
+    cb.sucesso(time.perf_counter() - t0)
     d_d = jd.get("daily", {}); d_h = jd.get("hourly", {})
     if not d_d:
         return {"ok": False, "msg": "Sem dados diários do Open-Meteo."}
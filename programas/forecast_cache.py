@@ -0,0 +1,202 @@
+# -*- coding: utf-8 -*-
+"""
+forecast_cache.py — cache TTL da previsão 7 dias (LRU em memória + SQLite opcional)
+
+- Chave: lat/lon arredondados, dias, timezone e provedor
+- Fresco (< ttl): responde do cache
+- Velho (< ttl + stale): responde na hora e revalida em segundo plano (stale-while-revalidate)
+- Expirado/ausente: busca, guarda (só respostas ok) e responde
+- O critério do que entra no cache é configurável (valido=…), p/ reaproveitar em outros caches
+- TTL por valor opcional (ttl_de=…): ex. resposta de fallback vale menos que a do provedor principal
+"""
+from __future__ import annotations
+import asyncio
+import copy
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Set, Tuple
+
+def _resposta_ok(valor: Any) -> bool:
+    return isinstance(valor, dict) and bool(valor.get("ok"))
+
+class CacheTTL:
+    """LRU com TTL e janela de 'stale'; opcionalmente espelhado em SQLite (sobrevive a restart)."""
+
+    def __init__(self, ttl: float, stale: float = 0.0, maxsize: int = 2048, db: Optional[Path] = None,
+                 valido: Optional[Callable[[Any], bool]] = None,
+                 ao_consultar: Optional[Callable[[str], None]] = None,
+                 ttl_de: Optional[Callable[[Any], float]] = None, nome: str = "cache"):
+        self.valido = valido or _resposta_ok   # o que pode ser guardado
+        self.ttl_de = ttl_de                   # TTL por valor (≤ ttl); None = sempre ttl
+        self.nome = nome                       # só p/ logs
+        self.ao_consultar = ao_consultar       # gancho p/ métricas: recebe 'fresh' | 'stale' | 'miss'
+        self.ttl = float(ttl)
+        self.stale = max(0.0, float(stale))
+        self.maxsize = max(1, int(maxsize))
+        self.db = Path(db) if db else None
+        self._lock = threading.Lock()
+        self._mem: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self._revalidando: Set[str] = set()
+        self._tarefas: Set["asyncio.Task[Any]"] = set()
+        self.hits = self.stale_hits = self.misses = 0
+        if self.db:
+            self.db.parent.mkdir(parents=True, exist_ok=True)
+            con = self._conn()
+            try:
+                with con:
+                    con.execute("CREATE TABLE IF NOT EXISTS cache (k TEXT PRIMARY KEY, ts REAL NOT NULL, v TEXT NOT NULL)")
+            finally:
+                con.close()
+
+    def _conn(self) -> sqlite3.Connection:
+        con = sqlite3.connect(self.db, timeout=10)
+        con.execute("PRAGMA journal_mode=WAL")
+        return con
+
+    @staticmethod
+    def _k(chave: Hashable) -> str:
+        return json.dumps(chave, default=str)
+
+    def _ler(self, k: str) -> Optional[Tuple[float, Any]]:
+        with self._lock:
+            item = self._mem.get(k)
+            if item is not None:
+                self._mem.move_to_end(k)
+                return item
+        if not self.db:
+            return None
+        try:
+            con = self._conn()
+            try:
+                row = con.execute("SELECT ts, v FROM cache WHERE k=?", (k,)).fetchone()
+            finally:
+                con.close()
+        except sqlite3.Error:
+            return None
+        if row is None:
+            return None
+        item = (float(row[0]), json.loads(row[1]))
+        self._mem_put(k, item)
+        return item
+
+    def _mem_put(self, k: str, item: Tuple[float, Any]) -> None:
+        with self._lock:
+            self._mem[k] = item
+            self._mem.move_to_end(k)
+            while len(self._mem) > self.maxsize:
+                self._mem.popitem(last=False)
+
+    def guardar(self, chave: Hashable, valor: Any) -> None:
+        k = self._k(chave)
+        item = (time.time(), valor)
+        self._mem_put(k, item)
+        if self.db:
+            try:
+                con = self._conn()
+                try:
+                    with con:
+                        con.execute("INSERT OR REPLACE INTO cache (k, ts, v) VALUES (?,?,?)",
+                                    (k, item[0], json.dumps(valor, default=str)))
+                        con.execute("DELETE FROM cache WHERE ts < ?", (item[0] - self.ttl - self.stale,))
+                finally:
+                    con.close()
+            except sqlite3.Error:
+                pass
+
+    def consultar(self, chave: Hashable) -> Tuple[Optional[Any], str]:
+        """(valor, estado) com estado em 'fresh' | 'stale' | 'miss'."""
+        item = self._ler(self._k(chave))
+        if item is None:
+            return None, "miss"
+        idade = time.time() - item[0]
+        ttl = min(self.ttl, float(self.ttl_de(item[1]))) if self.ttl_de else self.ttl
+        if idade < ttl:
+            return item[1], "fresh"
+        if idade < ttl + self.stale:
+            return item[1], "stale"
+        return None, "miss"
+
+    def _pode_revalidar(self, k: str) -> bool:
+        with self._lock:
+            if k in self._revalidando:
+                return False
+            self._revalidando.add(k)
+            return True
+
+    def _fim_revalidacao(self, k: str) -> None:
+        with self._lock:
+            self._revalidando.discard(k)
+
+    def obter(self, chave: Hashable, buscar: Callable[[], Dict[str, Any]]) -> Dict[str, Any]:
+        valor, estado = self.consultar(chave)
+        if self.ao_consultar:
+            self.ao_consultar(estado)
+        if estado == "fresh":
+            self.hits += 1
+            return copy.deepcopy(valor)
+        if estado == "stale":
+            self.stale_hits += 1
+            k = self._k(chave)
+            if self._pode_revalidar(k):
+                def _revalidar():
+                    try:
+                        novo = buscar()
+                        if self.valido(novo):
+                            self.guardar(chave, novo)
+                    except Exception as e:
+                        print(f"⚠️ Revalidação falhou ({self.nome}): {e}")
+                    finally:
+                        self._fim_revalidacao(k)
+                threading.Thread(target=_revalidar, daemon=True).start()
+            return copy.deepcopy(valor)
+        self.misses += 1
+        novo = buscar()
+        if self.valido(novo):
+            self.guardar(chave, novo)
+            return copy.deepcopy(novo)
+        return novo
+
+    async def obter_async(self, chave: Hashable, buscar: Callable[[], Awaitable[Dict[str, Any]]]) -> Dict[str, Any]:
+        # SQLite bloqueia → thread; só memória → direto
+        if self.db:
+            valor, estado = await asyncio.to_thread(self.consultar, chave)
+        else:
+            valor, estado = self.consultar(chave)
+        if self.ao_consultar:
+            self.ao_consultar(estado)
+        if estado == "fresh":
+            self.hits += 1
+            return copy.deepcopy(valor)
+        if estado == "stale":
+            self.stale_hits += 1
+            k = self._k(chave)
+            if self._pode_revalidar(k):
+                async def _revalidar():
+                    try:
+                        novo = await buscar()
+                        if self.valido(novo):
+                            await asyncio.to_thread(self.guardar, chave, novo)
+                    except Exception as e:
+                        print(f"⚠️ Revalidação falhou ({self.nome}): {e}")
+                    finally:
+                        self._fim_revalidacao(k)
+                t = asyncio.ensure_future(_revalidar())
+                self._tarefas.add(t)          # referência forte até terminar
+                t.add_done_callback(self._tarefas.discard)
+            return copy.deepcopy(valor)
+        self.misses += 1
+        novo = await buscar()
+        if self.valido(novo):
+            if self.db:
+                await asyncio.to_thread(self.guardar, chave, novo)
+            else:
+                self.guardar(chave, novo)
+            return copy.deepcopy(novo)
+        return novo
+
+    def estatisticas(self) -> Dict[str, int]:
+        return {"hits": self.hits, "stale_hits": self.stale_hits, "misses": self.misses, "itens": len(self._mem)}
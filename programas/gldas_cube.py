@@ -0,0 +1,316 @@
+# -*- coding: utf-8 -*-
+"""
+gldas_cube.py — cubo Zarr (série temporal) montado a partir dos granules GLDAS baixados
+
+- Ingestão incremental: cada .nc4 novo de GLDAS_RAW_DIR é recortado (bbox da região de
+  serviço + 6 variáveis) e anexado ao longo de 'time'; manifesto evita duplicar granules
+- Chunks time-major e espacialmente pequenos → consulta de ponto/bbox vira leitura contígua
+- Leitura: ler_ponto_cubo (série 3h de uma célula) e abrir_cubo (Dataset p/ Junta_arquivos)
+- Tiles (GLDAS_TILE_GRAUS=5): um cubo por tile de 5°×5°; cada granule é aberto uma vez e
+  recortado em todos os tiles pedidos → pontos próximos (mesma cidade/região) leem o mesmo tile
+
+Uso:
+  python gldas_cube.py ingest [--raw DIR] [--cube PATH] [--bbox lat_min,lat_max,lon_min,lon_max]
+  python gldas_cube.py ingest-tiles [--raw DIR] [--tiles DIR] --bbox lat_min,lat_max,lon_min,lon_max
+Requisitos:
+  pip install xarray zarr netCDF4
+"""
+from __future__ import annotations
+import math
+import os
+import re
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+# mesmas variáveis lidas por process_gldas_to_daily (gldas_point.GLDAS_VARS)
+CUBE_VARS = ("Tair_f_inst", "Wind_f_inst", "Rainf_f_tavg", "Psurf_f_inst", "SWdown_f_tavg", "Qair_f_inst")
+
+def _parse_bbox(txt: str) -> Optional[Tuple[float, float, float, float]]:
+    """'lat_min,lat_max,lon_min,lon_max' → tupla (None se vazio = globo inteiro)."""
+    txt = (txt or "").strip()
+    if not txt:
+        return None
+    v = [float(x) for x in txt.split(",")]
+    if len(v) != 4:
+        raise ValueError(f"bbox inválido: {txt!r} (esperado lat_min,lat_max,lon_min,lon_max)")
+    return v[0], v[1], v[2], v[3]
+
+def _parse_chunks(txt: str) -> Dict[str, int]:
+    out = {"time": 512, "lat": 8, "lon": 8}
+    for par in (txt or "").split(","):
+        if "=" in par:
+            k, v = par.split("=", 1)
+            out[k.strip()] = int(v)
+    return out
+
+CUBE_BBOX   = _parse_bbox(os.getenv("GLDAS_CUBE_BBOX", ""))
+CUBE_CHUNKS = _parse_chunks(os.getenv("GLDAS_CUBE_CHUNKS", ""))
+CUBE_LOTE   = int(os.getenv("GLDAS_CUBE_BATCH", "64"))
+TILE_GRAUS  = float(os.getenv("GLDAS_TILE_GRAUS", "5"))
+RES_GRAUS   = 0.25
+
+_LOCK = threading.Lock()
+
+@contextmanager
+def _trava(cube: Path, timeout: float = 600.0):
+    """Trava simples entre processos (arquivo .lock criado com O_EXCL) + lock entre threads."""
+    lock = cube.with_name(cube.name + ".lock")
+    with _LOCK:
+        t0 = time.monotonic()
+        while True:
+            try:
+                fd = os.open(lock, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+                break
+            except FileExistsError:
+                # lock órfão (processo morreu) → remove após timeout
+                try:
+                    if time.time() - lock.stat().st_mtime > timeout:
+                        lock.unlink(missing_ok=True)
+                        continue
+                except FileNotFoundError:
+                    continue
+                if time.monotonic() - t0 > timeout:
+                    raise TimeoutError(f"Cubo ocupado: {lock}")
+                time.sleep(0.2)
+        try:
+            os.write(fd, str(os.getpid()).encode())
+            os.close(fd)
+            yield
+        finally:
+            lock.unlink(missing_ok=True)
+
+def _manifesto(cube: Path) -> Path:
+    return cube.with_name(cube.name + ".ingeridos.txt")
+
+def granulos_ingeridos(cube: Path) -> set:
+    m = _manifesto(Path(cube))
+    if not m.is_file():
+        return set()
+    return {ln.strip() for ln in m.read_text(encoding="utf-8").splitlines() if ln.strip()}
+
+def _normaliza(ds, bbox, variaveis: Sequence[str]):
+    if "latitude" in ds.dims or "latitude" in ds.coords: ds = ds.rename({"latitude": "lat"})
+    if "longitude" in ds.dims or "longitude" in ds.coords: ds = ds.rename({"longitude": "lon"})
+    ds = ds[[v for v in variaveis if v in ds.data_vars]]
+    if ds.lat.size > 1 and ds.lat[0] > ds.lat[-1]:
+        ds = ds.sortby("lat")
+    if bbox:
+        lat_min, lat_max, lon_min, lon_max = bbox
+        if float(ds.lon.max()) > 180:
+            lon_min, lon_max = lon_min % 360, lon_max % 360
+        ds = ds.sel(lat=slice(lat_min, lat_max), lon=slice(lon_min, lon_max))
+    for v in ds.data_vars:
+        ds[v] = ds[v].astype("float32")
+        ds[v].encoding = {}
+    return ds
+
+def ingerir_granulos(files: Iterable[str | Path], cube: Path, bbox=CUBE_BBOX,
+                     variaveis: Sequence[str] = CUBE_VARS, lote: int = CUBE_LOTE) -> int:
+    """Anexa ao cubo os granules ainda não ingeridos. Retorna quantos entraram."""
+    import xarray as xr
+    cube = Path(cube)
+    cube.parent.mkdir(parents=True, exist_ok=True)
+    with _trava(cube):
+        ja = granulos_ingeridos(cube)
+        novos = sorted({str(f) for f in files if Path(f).name not in ja})
+        total = 0
+        for k in range(0, len(novos), max(1, lote)):
+            parte = novos[k:k + lote]
+            dss, nomes = [], []
+            for f in parte:
+                try:
+                    with xr.open_dataset(f) as ds:
+                        dss.append(_normaliza(ds, bbox, variaveis).load())
+                    nomes.append(Path(f).name)
+                except Exception as e:
+                    # fora do manifesto → tentado de novo na próxima ingestão
+                    print(f"⚠️ Cubo: ignorando {Path(f).name}: {e}")
+            if not dss:
+                continue
+            total += _anexar(cube, dss, nomes)
+        return total
+
+def _anexar(cube: Path, dss: list, chaves: Sequence[str]) -> int:
+    """Concatena no tempo, grava/anexa no Zarr e registra as chaves no manifesto (chamar com a trava)."""
+    import xarray as xr
+    ds = xr.concat(dss, dim="time")
+    if (cube / "zarr.json").exists() or (cube / ".zgroup").exists():
+        ds.to_zarr(cube, mode="a", append_dim="time", consolidated=False)
+    else:
+        enc = {v: {"chunks": tuple(min(CUBE_CHUNKS.get(d, n), n) if d != "time" else CUBE_CHUNKS["time"]
+                                   for d, n in zip(ds[v].dims, ds[v].shape))}
+               for v in ds.data_vars}
+        enc["time"] = {"units": "minutes since 2000-01-01 00:00", "dtype": "int64"}
+        ds.to_zarr(cube, mode="w", encoding=enc, consolidated=False)
+    with open(_manifesto(cube), "a", encoding="utf-8") as m:
+        m.writelines(c + "\n" for c in chaves)
+    print(f"🧊 Cubo: +{ds.sizes['time']} passo(s) → {cube.name}")
+    return ds.sizes["time"]
+
+def abrir_cubo(cube: Path):
+    import xarray as xr
+    cube = Path(cube)
+    if not cube.exists():
+        raise FileNotFoundError(f"Cubo GLDAS não encontrado: {cube}")
+    return xr.open_zarr(cube, consolidated=False)
+
+def ler_ponto_cubo(cube: Path, lat: float, lon: float, datas: Optional[Iterable] = None,
+                   variaveis: Sequence[str] = CUBE_VARS) -> pd.DataFrame:
+    """Série 3h (índice 'time') da célula mais próxima; só as datas pedidas, se houver."""
+    ds = abrir_cubo(cube)
+    if float(ds.lon.max()) > 180:
+        lon = (lon + 360) % 360
+    if not (float(ds.lat.min()) - 0.25 <= lat <= float(ds.lat.max()) + 0.25 and
+            float(ds.lon.min()) - 0.25 <= lon <= float(ds.lon.max()) + 0.25):
+        raise ValueError(f"Ponto ({lat}, {lon}) fora do recorte do cubo.")
+    pt = ds[[v for v in variaveis if v in ds.data_vars]].sel(lat=lat, lon=lon, method="nearest")
+    if datas is not None:
+        dias = pd.DatetimeIndex(ds.time.values).normalize()
+        alvo = pd.DatetimeIndex(sorted(pd.Timestamp(d) for d in datas))
+        idx = np.flatnonzero(dias.isin(alvo))
+        pt = pt.isel(time=idx)
+    df = pt.load().to_dataframe()
+    df = df[[c for c in df.columns if c in variaveis]].astype("float64")
+    # append pode chegar fora de ordem (backfill) → ordena e remove duplicatas
+    return df[~df.index.duplicated(keep="last")].sort_index()
+
+# ===================== Tiles =====================
+class Tile(NamedTuple):
+    """Tile alinhado à grade de TILE_GRAUS (mesma ordem de campos da Regiao de gldas_otf)."""
+    nome: str
+    s: float
+    w: float
+    n: float
+    e: float
+
+    @property
+    def bbox(self) -> Tuple[float, float, float, float]:
+        """Formato do cubo: lat_min, lat_max, lon_min, lon_max."""
+        return self.s, self.n, self.w, self.e
+
+def _tile(lat0: float, lon0: float, graus: float) -> Tile:
+    ns = f"{'S' if lat0 < 0 else 'N'}{abs(lat0):02g}"
+    ew = f"{'W' if lon0 < 0 else 'E'}{abs(lon0):03g}"
+    return Tile(f"t{ns}{ew}".replace(".", "p"), lat0, lon0, lat0 + graus, lon0 + graus)
+
+def tile_de(lat: float, lon: float, graus: float = TILE_GRAUS) -> Tile:
+    """Tile que contém o ponto (bordas do tile coincidem com bordas de célula 0.25°)."""
+    lon = ((float(lon) + 180.0) % 360.0) - 180.0
+    lat = min(max(float(lat), -90.0), 90.0 - 1e-9)
+    return _tile(math.floor(lat / graus) * graus, math.floor(lon / graus) * graus, graus)
+
+_NOME_TILE = re.compile(r"^t([SN])(\d+(?:p\d+)?)([WE])(\d+(?:p\d+)?)$")
+
+def tile_do_nome(nome: str, graus: float = TILE_GRAUS) -> Optional[Tile]:
+    """Tile pelo nome (inverso de _tile: 'tS35E175' → Tile); None se não for nome de tile."""
+    m = _NOME_TILE.match(nome)
+    if not m:
+        return None
+    lat0 = float(m.group(2).replace("p", ".")) * (-1 if m.group(1) == "S" else 1)
+    lon0 = float(m.group(4).replace("p", ".")) * (-1 if m.group(3) == "W" else 1)
+    return _tile(lat0, lon0, graus)
+
+def tiles_de(bbox: Tuple[float, float, float, float], graus: float = TILE_GRAUS) -> List[Tile]:
+    """Tiles que cobrem um bbox (lat_min, lat_max, lon_min, lon_max)."""
+    lat_min, lat_max, lon_min, lon_max = bbox
+    a, b = tile_de(lat_min, lon_min, graus), tile_de(lat_max, lon_max, graus)
+    nlat = int(round((b.s - a.s) / graus)) + 1
+    nlon = int(round((b.w - a.w) / graus)) + 1
+    return [_tile(a.s + i * graus, a.w + j * graus, graus) for i in range(nlat) for j in range(nlon)]
+
+def caminho_tile(raiz: Path, tile: Tile) -> Path:
+    return Path(raiz) / f"{tile.nome}.zarr"
+
+def ingerir_tiles(files: Iterable[str | Path], raiz: Path, tiles: Sequence[Tile],
+                  variaveis: Sequence[str] = CUBE_VARS, lote: int = CUBE_LOTE,
+                  chave: Optional[Callable[[str], str]] = None) -> int:
+    """Recorta cada granule UMA vez nos tiles pedidos e anexa ao cubo de cada tile.
+
+    chave: nome do arquivo → chave no manifesto (p/ o recorte regional e o global do mesmo
+    instante contarem como o mesmo granule). Granules que não cobrem o tile inteiro são ignorados.
+    """
+    import xarray as xr
+    chave = chave or (lambda nome: nome)
+    raiz = Path(raiz)
+    raiz.mkdir(parents=True, exist_ok=True)
+    tiles = list(dict.fromkeys(tiles))
+    files = sorted({str(f) for f in files})
+    pendentes = {}
+    for t in tiles:
+        ja = granulos_ingeridos(caminho_tile(raiz, t))
+        pendentes[t] = {f for f in files if chave(Path(f).name) not in ja}
+    todos = sorted(set().union(*pendentes.values())) if pendentes else []
+    total = 0
+    for k in range(0, len(todos), max(1, lote)):
+        partes: Dict[Tile, List[Tuple[str, object]]] = {t: [] for t in tiles}
+        for f in todos[k:k + lote]:
+            try:
+                with xr.open_dataset(f) as ds:
+                    for t in tiles:
+                        if f not in pendentes[t]:
+                            continue
+                        p = _normaliza(ds, t.bbox, variaveis)
+                        lado = int(round((t.n - t.s) / RES_GRAUS)), int(round((t.e - t.w) / RES_GRAUS))
+                        if (p.sizes.get("lat"), p.sizes.get("lon")) != lado:
+                            continue   # recorte de outra região (não cobre o tile)
+                        partes[t].append((chave(Path(f).name), p.load()))
+            except Exception as e:
+                print(f"⚠️ Tiles: ignorando {Path(f).name}: {e}")
+        for t, itens in partes.items():
+            if not itens:
+                continue
+            cube = caminho_tile(raiz, t)
+            with _trava(cube):
+                ja = granulos_ingeridos(cube)   # outro processo pode ter anexado nesse meio-tempo
+                itens = list({c: d for c, d in itens if c not in ja}.items())
+                if itens:
+                    total += _anexar(cube, [d for _, d in itens], [c for c, _ in itens])
+    return total
+
+def abrir_tiles(raiz: Path, tiles: Sequence[Tile]):
+    """Dataset dos tiles (vizinhos, em retângulo) combinados por coordenada."""
+    import xarray as xr
+    dss = [abrir_cubo(caminho_tile(raiz, t)) for t in dict.fromkeys(tiles)]
+    dss = [ds.sortby("time").drop_duplicates("time", keep="last") for ds in dss]
+    return dss[0] if len(dss) == 1 else xr.combine_by_coords(dss, join="outer", combine_attrs="drop_conflicts")
+
+def _main(argv: List[str]) -> int:
+    import argparse
+    try:
+        from dotenv import load_dotenv
+        load_dotenv()
+    except Exception:
+        pass
+    data_dir = Path(os.getenv("DATA_DIR", r"D:\NASA\programas\dados"))
+    ap = argparse.ArgumentParser(description="Cubo Zarr dos granules GLDAS")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    ing = sub.add_parser("ingest", help="anexa ao cubo os .nc4 ainda não ingeridos")
+    ing.add_argument("--raw", default=str(data_dir / os.getenv("GLDAS_RAW_SUBDIR", r"gldas\raw")))
+    ing.add_argument("--cube", default=os.getenv("GLDAS_CUBE", "") or str(data_dir / os.getenv("GLDAS_OUT_SUBDIR", r"gldas\out") / "gldas_cube.zarr"))
+    ing.add_argument("--bbox", default=os.getenv("GLDAS_CUBE_BBOX", ""))
+    til = sub.add_parser("ingest-tiles", help="recorta os .nc4 nos tiles que cobrem o bbox")
+    til.add_argument("--raw", default=str(data_dir / os.getenv("GLDAS_RAW_SUBDIR", r"gldas\raw")))
+    til.add_argument("--tiles", default=os.getenv("GLDAS_TILES_DIR", "") or str(data_dir / os.getenv("GLDAS_OUT_SUBDIR", r"gldas\out") / "gldas_tiles"))
+    til.add_argument("--bbox", required=True)
+    args = ap.parse_args(argv)
+
+    if args.cmd == "ingest":
+        files = sorted(str(p) for p in Path(args.raw).rglob("*.nc4"))
+        n = ingerir_granulos(files, Path(args.cube), bbox=_parse_bbox(args.bbox))
+        print(f"✅ {n} passo(s) novos no cubo {args.cube}")
+    elif args.cmd == "ingest-tiles":
+        files = sorted(str(p) for p in Path(args.raw).rglob("*.nc4"))
+        tiles = tiles_de(_parse_bbox(args.bbox))
+        n = ingerir_tiles(files, Path(args.tiles), tiles)
+        print(f"✅ {n} passo(s) novos em {len(tiles)} tile(s) de {args.tiles}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(_main(sys.argv[1:]))
@@ -0,0 +1,163 @@
+# -*- coding: utf-8 -*-
+"""
+gldas_otf.py — recorte espacial/variáveis já no download (OTF do GES DISC ou OPeNDAP)
+
+- Regiões de serviço (GLDAS_REGIOES "nome:S,W,N,E;…" ou GLDAS_BBOX "S,W,N,E"): o granule de
+  uma avaliação vem recortado na região que contém o(s) ponto(s); fora de todas → global
+- Links OTF (HTTP_services.cgi): reescreve BBOX e VARIABLES (só as 6 variáveis do diário)
+- Links diretos (/data/…nc4): viram OPeNDAP com expressão de restrição (variáveis + hiperslab
+  de índices da região) e resposta em netCDF-4 (<granule>.nc4?…)
+- Nome do arquivo recortado leva a marca da região (….R-<nome>.nc4) → catálogo/cache não
+  confundem com o granule global
+- Regiões em -180..180 sem cruzar o antimeridiano; recorte baixado só vale se cobrir a região
+"""
+from __future__ import annotations
+import os
+import re
+from pathlib import Path
+from typing import Callable, List, NamedTuple, Optional, Sequence, Tuple
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+GLDAS_OTF_SUBSET     = os.getenv("GLDAS_OTF_SUBSET", "true").lower() in ("1","true","yes","y")
+GLDAS_OPENDAP_SUBSET = os.getenv("GLDAS_OPENDAP_SUBSET", "true").lower() in ("1","true","yes","y")
+GLDAS_OPENDAP_HOST   = os.getenv("GLDAS_OPENDAP_HOST", "hydro1.gesdisc.eosdis.nasa.gov").strip()
+GLDAS_REGIOES        = os.getenv("GLDAS_REGIOES", "").strip()
+GLDAS_BBOX           = os.getenv("GLDAS_BBOX", "").strip()
+MARGEM_GRAUS         = 0.25          # 1 célula de folga (nearest na borda)
+RES_GRAUS            = 0.25          # grade GLDAS 0.25°: centros de -59.875 a 89.875 / -179.875 a 179.875
+
+_MARCA = re.compile(r"\.R-([\w-]+)\.nc4$", re.I)
+
+class Regiao(NamedTuple):
+    nome: str
+    s: float
+    w: float
+    n: float
+    e: float
+
+    def contem(self, lat: float, lon: float, margem: float = MARGEM_GRAUS) -> bool:
+        lon = ((float(lon) + 180.0) % 360.0) - 180.0
+        return (self.s + margem <= lat <= self.n - margem) and (self.w + margem <= lon <= self.e - margem)
+
+    @property
+    def bbox(self) -> str:
+        """Formato do OTF: S,W,N,E."""
+        return ",".join(f"{v:g}" for v in (self.s, self.w, self.n, self.e))
+
+def ler_regioes(txt: str = GLDAS_REGIOES, bbox: str = GLDAS_BBOX) -> List[Regiao]:
+    regioes: List[Regiao] = []
+    itens = [t.strip() for t in txt.split(";") if t.strip()]
+    if bbox:
+        itens.append(f"bbox:{bbox}")
+    for item in itens:
+        nome, _, coords = item.rpartition(":")
+        try:
+            s, w, n, e = (float(x) for x in coords.split(","))
+        except ValueError:
+            print(f"⚠️ Região GLDAS inválida ignorada: {item!r}")
+            continue
+        nome = re.sub(r"[^\w-]", "_", nome.strip()) or f"r{len(regioes)}"
+        if not (-90 <= s < n <= 90 and -180 <= w and e <= 180):
+            print(f"⚠️ Região GLDAS fora de -90..90/-180..180 ignorada: {item!r}")
+            continue
+        if w >= e:
+            # cruza o antimeridiano (ex.: 170 → -170): cadastre as duas metades como regiões
+            print(f"⚠️ Região GLDAS vazia ou cruzando o antimeridiano ignorada: {item!r}")
+            continue
+        regioes.append(Regiao(nome, s, w, n, e))
+    return regioes
+
+REGIOES = ler_regioes()
+
+def regiao_para(pontos: Sequence[Tuple[float, float]], regioes: Sequence[Regiao] = REGIOES) -> Optional[Regiao]:
+    """Primeira região que contém todos os pontos (None → granule global)."""
+    if not (GLDAS_OTF_SUBSET and pontos):
+        return None
+    for r in regioes:
+        if all(r.contem(lat, lon) for lat, lon in pontos):
+            return r
+    return None
+
+def regiao_do_nome(nome: str) -> str:
+    """Marca de região do arquivo ('' = granule global)."""
+    m = _MARCA.search(Path(str(nome)).name)
+    return m.group(1) if m else ""
+
+def nome_global(nome: str) -> str:
+    """Nome do granule sem a marca de região (mesma chave p/ o recorte e o global)."""
+    nome = Path(str(nome)).name
+    m = _MARCA.search(nome)
+    return f"{nome[:m.start()]}.nc4" if m else nome
+
+def nome_destino(nome: str, regiao: Optional[Regiao]) -> str:
+    if regiao is None:
+        return nome
+    base = nome[:-4] if nome.lower().endswith(".nc4") else nome
+    return f"{base}.R-{regiao.nome}.nc4"
+
+def restricao_opendap(variaveis: Sequence[str], regiao: Optional[Regiao],
+                      indice: Callable[[float, float], Tuple[int, int]], dap4: bool = False) -> str:
+    """Expressão de restrição: variáveis [tempo][lat][lon] só no hiperslab da região (DAP2 ou dap4.ce).
+
+    indice deve limitar as bordas à grade sem dar a volta na longitude (gldas_store.celula_borda).
+    """
+    if regiao is None:
+        partes = [*variaveis, "lat", "lon", "time"]
+    else:
+        i0, j0 = indice(regiao.s, regiao.w)
+        i1, j1 = indice(regiao.n, regiao.e)
+        i0, i1 = sorted((i0, i1))
+        j0, j1 = sorted((j0, j1))
+        fatia = f"[{i0}:1:{i1}][{j0}:1:{j1}]"
+        partes = [*(f"{v}[0:1:0]{fatia}" for v in variaveis),
+                  f"lat[{i0}:1:{i1}]", f"lon[{j0}:1:{j1}]", "time"]
+    if dap4:
+        return "dap4.ce=" + ";".join("/" + p for p in partes)
+    return ",".join(partes)
+
+def cobre_regiao(path, regiao: Regiao, res: float = RES_GRAUS) -> bool:
+    """O arquivo recortado tem todas as células da região? (servidor pode devolver outro recorte)"""
+    try:
+        try:
+            import netCDF4
+            with netCDF4.Dataset(str(path)) as nc:
+                lat = [float(x) for x in nc.variables["lat"][[0, -1]]]
+                lon = [float(x) for x in nc.variables["lon"][[0, -1]]]
+        except ImportError:
+            import xarray as xr
+            with xr.open_dataset(path) as ds:
+                lat = [float(ds.lat[0]), float(ds.lat[-1])]
+                lon = [float(ds.lon[0]), float(ds.lon[-1])]
+    except (OSError, KeyError, IndexError, ValueError):
+        return False
+    tol = res / 2 + 1e-6
+    s, n = max(regiao.s, -60.0), min(regiao.n, 90.0)
+    w, e = max(regiao.w, -180.0), min(regiao.e, 180.0)
+    return (min(lat) <= s + tol and max(lat) >= n - tol and
+            min(lon) <= w + tol and max(lon) >= e - tol)
+
+def url_opendap(url_dados: str, host: str = GLDAS_OPENDAP_HOST) -> Optional[str]:
+    """…/data/GLDAS/…nc4 → https://<host>/opendap/GLDAS/…nc4 (None se não for link de dados)."""
+    p = urlsplit(url_dados)
+    if "/data/" not in p.path or not p.path.lower().endswith(".nc4"):
+        return None
+    return urlunsplit(("https", host, p.path.replace("/data/", "/opendap/", 1), "", ""))
+
+def reescrever_url(url: str, variaveis: Sequence[str], regiao: Optional[Regiao],
+                   indice: Callable[[float, float], Tuple[int, int]]) -> str:
+    """Link do subset → link que pede só a região/variáveis (inalterado se não souber reescrever)."""
+    if not GLDAS_OTF_SUBSET:
+        return url
+    p = urlsplit(url)
+    if "HTTP_services.cgi" in p.path:
+        qs = [(k, v) for k, v in parse_qsl(p.query, keep_blank_values=True)
+              if k.upper() not in ("BBOX", "VARIABLES")]
+        if regiao is not None:
+            qs.append(("BBOX", regiao.bbox))
+        qs.append(("VARIABLES", ",".join(variaveis)))
+        return urlunsplit((p.scheme, p.netloc, p.path, urlencode(qs, safe=",/"), p.fragment))
+    if GLDAS_OPENDAP_SUBSET:
+        base = url_opendap(url)
+        if base:
+            return f"{base}.nc4?{restricao_opendap(variaveis, regiao, indice)}"
+    return url
@@ -0,0 +1,166 @@
+# -*- coding: utf-8 -*-
+"""
+gldas_point.py — extração pontual direta dos .nc4 GLDAS (sem open_mfdataset)
+
+- Calcula o índice (i, j) da célula uma vez (lat/lon 1-D do primeiro arquivo)
+- Lê de cada arquivo SÓ o hiperslab [:, i, j] das 6 variáveis usadas, via netCDF4
+- Arquivos lidos em paralelo num pool de processos único do módulo (criado na 1ª vez, contexto
+  'spawn' → seguro dentro do servidor com threads); amostras 3h → agregado diário
+"""
+from __future__ import annotations
+import atexit
+import multiprocessing
+import os
+import re
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+GLDAS_VARS = ("Tair_f_inst", "Wind_f_inst", "Rainf_f_tavg", "Psurf_f_inst", "SWdown_f_tavg", "Qair_f_inst")
+POINT_WORKERS = int(os.getenv("POINT_WORKERS", "0")) or (os.cpu_count() or 1)
+
+_POOL: Optional[ProcessPoolExecutor] = None
+_POOL_LOCK = threading.Lock()
+
+def _pool(workers: int) -> ProcessPoolExecutor:
+    """Pool de processos compartilhado (netCDF4/HDF5 não são confiáveis entre threads)."""
+    global _POOL
+    with _POOL_LOCK:
+        if _POOL is None:
+            _POOL = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+        return _POOL
+
+def _descartar_pool() -> None:
+    global _POOL
+    with _POOL_LOCK:
+        if _POOL is not None:
+            _POOL.shutdown(wait=False, cancel_futures=True)
+            _POOL = None
+
+atexit.register(_descartar_pool)
+
+def _coord(nc, *nomes):
+    for n in nomes:
+        if n in nc.variables:
+            return nc.variables[n]
+    raise KeyError(f"coordenada ausente: {nomes}")
+
+def indice_grade(lats: np.ndarray, lons: np.ndarray, lat: float, lon: float) -> Tuple[int, int]:
+    """Índice da célula mais próxima (mesma regra do sel(method='nearest')); erro se fora da grade."""
+    if float(np.nanmax(lons)) > 180:
+        lon = (lon + 360) % 360
+    i = int(np.abs(lats - lat).argmin())
+    j = int(np.abs(lons - lon).argmin())
+    res_lat = abs(float(lats[1] - lats[0])) if lats.size > 1 else 0.25
+    res_lon = abs(float(lons[1] - lons[0])) if lons.size > 1 else 0.25
+    if abs(float(lats[i]) - lat) > res_lat or abs(float(lons[j]) - lon) > res_lon:
+        raise ValueError(f"Ponto ({lat}, {lon}) fora da grade do arquivo.")
+    return i, j
+
+def _tempos(nc, arquivo: str, n: int) -> List[datetime]:
+    if "time" in nc.variables:
+        try:
+            import netCDF4
+            t = nc.variables["time"]
+            vals = netCDF4.num2date(t[:], t.units, getattr(t, "calendar", "standard"),
+                                    only_use_cftime_datetimes=False, only_use_python_datetimes=True)
+            return [datetime(v.year, v.month, v.day, v.hour, v.minute) for v in np.atleast_1d(vals)]
+        except Exception:
+            pass
+    m = re.search(r"A(\d{4})(\d{2})(\d{2})\.(\d{2})(\d{2})", Path(arquivo).name)
+    if not m:
+        raise ValueError(f"Sem tempo em {arquivo}")
+    return [datetime(*map(int, m.groups()))] * n
+
+def _ler_ponto(args) -> List[Tuple[datetime, Dict[str, float]]]:
+    """Worker: lê as variáveis no ponto (i, j) de um arquivo."""
+    arquivo, i, j, lat, lon, lat_ref, lon_ref, variaveis = args
+    import netCDF4
+    with netCDF4.Dataset(arquivo) as nc:
+        lat_v = _coord(nc, "lat", "latitude")
+        lon_v = _coord(nc, "lon", "longitude")
+        # grade diferente (ex.: recorte espacial) → recalcula o índice neste arquivo
+        if lat_v.shape[0] <= i or lon_v.shape[0] <= j or \
+                abs(float(lat_v[i]) - lat_ref) > 1e-4 or abs(float(lon_v[j]) - lon_ref) > 1e-4:
+            i, j = indice_grade(np.asarray(lat_v[:]), np.asarray(lon_v[:]), lat, lon)
+        vals: Dict[str, np.ndarray] = {}
+        n = 1
+        for v in variaveis:
+            if v not in nc.variables:
+                continue
+            var = nc.variables[v]
+            x = var[:, i, j] if var.ndim == 3 else var[i, j]
+            x = np.ma.filled(np.ma.asarray(x, dtype="f8"), np.nan).ravel()
+            vals[v] = x
+            n = max(n, x.size)
+        tempos = _tempos(nc, arquivo, n)
+    return [(t, {v: float(x[k]) for v, x in vals.items() if k < x.size}) for k, t in enumerate(tempos[:n])]
+
+def extrair_ponto(files: Sequence[str], lat: float, lon: float,
+                  variaveis: Sequence[str] = GLDAS_VARS, workers: int = POINT_WORKERS) -> pd.DataFrame:
+    """Série 3h (índice 'time') das variáveis no ponto, lendo só a célula de cada arquivo."""
+    import netCDF4
+    files = list(files)
+    if not files:
+        raise FileNotFoundError("Nenhum .nc4 disponível.")
+    with netCDF4.Dataset(files[0]) as nc:
+        lats = np.asarray(_coord(nc, "lat", "latitude")[:])
+        lons = np.asarray(_coord(nc, "lon", "longitude")[:])
+    i, j = indice_grade(lats, lons, lat, lon)
+    lat_ref, lon_ref = float(lats[i]), float(lons[j])
+
+    tarefas = [(f, i, j, lat, lon, lat_ref, lon_ref, tuple(variaveis)) for f in files]
+    print(f"📍 Lendo célula ({lat_ref:.3f}, {lon_ref:.3f}) de {len(files)} arquivo(s) GLDAS…")
+    if workers > 1 and len(tarefas) > 8:
+        try:
+            partes = list(_pool(workers).map(_ler_ponto, tarefas, chunksize=max(1, len(tarefas) // (workers * 4))))
+        except BrokenProcessPool:
+            _descartar_pool()   # worker morreu → próximo pedido recria o pool; este lê em série
+            partes = [_ler_ponto(t) for t in tarefas]
+    else:
+        partes = [_ler_ponto(t) for t in tarefas]
+
+    linhas = [(t, vals) for parte in partes for (t, vals) in parte]
+    df = pd.DataFrame([vals for _, vals in linhas], index=pd.DatetimeIndex([t for t, _ in linhas], name="time"))
+    return df.sort_index()
+
+def agregar_diario(df3h: pd.DataFrame) -> pd.DataFrame:
+    """Amostras 3h → diário (mesmas colunas/unidades de process_gldas_to_daily)."""
+    out = pd.DataFrame(index=df3h.index)
+    if "Tair_f_inst"   in df3h: out["temp_c"]    = df3h["Tair_f_inst"] - 273.15
+    if "Wind_f_inst"   in df3h: out["wind_kmh"]  = df3h["Wind_f_inst"] * 3.6
+    if "Rainf_f_tavg"  in df3h: out["rain_mm"]   = df3h["Rainf_f_tavg"] * 3600.0 * 3.0  # passo 3h → mm por passo
+    if "Psurf_f_inst"  in df3h: out["press_hpa"] = df3h["Psurf_f_inst"] / 100.0
+    if "SWdown_f_tavg" in df3h: out["solar_wm2"] = df3h["SWdown_f_tavg"]
+    if all(v in df3h for v in ("Qair_f_inst", "Tair_f_inst", "Psurf_f_inst")):
+        try:
+            import metpy.calc as mpcalc
+            from metpy.units import units
+            rh = mpcalc.relative_humidity_from_specific_humidity(
+                pressure=df3h["Psurf_f_inst"].values * units.pascal,
+                temperature=df3h["Tair_f_inst"].values * units.kelvin,
+                specific_humidity=df3h["Qair_f_inst"].values * units("kg/kg")).m
+            out["rh_pct"] = np.clip(np.asarray(rh) * 100.0, 0, 100)
+        except Exception:
+            pass
+
+    g = out.groupby(out.index.date)
+    daily = pd.DataFrame(index=pd.Index(sorted(set(out.index.date)), name="date"))
+    if "temp_c" in out:
+        daily["temp_mean_c"] = g["temp_c"].mean()
+        daily["temp_max_c"]  = g["temp_c"].max()
+        daily["temp_min_c"]  = g["temp_c"].min()
+    if "wind_kmh"  in out: daily["wind_mean_kmh"]     = g["wind_kmh"].mean()
+    if "rain_mm"   in out: daily["rain_mm_day"]       = g["rain_mm"].sum()
+    if "press_hpa" in out: daily["pressure_mean_hpa"] = g["press_hpa"].mean()
+    if "solar_wm2" in out: daily["solar_mean_wm2"]    = g["solar_wm2"].mean()
+    if "rh_pct"    in out: daily["rh_mean_pct"]       = g["rh_pct"].mean()
+    if daily.columns.empty:
+        raise ValueError("Dataset GLDAS sem variáveis esperadas.")
+    return daily
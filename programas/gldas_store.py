@@ -0,0 +1,123 @@
+# -*- coding: utf-8 -*-
+"""
+gldas_store.py — cache persistente dos diários GLDAS por célula 0.25° e ano
+
+- Guarda os frames produzidos por process_gldas_to_daily (1 linha por dia) em SQLite
+- Chave: célula da grade GLDAS_NOAH025 (índices i/j) + data; particionado por ano (índice)
+- avaliar_evento consulta aqui primeiro e só abre .nc4 para as datas que faltam
+- Qualquer faixa de anos/janela sai destes diários (estatísticas exatas), sem reler os .nc4
+"""
+from __future__ import annotations
+import sqlite3
+from pathlib import Path
+from datetime import date
+from typing import Iterable, Optional, Tuple
+
+import pandas as pd
+
+# Grade GLDAS_NOAH025: centros em -59.875..89.875 (lat) e -179.875..179.875 (lon)
+GLDAS_RES  = 0.25
+GLDAS_LAT0 = -59.875
+GLDAS_LON0 = -179.875
+GLDAS_NLAT = 600
+GLDAS_NLON = 1440
+
+# colunas do diário (mesmos nomes de process_gldas_to_daily)
+DAILY_COLS = [
+    "temp_mean_c", "temp_max_c", "temp_min_c", "wind_mean_kmh",
+    "rain_mm_day", "pressure_mean_hpa", "solar_mean_wm2", "rh_mean_pct",
+]
+
+def snap_gldas_cell(lat: float, lon: float) -> Tuple[int, int]:
+    """Índices (i, j) da célula GLDAS 0.25° que contém (lat, lon)."""
+    lon = ((float(lon) + 180.0) % 360.0) - 180.0
+    i = int(round((float(lat) - GLDAS_LAT0) / GLDAS_RES))
+    j = int(round((lon - GLDAS_LON0) / GLDAS_RES)) % GLDAS_NLON
+    return max(0, min(GLDAS_NLAT - 1, i)), j
+
+def celula_borda(lat: float, lon: float) -> Tuple[int, int]:
+    """Índices (i, j) de uma borda de recorte: sem dar a volta na longitude (leste 180 → última coluna)."""
+    i = int(round((float(lat) - GLDAS_LAT0) / GLDAS_RES))
+    j = int(round((float(lon) - GLDAS_LON0) / GLDAS_RES))
+    return max(0, min(GLDAS_NLAT - 1, i)), max(0, min(GLDAS_NLON - 1, j))
+
+def cell_center(i: int, j: int) -> Tuple[float, float]:
+    return GLDAS_LAT0 + i * GLDAS_RES, GLDAS_LON0 + j * GLDAS_RES
+
+class DailyStore:
+    """Diários GLDAS por ponto, persistidos em SQLite (uma conexão por operação → thread-safe)."""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self._conn() as con:
+            cols = ", ".join(f"{c} REAL" for c in DAILY_COLS)
+            con.execute(
+                f"CREATE TABLE IF NOT EXISTS daily ("
+                f" cell_i INTEGER NOT NULL, cell_j INTEGER NOT NULL, year INTEGER NOT NULL,"
+                f" date TEXT NOT NULL, {cols},"
+                f" PRIMARY KEY (cell_i, cell_j, date))"
+            )
+            con.execute("CREATE INDEX IF NOT EXISTS ix_daily_cell_year ON daily (cell_i, cell_j, year)")
+
+    def _conn(self) -> sqlite3.Connection:
+        con = sqlite3.connect(self.path, timeout=30)
+        con.execute("PRAGMA journal_mode=WAL")
+        con.execute("PRAGMA synchronous=NORMAL")
+        return con
+
+    def get(self, lat: float, lon: float, dates: Iterable[date]) -> pd.DataFrame:
+        """Diários já guardados para as datas pedidas (índice 'date', como process_gldas_to_daily)."""
+        wanted = sorted({d.isoformat() for d in dates})
+        if not wanted:
+            return pd.DataFrame(columns=DAILY_COLS).rename_axis("date")
+        i, j = snap_gldas_cell(lat, lon)
+        years = sorted({int(d[:4]) for d in wanted})
+        q = (f"SELECT date, {', '.join(DAILY_COLS)} FROM daily"
+             f" WHERE cell_i=? AND cell_j=? AND year IN ({','.join('?' * len(years))})")
+        con = self._conn()
+        try:
+            rows = con.execute(q, (i, j, *years)).fetchall()
+        finally:
+            con.close()
+        wanted_set = set(wanted)
+        rows = [r for r in rows if r[0] in wanted_set]
+        df = pd.DataFrame(rows, columns=["date", *DAILY_COLS])
+        df["date"] = pd.to_datetime(df["date"]).dt.date
+        df = df.set_index("date").sort_index()
+        return df.dropna(axis=1, how="all")
+
+    def missing(self, lat: float, lon: float, dates: Iterable[date]) -> list[date]:
+        dates = sorted(set(dates))
+        have = set(self.get(lat, lon, dates).index)
+        return [d for d in dates if d not in have]
+
+    def put(self, lat: float, lon: float, df_daily: pd.DataFrame,
+            only_dates: Optional[Iterable[date]] = None) -> int:
+        """Grava/atualiza os diários. only_dates restringe aos dias completos (8 passos de 3h)."""
+        if df_daily is None or df_daily.empty:
+            return 0
+        keep = None if only_dates is None else set(only_dates)
+        i, j = snap_gldas_cell(lat, lon)
+        recs = []
+        for d, row in df_daily.iterrows():
+            d = pd.to_datetime(d).date()
+            if keep is not None and d not in keep:
+                continue
+            vals = []
+            for c in DAILY_COLS:
+                v = row.get(c)
+                vals.append(None if v is None or pd.isna(v) else float(v))
+            recs.append((i, j, d.year, d.isoformat(), *vals))
+        if not recs:
+            return 0
+        marks = ",".join("?" * (4 + len(DAILY_COLS)))
+        con = self._conn()
+        try:
+            with con:
+                con.executemany(
+                    f"INSERT OR REPLACE INTO daily (cell_i, cell_j, year, date, {', '.join(DAILY_COLS)})"
+                    f" VALUES ({marks})", recs)
+        finally:
+            con.close()
+        return len(recs)
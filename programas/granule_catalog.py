@@ -0,0 +1,292 @@
+# -*- coding: utf-8 -*-
+"""
+granule_catalog.py — catálogo (manifesto SQLite) dos granules .nc4 já no disco
+
+- Uma linha por arquivo: nome, caminho, instante (UTC) do passo GLDAS, dia, tamanho, mtime, válido
+  e região do recorte ('' = granule global; ver gldas_otf.py)
+- Reconciliação com o diretório por stat (sem abrir nada); só revalida arquivo novo/alterado
+  (no máximo a cada GRANULE_CATALOG_SYNC_S por processo)
+- faltantes(links): só os links cujo passo (instante) ainda não tem granule válido → delta do download
+- arquivos_por_dia(datas): exatamente os .nc4 da janela pedida (sem varrer o diretório inteiro)
+- Orçamento de disco (RAW_CACHE_MAX_GB): despeja por LRU/LFU (último acesso/nº de acessos) até
+  RAW_CACHE_ALVO do limite; dias fixados (em uso por uma avaliação ou janelas quentes do prefetch)
+  nunca saem; estatísticas de hit/miss/bytes despejados
+- Manifesto fica em <raw>/_catalogo_granulos.sqlite; uma conexão por operação → thread-safe
+"""
+from __future__ import annotations
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from datetime import date, datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+GRANULE_CATALOG_ENABLE = os.getenv("GRANULE_CATALOG_ENABLE", "true").lower() in ("1","true","yes","y")
+GRANULE_CATALOG_SYNC_S = float(os.getenv("GRANULE_CATALOG_SYNC_S", "300"))   # s entre varreduras do diretório
+NOME_MANIFESTO = "_catalogo_granulos.sqlite"
+RAW_CACHE_MAX_GB   = float(os.getenv("RAW_CACHE_MAX_GB", "0"))                # 0 = sem limite
+RAW_CACHE_ALVO     = float(os.getenv("RAW_CACHE_ALVO", "0.9"))                # despeja até esta fração do limite
+RAW_CACHE_POLITICA = os.getenv("RAW_CACHE_POLITICA", "lru").strip().lower()   # lru | lfu
+
+class CatalogoGranulos:
+    """Manifesto dos granules de um diretório raw (instante do passo → arquivo válido)."""
+
+    def __init__(self, raiz: Path, instante: Callable[[str], Optional[datetime]],
+                 validar: Callable[[Path], bool], db: Optional[Path] = None,
+                 regiao: Optional[Callable[[str], str]] = None):
+        self.raiz = Path(raiz)
+        self.instante = instante          # nome/caminho do .nc4 → datetime do passo (ou None)
+        self.validar = validar            # integridade (downloader.arquivo_valido)
+        self.regiao = regiao or (lambda nome: "")   # nome → região do recorte ('' = global)
+        self.db = Path(db) if db else self.raiz / NOME_MANIFESTO
+        self._lock = threading.Lock()
+        self._sincronizado = 0.0
+        self._em_uso: Dict[str, int] = {}      # dia → avaliações usando (não despejar)
+        self.hits = self.misses = self.despejados = self.bytes_despejados = 0
+        self.db.parent.mkdir(parents=True, exist_ok=True)
+        con = self._conn()
+        try:
+            with con:
+                con.execute(
+                    "CREATE TABLE IF NOT EXISTS granulos ("
+                    " nome TEXT PRIMARY KEY, caminho TEXT NOT NULL, instante TEXT, dia TEXT,"
+                    " tamanho INTEGER NOT NULL, mtime_ns INTEGER NOT NULL, valido INTEGER NOT NULL)")
+                con.execute("CREATE INDEX IF NOT EXISTS ix_granulos_dia ON granulos (dia)")
+                cols = {r[1] for r in con.execute("PRAGMA table_info(granulos)")}
+                if "ultimo_acesso" not in cols:   # manifestos antigos
+                    con.execute("ALTER TABLE granulos ADD COLUMN ultimo_acesso REAL NOT NULL DEFAULT 0")
+                    con.execute("ALTER TABLE granulos ADD COLUMN acessos INTEGER NOT NULL DEFAULT 0")
+                if "regiao" not in cols:
+                    con.execute("ALTER TABLE granulos ADD COLUMN regiao TEXT NOT NULL DEFAULT ''")
+                con.execute("CREATE TABLE IF NOT EXISTS fixados (dia TEXT NOT NULL, origem TEXT NOT NULL,"
+                            " PRIMARY KEY (dia, origem))")
+        finally:
+            con.close()
+
+    def _conn(self) -> sqlite3.Connection:
+        con = sqlite3.connect(self.db, timeout=30)
+        con.execute("PRAGMA journal_mode=WAL")
+        con.execute("PRAGMA synchronous=NORMAL")
+        return con
+
+    def _linha(self, path: Path, st: os.stat_result) -> Tuple:
+        dt = self.instante(path.name)
+        return (path.name, str(path), dt.isoformat() if dt else None, dt.date().isoformat() if dt else None,
+                st.st_size, st.st_mtime_ns, int(self.validar(path)), time.time(), self.regiao(path.name))
+
+    def sincronizar(self, forcar: bool = False) -> Dict[str, int]:
+        """Reconcilia o manifesto com o disco (stat de cada .nc4; valida só os novos/alterados)."""
+        with self._lock:
+            if not forcar and time.monotonic() - self._sincronizado < GRANULE_CATALOG_SYNC_S:
+                return {}
+            con = self._conn()
+            try:
+                conhecidos = {r[0]: (r[1], r[2], r[3]) for r in
+                              con.execute("SELECT nome, caminho, tamanho, mtime_ns FROM granulos")}
+                novos: List[Tuple] = []
+                vistos = set()
+                for dirpath, _dirs, nomes in os.walk(self.raiz):
+                    for nome in nomes:
+                        if not nome.lower().endswith(".nc4"):
+                            continue
+                        p = Path(dirpath) / nome
+                        try:
+                            st = p.stat()
+                        except OSError:
+                            continue
+                        vistos.add(nome)
+                        if conhecidos.get(nome) != (str(p), st.st_size, st.st_mtime_ns):
+                            novos.append(self._linha(p, st))
+                sumidos = [n for n in conhecidos if n not in vistos]
+                with con:
+                    con.executemany(_UPSERT, novos)
+                    con.executemany("DELETE FROM granulos WHERE nome=?", [(n,) for n in sumidos])
+            finally:
+                con.close()
+            self._sincronizado = time.monotonic()
+        if novos or sumidos:
+            print(f"🗃️ Catálogo de granules: {len(novos)} novo(s)/alterado(s), {len(sumidos)} removido(s).")
+        return {"novos": len(novos), "removidos": len(sumidos)}
+
+    def registrar(self, path: Path) -> bool:
+        """Registra/atualiza um arquivo recém-baixado; devolve se está válido."""
+        path = Path(path)
+        try:
+            linha = self._linha(path, path.stat())
+        except OSError:
+            return False
+        con = self._conn()
+        try:
+            with con:
+                con.execute(_UPSERT, linha)
+        finally:
+            con.close()
+        return bool(linha[6])
+
+    def _validos_nos_dias(self, dias: Iterable[str], regioes: Iterable[str]) -> List[Tuple[str, str, str, str]]:
+        dias = sorted(set(dias))
+        regioes = set(regioes)
+        if not dias:
+            return []
+        self.sincronizar()
+        con = self._conn()
+        try:
+            out: List[Tuple[str, str, str, str]] = []
+            for k in range(0, len(dias), 500):   # limite de parâmetros do SQLite
+                bloco = dias[k:k + 500]
+                out += con.execute(f"SELECT caminho, instante, dia, regiao FROM granulos WHERE valido=1"
+                                   f" AND dia IN ({','.join('?' * len(bloco))})", bloco).fetchall()
+            return [r for r in out if r[3] in regioes]
+        finally:
+            con.close()
+
+    def faltantes(self, links: List[str], instante_link: Callable[[str], Optional[datetime]],
+                  regioes: Iterable[str] = ("",)) -> List[str]:
+        """Links cujo passo ainda não tem granule válido (global ou de uma das `regioes`) no disco."""
+        por_link = [(u, instante_link(u)) for u in links]
+        presentes = {r[1] for r in self._validos_nos_dias((dt.date().isoformat() for _u, dt in por_link if dt), regioes)}
+        out = [u for u, dt in por_link if dt is None or dt.isoformat() not in presentes]
+        self.hits += len(links) - len(out)
+        self.misses += len(out)
+        return out
+
+    def arquivos_por_dia(self, datas: Iterable[date], regioes: Iterable[str] = ("",)) -> Dict[date, List[str]]:
+        """{dia: [.nc4 válidos daquele dia]} só para as datas pedidas (um arquivo por passo, recorte antes do global)."""
+        out: Dict[date, List[str]] = {}
+        vistos = set()
+        linhas = self._validos_nos_dias((d.isoformat() for d in datas), regioes)
+        for caminho, inst, dia, _reg in sorted(linhas, key=lambda r: (r[3] == "", r[0])):
+            if inst in vistos or not os.path.exists(caminho):
+                continue
+            vistos.add(inst)
+            out.setdefault(date.fromisoformat(dia), []).append(caminho)
+        self._tocar([c for cs in out.values() for c in cs])
+        return out
+
+    def _tocar(self, caminhos: List[str]) -> None:
+        """Marca acesso (ordem do LRU / contagem do LFU)."""
+        if not caminhos:
+            return
+        agora = time.time()
+        con = self._conn()
+        try:
+            with con:
+                con.executemany("UPDATE granulos SET ultimo_acesso=?, acessos=acessos+1 WHERE caminho=?",
+                                [(agora, c) for c in caminhos])
+        finally:
+            con.close()
+
+    # ---------- orçamento de disco ----------
+    @contextmanager
+    def usando(self, datas: Iterable[date]) -> Iterator[None]:
+        """Fixa os dias enquanto uma avaliação baixa/abre os .nc4 deles."""
+        dias = {d.isoformat() for d in datas}
+        with self._lock:
+            for d in dias:
+                self._em_uso[d] = self._em_uso.get(d, 0) + 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                for d in dias:
+                    n = self._em_uso.get(d, 0) - 1
+                    if n > 0:
+                        self._em_uso[d] = n
+                    else:
+                        self._em_uso.pop(d, None)
+
+    def fixar(self, datas: Iterable[date], origem: str) -> None:
+        """Substitui o conjunto de dias fixados por `origem` (persistente; ex.: janelas do prefetch)."""
+        dias = sorted({d.isoformat() for d in datas})
+        con = self._conn()
+        try:
+            with con:
+                con.execute("DELETE FROM fixados WHERE origem=?", (origem,))
+                con.executemany("INSERT OR IGNORE INTO fixados (dia, origem) VALUES (?,?)", [(d, origem) for d in dias])
+        finally:
+            con.close()
+
+    def despejar(self, limite_bytes: int, alvo: float = RAW_CACHE_ALVO,
+                 politica: str = RAW_CACHE_POLITICA) -> Dict[str, int]:
+        """Acima do limite, apaga granules (LRU ou LFU) até `alvo` × limite; pula dias fixados/em uso."""
+        if limite_bytes <= 0:
+            return {"arquivos": 0, "bytes": 0}
+        ordem = "acessos, ultimo_acesso" if politica == "lfu" else "ultimo_acesso, acessos"
+        self.sincronizar()
+        con = self._conn()
+        try:
+            total = con.execute("SELECT COALESCE(SUM(tamanho), 0) FROM granulos").fetchone()[0]
+            if total <= limite_bytes:
+                return {"arquivos": 0, "bytes": 0}
+            fixos = {r[0] for r in con.execute("SELECT dia FROM fixados")}
+            candidatos = con.execute(f"SELECT nome, caminho, dia, tamanho FROM granulos ORDER BY {ordem}").fetchall()
+        finally:
+            con.close()
+        with self._lock:
+            fixos |= set(self._em_uso)
+        meta = int(limite_bytes * min(1.0, max(0.0, alvo)))
+        apagados: List[str] = []
+        liberados = 0
+        for nome, caminho, dia, tamanho in candidatos:
+            if total - liberados <= meta:
+                break
+            if dia in fixos:
+                continue
+            try:
+                os.remove(caminho)
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                print(f"⚠️ Não consegui despejar {nome}: {e}")
+                continue
+            apagados.append(nome)
+            liberados += tamanho
+        if apagados:
+            con = self._conn()
+            try:
+                with con:
+                    con.executemany("DELETE FROM granulos WHERE nome=?", [(n,) for n in apagados])
+            finally:
+                con.close()
+            self.despejados += len(apagados)
+            self.bytes_despejados += liberados
+            print(f"🧹 Cache raw: {len(apagados)} granule(s) despejado(s) ({liberados / 1e6:.1f} MB, {politica}).")
+        return {"arquivos": len(apagados), "bytes": liberados}
+
+    def estatisticas(self) -> Dict[str, Any]:
+        self.sincronizar()
+        con = self._conn()
+        try:
+            n, total = con.execute("SELECT COUNT(*), COALESCE(SUM(tamanho), 0) FROM granulos").fetchone()
+            fixos = con.execute("SELECT COUNT(DISTINCT dia) FROM fixados").fetchone()[0]
+        finally:
+            con.close()
+        return {"arquivos": n, "bytes": total, "limite_bytes": int(RAW_CACHE_MAX_GB * 1e9),
+                "dias_fixados": fixos, "dias_em_uso": len(self._em_uso),
+                "hits": self.hits, "misses": self.misses,
+                "despejados": self.despejados, "bytes_despejados": self.bytes_despejados}
+
+_UPSERT = ("INSERT INTO granulos (nome, caminho, instante, dia, tamanho, mtime_ns, valido, ultimo_acesso, regiao)"
+           " VALUES (?,?,?,?,?,?,?,?,?) ON CONFLICT(nome) DO UPDATE SET caminho=excluded.caminho,"
+           " instante=excluded.instante, dia=excluded.dia, tamanho=excluded.tamanho,"
+           " mtime_ns=excluded.mtime_ns, valido=excluded.valido, regiao=excluded.regiao")
+
+_CATALOGOS: Dict[str, CatalogoGranulos] = {}
+_LOCK = threading.Lock()
+
+def catalogo(raiz: Path, instante: Callable[[str], Optional[datetime]],
+             validar: Callable[[Path], bool], regiao: Optional[Callable[[str], str]] = None) -> CatalogoGranulos:
+    """Catálogo único por diretório raw no processo."""
+    chave = str(Path(raiz).resolve())
+    with _LOCK:
+        cat = _CATALOGOS.get(chave)
+        if cat is None:
+            cat = _CATALOGOS[chave] = CatalogoGranulos(Path(raiz), instante, validar, regiao=regiao)
+        return cat
+
+def estado_catalogos() -> Dict[str, Dict[str, Any]]:
+    with _LOCK:
+        cats = dict(_CATALOGOS)
+    return {raiz: cat.estatisticas() for raiz, cat in cats.items()}
@@ -0,0 +1,103 @@
+# -*- coding: utf-8 -*-
+"""
+http_client.py — sessões HTTP compartilhadas por provedor (Google Weather, Open-Meteo, ERA5)
+
+- Uma requests.Session por provedor, com pool keep-alive dimensionado e retry leve (5xx)
+  → reaproveita conexões TCP/TLS entre chamadas em vez de abrir uma por requisição
+- Um httpx.AsyncClient por provedor e por event loop (HTTP/2 se o pacote 'h2' existir)
+- Timeouts por provedor: (conexão, leitura)
+"""
+from __future__ import annotations
+import os
+import threading
+import weakref
+from typing import Any, Dict, Tuple
+
+import requests
+
+HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", "5"))
+
+# provedor → pool de conexões e timeout de leitura (s); HTTP_POOL_<PROVEDOR> / HTTP_TIMEOUT_<PROVEDOR>
+PROVEDORES: Dict[str, Dict[str, Any]] = {
+    "google":    {"pool": 10, "timeout": 20},
+    "openmeteo": {"pool": 10, "timeout": 30},
+    "era5":      {"pool": 10, "timeout": 30},
+}
+for _nome, _cfg in PROVEDORES.items():
+    _cfg["pool"] = int(os.getenv(f"HTTP_POOL_{_nome.upper()}", _cfg["pool"]))
+    _cfg["timeout"] = float(os.getenv(f"HTTP_TIMEOUT_{_nome.upper()}", _cfg["timeout"]))
+
+def _cfg(provedor: str) -> Dict[str, Any]:
+    return PROVEDORES.get(provedor) or {"pool": 4, "timeout": 30}
+
+def timeout_de(provedor: str) -> Tuple[float, float]:
+    return HTTP_CONNECT_TIMEOUT, float(_cfg(provedor)["timeout"])
+
+_LOCK = threading.Lock()
+_SESSOES: Dict[str, requests.Session] = {}
+
+def sessao(provedor: str) -> requests.Session:
+    """Session compartilhada (thread-safe para GETs) com pool keep-alive do provedor."""
+    s = _SESSOES.get(provedor)
+    if s is not None:
+        return s
+    with _LOCK:
+        s = _SESSOES.get(provedor)
+        if s is None:
+            from requests.adapters import HTTPAdapter
+            from urllib3.util.retry import Retry
+            pool = max(1, int(_cfg(provedor)["pool"]))
+            retry = Retry(total=2, connect=2, read=0, backoff_factor=0.3,
+                          status_forcelist=(502, 503, 504), allowed_methods=frozenset({"GET"}),
+                          raise_on_status=False)
+            adapter = HTTPAdapter(pool_connections=pool, pool_maxsize=pool, max_retries=retry)
+            s = requests.Session()
+            s.mount("https://", adapter)
+            s.mount("http://", adapter)
+            _SESSOES[provedor] = s
+    return s
+
+def http_get(provedor: str, url: str, **kwargs) -> requests.Response:
+    """GET pela sessão do provedor (timeout padrão do provedor se não vier em kwargs)."""
+    kwargs.setdefault("timeout", timeout_de(provedor))
+    return sessao(provedor).get(url, **kwargs)
+
+def _http2() -> bool:
+    try:
+        import h2  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+# loop → {provedor: AsyncClient}; o cliente httpx fica preso ao loop em que foi criado
+_ASYNC: "weakref.WeakKeyDictionary[Any, Dict[str, Any]]" = weakref.WeakKeyDictionary()
+
+def cliente_async(provedor: str):
+    """httpx.AsyncClient compartilhado do provedor no event loop atual (não fechar após o uso)."""
+    import asyncio
+    import httpx
+    loop = asyncio.get_running_loop()
+    por_loop = _ASYNC.setdefault(loop, {})
+    c = por_loop.get(provedor)
+    if c is None or c.is_closed:
+        pool = max(1, int(_cfg(provedor)["pool"]))
+        c = httpx.AsyncClient(
+            http2=_http2(),
+            timeout=httpx.Timeout(float(_cfg(provedor)["timeout"]), connect=HTTP_CONNECT_TIMEOUT),
+            limits=httpx.Limits(max_connections=pool, max_keepalive_connections=pool),
+        )
+        por_loop[provedor] = c
+    return c
+
+async def fechar_clientes_async() -> None:
+    """Fecha os AsyncClient do loop atual (ex.: no shutdown da API)."""
+    import asyncio
+    por_loop = _ASYNC.pop(asyncio.get_running_loop(), {})
+    for c in por_loop.values():
+        await c.aclose()
+
+def fechar() -> None:
+    with _LOCK:
+        for s in _SESSOES.values():
+            s.close()
+        _SESSOES.clear()
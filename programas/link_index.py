@@ -0,0 +1,90 @@
+# -*- coding: utf-8 -*-
+"""
+link_index.py — índice pré-compilado dos links do subset TXT (GES DISC)
+
+- Lê/parseia o TXT uma única vez: url → (ano, dia-do-ano, hora, minuto, nome destino)
+- Persiste em <subset>.idx.json ao lado do TXT; invalida por mtime/tamanho
+- Mantém o índice em memória por processo; busca por data em O(janela)
+"""
+from __future__ import annotations
+import json
+import os
+import threading
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Tuple
+
+INDEX_VERSION = 1
+
+class LinkIndex:
+    """Links do subset agrupados por data (UTC) do passo GLDAS."""
+
+    def __init__(self, entries: List[Tuple[str, int, int, int, int, str]]):
+        self.entries = entries
+        self.por_data: Dict[date, List[int]] = {}
+        for k, (_u, y, doy, _hh, _mm, _dest) in enumerate(entries):
+            d = (datetime(y, 1, 1) + timedelta(days=doy - 1)).date()
+            self.por_data.setdefault(d, []).append(k)
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def links_para_datas(self, datas: Iterable[date]) -> List[str]:
+        out: List[str] = []
+        for d in sorted(set(datas)):
+            out += [self.entries[k][0] for k in self.por_data.get(d, [])]
+        return out
+
+_MEMO: Dict[str, Tuple[Tuple[int, int], LinkIndex]] = {}
+_LOCK = threading.Lock()
+
+def _assinatura(txt: Path) -> Tuple[int, int]:
+    st = txt.stat()
+    return st.st_mtime_ns, st.st_size
+
+def caminho_indice(txt: Path) -> Path:
+    return txt.with_name(txt.name + ".idx.json")
+
+def carregar_indice(txt: Path,
+                    read_links: Callable[[Path], List[str]],
+                    parse_url: Callable[[str], Tuple[int, int, int, int]],
+                    dest_name: Callable[[str], str]) -> LinkIndex:
+    """Índice do subset TXT: memória → sidecar .idx.json (se válido) → reconstrução."""
+    txt = Path(txt)
+    sig = _assinatura(txt)
+    chave = str(txt.resolve())
+    with _LOCK:
+        memo = _MEMO.get(chave)
+        if memo and memo[0] == sig:
+            return memo[1]
+
+        side = caminho_indice(txt)
+        idx = None
+        if side.is_file():
+            try:
+                data = json.loads(side.read_text(encoding="utf-8"))
+                if data.get("version") == INDEX_VERSION and tuple(data.get("sig", ())) == sig:
+                    idx = LinkIndex([tuple(e) for e in data["entries"]])
+            except Exception:
+                idx = None
+
+        if idx is None:
+            entries = []
+            for u in read_links(txt):
+                try:
+                    y, doy, hh, mm = parse_url(u)
+                except Exception:
+                    continue
+                entries.append((u, y, doy, hh, mm, dest_name(u)))
+            idx = LinkIndex(entries)
+            try:
+                tmp = side.with_name(side.name + ".tmp")
+                tmp.write_text(json.dumps({"version": INDEX_VERSION, "sig": list(sig),
+                                           "entries": entries}), encoding="utf-8")
+                os.replace(tmp, side)
+            except OSError:
+                pass   # diretório só-leitura: fica só em memória
+            print(f"🗂️ Índice do subset gerado: {len(idx)} link(s) → {side.name}")
+
+        _MEMO[chave] = (sig, idx)
+        return idx
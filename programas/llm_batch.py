@@ -0,0 +1,122 @@
+# -*- coding: utf-8 -*-
+"""
+llm_batch.py — agrupamento (micro-batching) de pedidos de recomendação à IA
+
+- Pedidos que chegam numa janela curta (LLM_BATCH_WINDOW_MS) são juntados, por modelo,
+  em lotes de até LLM_BATCH_MAX itens
+- Quem chama entrega a função do lote: um prompt com vários itens ou várias chamadas em
+  paralelo (LLM_BATCH_MODE) — até LLM_BATCH_CONCURRENCY lotes simultâneos
+- demultiplexar: resposta JSON do lote → um objeto por item (None = usar o fallback do item)
+"""
+from __future__ import annotations
+import json
+import os
+import re
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Hashable, List, Optional, Sequence, Tuple
+
+LLM_BATCH_ENABLE      = os.getenv("LLM_BATCH_ENABLE", "false").lower() in ("1","true","yes","y")
+LLM_BATCH_WINDOW_MS   = float(os.getenv("LLM_BATCH_WINDOW_MS", "50"))
+LLM_BATCH_MAX         = int(os.getenv("LLM_BATCH_MAX", "8"))
+LLM_BATCH_MODE        = os.getenv("LLM_BATCH_MODE", "prompt").strip().lower()    # prompt | parallel
+LLM_BATCH_CONCURRENCY = int(os.getenv("LLM_BATCH_CONCURRENCY", "2"))
+
+class AgrupadorLLM:
+    """Junta pedidos concorrentes e executa `executar(grupo, itens) -> [resultado|None, ...]` por lote."""
+
+    def __init__(self, executar: Callable[[Hashable, List[Any]], Sequence[Any]],
+                 janela_ms: float = LLM_BATCH_WINDOW_MS, max_itens: int = LLM_BATCH_MAX,
+                 concorrencia: int = LLM_BATCH_CONCURRENCY):
+        self.executar = executar
+        self.janela = max(0.0, janela_ms / 1000.0)
+        self.max_itens = max(1, int(max_itens))
+        self._cv = threading.Condition()
+        self._fila: List[Tuple[float, Hashable, Any, Future]] = []
+        self._pool = ThreadPoolExecutor(max_workers=max(1, int(concorrencia)), thread_name_prefix="llm-lote")
+        self._despachante: Optional[threading.Thread] = None
+        self.lotes = self.itens = 0
+
+    def pedir(self, grupo: Hashable, item: Any, timeout: Optional[float] = None) -> Any:
+        """Bloqueia até o lote do item terminar; None em erro/timeout (→ fallback do item)."""
+        fut: Future = Future()
+        with self._cv:
+            self._fila.append((time.monotonic(), grupo, item, fut))
+            if self._despachante is None or not self._despachante.is_alive():
+                self._despachante = threading.Thread(target=self._laco, daemon=True, name="llm-agrupador")
+                self._despachante.start()
+            self._cv.notify()
+        try:
+            return fut.result(timeout=timeout)
+        except Exception:
+            return None
+
+    def _laco(self) -> None:
+        while True:
+            with self._cv:
+                while not self._fila:
+                    self._cv.wait()
+                # espera a janela do pedido mais antigo (ou até encher o lote)
+                prazo = self._fila[0][0] + self.janela
+                while len(self._fila) < self.max_itens:
+                    resta = prazo - time.monotonic()
+                    if resta <= 0:
+                        break
+                    self._cv.wait(resta)
+                grupo = self._fila[0][1]
+                lote = [p for p in self._fila if p[1] == grupo][:self.max_itens]
+                ids = {id(p) for p in lote}
+                self._fila = [p for p in self._fila if id(p) not in ids]
+            self.lotes += 1
+            self.itens += len(lote)
+            self._pool.submit(self._rodar, grupo, lote)
+
+    def _rodar(self, grupo: Hashable, lote: List[Tuple[float, Hashable, Any, Future]]) -> None:
+        try:
+            res = list(self.executar(grupo, [p[2] for p in lote]))
+        except Exception as e:
+            print(f"⚠️ Lote da IA falhou ({len(lote)} item(ns)): {e}")
+            res = []
+        for k, p in enumerate(lote):
+            if not p[3].done():
+                p[3].set_result(res[k] if k < len(res) else None)
+
+def demultiplexar(raw: str, n: int) -> List[Optional[Dict[str, Any]]]:
+    """
+    Resposta do lote → lista com n objetos (ou None por item ausente/ilegível).
+    Aceita {"itens": [...]}, uma lista JSON ou objetos soltos no texto; usa 'id' quando houver.
+    """
+    raw = (raw or "").strip().strip("`").strip()
+    objs: List[Any] = []
+    try:
+        doc = json.loads(raw)
+        if isinstance(doc, dict):
+            lista = next((doc[k] for k in ("itens", "items", "results", "respostas") if isinstance(doc.get(k), list)), None)
+            objs = lista if lista is not None else [doc]
+        elif isinstance(doc, list):
+            objs = doc
+    except Exception:
+        for m in re.finditer(r"\{[^{}]*\}", raw, flags=re.S):
+            try:
+                objs.append(json.loads(m.group(0)))
+            except Exception:
+                continue
+    out: List[Optional[Dict[str, Any]]] = [None] * n
+    livres = []
+    for pos, o in enumerate(objs):
+        if not isinstance(o, dict):
+            continue
+        try:
+            i = int(o.get("id"))
+        except (TypeError, ValueError):
+            i = None
+        if i is not None and 0 <= i < n and out[i] is None:
+            out[i] = o
+        else:
+            livres.append((pos, o))
+    # sem 'id' → posição na resposta
+    for pos, o in livres:
+        if pos < n and out[pos] is None:
+            out[pos] = o
+    return out
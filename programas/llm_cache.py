@@ -0,0 +1,59 @@
+# -*- coding: utf-8 -*-
+"""
+llm_cache.py — chave canônica do contexto da recomendação (IA) para memoização
+
+- Mesmo contexto (data, tipo de evento, nomes, médias históricas, previsão do dia) + mesmo
+  modelo → mesma chave, independente da ordem dos campos
+- Números vão para faixas (ex.: temperatura de 1 °C, prob. de chuva de 10 %) → contextos
+  quase iguais reaproveitam a 'mensagem' já gerada
+- O armazenamento (LRU + SQLite opcional) é o CacheTTL de forecast_cache.py
+"""
+from __future__ import annotations
+import hashlib
+import json
+import math
+import os
+from typing import Any, Dict, Optional
+
+LLM_CACHE_ENABLE = os.getenv("LLM_CACHE_ENABLE", "true").lower() in ("1","true","yes","y")
+LLM_CACHE_TTL    = float(os.getenv("LLM_CACHE_TTL", str(7 * 86400)))   # s
+LLM_CACHE_SIZE   = int(os.getenv("LLM_CACHE_SIZE", "4096"))
+LLM_CACHE_DB     = os.getenv("LLM_CACHE_DB", "").strip()               # SQLite opcional (vazio = só memória)
+
+# largura da faixa por campo numérico; demais números usam FAIXA_PADRAO
+FAIXAS: Dict[str, float] = {
+    "temp_mean_c": 1.0, "tmax": 1.0, "tmin": 1.0, "apparent_max": 1.0,
+    "rain_mm_day": 1.0, "precip_mm": 1.0,
+    "precip_prob": 10.0, "humidity_mean": 10.0,
+    "wind_max": 5.0, "visibility_km": 1.0,
+}
+FAIXA_PADRAO = float(os.getenv("LLM_CACHE_BUCKET", "1.0"))
+# texto derivado dos números (já presentes na chave) → fora da chave
+IGNORAR = {"resumo", "provider"}
+
+def _faixa(nome: Optional[str], v: float) -> Any:
+    if not math.isfinite(v):
+        return None
+    passo = FAIXAS.get(nome or "", FAIXA_PADRAO)
+    return round(round(v / passo) * passo, 6) if passo > 0 else v
+
+def _canonico(valor: Any, nome: Optional[str] = None) -> Any:
+    if isinstance(valor, dict):
+        return {str(k): _canonico(v, str(k)) for k, v in valor.items() if k not in IGNORAR}
+    if isinstance(valor, (list, tuple)):
+        return [_canonico(v, nome) for v in valor]
+    if isinstance(valor, bool) or valor is None:
+        return valor
+    if isinstance(valor, (int, float)):
+        return _faixa(nome, float(valor))
+    try:  # numpy escalares
+        return _faixa(nome, float(valor.item()))
+    except (AttributeError, TypeError, ValueError):
+        pass
+    return str(valor).strip().lower()
+
+def chave_contexto(contexto: Dict[str, Any], model: str) -> str:
+    """sha256 do JSON canônico (chaves ordenadas, números em faixas) + nome do modelo."""
+    txt = json.dumps({"model": model, "ctx": _canonico(contexto)}, sort_keys=True,
+                     ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(txt.encode("utf-8")).hexdigest()
@@ -1,6 +1,7 @@
 import os, json, sys
-from evento_V4 import avaliar_evento, formatar_card_evento, montar_blocos_front, formatar_bem_amigavel
-from evento_V4.config import COMPACT_JSON, FRONT_MIN, FRONT_BLOCKS, FRIENDLY_OUTPUT
+from evento_V4 import (avaliar_evento, formatar_card_evento, montar_blocos_front, formatar_bem_amigavel,
+                       avaliar_eventos_stream, CLI_WORKERS)
+from evento_V4 import COMPACT_JSON, FRONT_MIN, FRONT_BLOCKS, FRIENDLY_OUTPUT
 
 try:
     sys.stdout.reconfigure(encoding="utf-8")
@@ -23,6 +24,23 @@ else: front_blocks = FRONT_BLOCKS
 if any(a in ("--friendly","--amigavel") for a in sys.argv[1:]): friendly = True
 else: friendly = FRIENDLY_OUTPUT
 
+# modo em fluxo: --input eventos.csv|eventos.ndjson|- (stdin) [--workers N] → 1 linha JSON por evento
+def _valor_arg(*nomes, padrao=None):
+    args = sys.argv[1:]
+    return next((args[k + 1] for k, a in enumerate(args[:-1]) if a in nomes), padrao)
+
+entrada = _valor_arg("--input", "-i")
+if entrada:
+    modo = ("compact" if compact else "blocks" if front_blocks else "min" if front_min
+            else "friendly" if friendly else "full")
+    workers = int(_valor_arg("--workers", "-w", padrao=CLI_WORKERS))
+    if entrada == "-":
+        cont = avaliar_eventos_stream(sys.stdin, sys.stdout, modo, workers)
+    else:
+        with open(entrada, encoding="utf-8") as f:
+            cont = avaliar_eventos_stream(f, sys.stdout, modo, workers)
+    sys.exit(1 if cont["erro"] and not cont["ok"] else 0)
+
 res = avaliar_evento(LAT, LON, DATA_EVENTO, event_title=EVENT_TITLE)
 
 if compact:
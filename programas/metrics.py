@@ -0,0 +1,160 @@
+# -*- coding: utf-8 -*-
+"""
+metrics.py — tempos por etapa e contadores de cada avaliação + agregado estilo Prometheus
+
+- avaliacao(): abre a medição de UMA avaliação (contextvar → vale também p/ asyncio e to_thread)
+- etapa("download"): cronometra um trecho; soma na avaliação corrente e no histograma global
+- contar("arquivos_abertos", n) / anotar("provedor_previsao", "google"): contadores e rótulos
+- resumo da avaliação pode ir no payload (debug); render_prometheus() alimenta o /metrics
+"""
+from __future__ import annotations
+import contextvars
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+METRICS_DEBUG = os.getenv("METRICS_DEBUG", "false").lower() in ("1","true","yes","y")   # resumo no payload
+PREFIXO = "evento"
+# limites (s) do histograma das etapas
+BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+
+class Medicao:
+    """Tempos/contadores de uma avaliação (compartilhada entre as tarefas/threads dela)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.inicio = time.perf_counter()
+        self.etapas: Dict[str, float] = {}
+        self.contadores: Dict[str, float] = {}
+        self.rotulos: Dict[str, str] = {}
+
+    def resumo(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "total_ms": round(1000 * (time.perf_counter() - self.inicio), 1),
+                "etapas_ms": {k: round(1000 * v, 1) for k, v in self.etapas.items()},
+                "contadores": dict(self.contadores),
+                "rotulos": dict(self.rotulos),
+            }
+
+class _Registro:
+    """Agregado do processo inteiro (thread-safe)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.hist: Dict[str, Tuple[List[int], float, int]] = {}      # etapa → (buckets, soma, n)
+        self.contadores: Dict[str, float] = {}
+        self.rotulados: Dict[Tuple[str, str], int] = {}               # (nome, valor) → n
+        self.gauges: Dict[Tuple[str, Tuple[Tuple[str, str], ...]], float] = {}
+
+    def observar(self, nome: str, seg: float) -> None:
+        with self._lock:
+            b, soma, n = self.hist.get(nome) or ([0] * len(BUCKETS), 0.0, 0)
+            for k, lim in enumerate(BUCKETS):
+                if seg <= lim:
+                    b[k] += 1
+            self.hist[nome] = (b, soma + seg, n + 1)
+
+    def somar(self, nome: str, n: float) -> None:
+        with self._lock:
+            self.contadores[nome] = self.contadores.get(nome, 0) + n
+
+    def rotular(self, nome: str, valor: str) -> None:
+        with self._lock:
+            self.rotulados[(nome, valor)] = self.rotulados.get((nome, valor), 0) + 1
+
+_REG = _Registro()
+_ATUAL: contextvars.ContextVar[Optional[Medicao]] = contextvars.ContextVar("medicao_avaliacao", default=None)
+
+def atual() -> Optional[Medicao]:
+    return _ATUAL.get()
+
+@contextmanager
+def avaliacao() -> Iterator[Medicao]:
+    m = Medicao()
+    token = _ATUAL.set(m)
+    try:
+        yield m
+    finally:
+        _ATUAL.reset(token)
+        _REG.observar("total", time.perf_counter() - m.inicio)
+        _REG.somar("avaliacoes", 1)
+
+@contextmanager
+def etapa(nome: str) -> Iterator[None]:
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        dt = time.perf_counter() - t0
+        _REG.observar(nome, dt)
+        m = _ATUAL.get()
+        if m is not None:
+            with m._lock:
+                m.etapas[nome] = m.etapas.get(nome, 0.0) + dt
+
+def contar(nome: str, n: float = 1) -> None:
+    if not n:
+        return
+    _REG.somar(nome, n)
+    m = _ATUAL.get()
+    if m is not None:
+        with m._lock:
+            m.contadores[nome] = m.contadores.get(nome, 0) + n
+
+def anotar(nome: str, valor: Any) -> None:
+    if valor is None:
+        return
+    valor = str(valor)
+    _REG.rotular(nome, valor)
+    m = _ATUAL.get()
+    if m is not None:
+        with m._lock:
+            m.rotulos[nome] = valor
+
+def definir(nome: str, valor: float, **rotulos: str) -> None:
+    """Gauge (valor instantâneo), ex.: estado do disjuntor por provedor."""
+    with _REG._lock:
+        _REG.gauges[(nome, tuple(sorted(rotulos.items())))] = float(valor)
+
+def _num(v: float) -> str:
+    return str(int(v)) if float(v).is_integer() else repr(float(v))
+
+def _esc(v: str) -> str:
+    return v.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def render_prometheus() -> str:
+    """Texto no formato de exposição do Prometheus (text/plain; version=0.0.4)."""
+    with _REG._lock:
+        hist = {k: (list(b), s, n) for k, (b, s, n) in _REG.hist.items()}
+        cont = dict(_REG.contadores)
+        rot = dict(_REG.rotulados)
+        gauges = dict(_REG.gauges)
+    out: List[str] = []
+    nome = f"{PREFIXO}_stage_seconds"
+    out += [f"# HELP {nome} Duração das etapas da avaliação (s).", f"# TYPE {nome} histogram"]
+    for etapa_, (b, soma, n) in sorted(hist.items()):
+        for lim, c in zip(BUCKETS, b):
+            out.append(f'{nome}_bucket{{stage="{_esc(etapa_)}",le="{lim}"}} {c}')
+        out.append(f'{nome}_bucket{{stage="{_esc(etapa_)}",le="+Inf"}} {n}')
+        out.append(f'{nome}_sum{{stage="{_esc(etapa_)}"}} {soma:.6f}')
+        out.append(f'{nome}_count{{stage="{_esc(etapa_)}"}} {n}')
+    for c, v in sorted(cont.items()):
+        nome = f"{PREFIXO}_{c}_total"
+        out += [f"# TYPE {nome} counter", f"{nome} {_num(v)}"]
+    for rotulo in sorted({k for k, _ in rot}):
+        nome = f"{PREFIXO}_{rotulo}_total"
+        out.append(f"# TYPE {nome} counter")
+        for (k, valor), v in sorted(rot.items()):
+            if k == rotulo:
+                out.append(f'{nome}{{value="{_esc(valor)}"}} {v}')
+    for g in sorted({k for k, _ in gauges}):
+        nome = f"{PREFIXO}_{g}"
+        out.append(f"# TYPE {nome} gauge")
+        for (k, labels), v in sorted(gauges.items()):
+            if k == g:
+                lab = ",".join(f'{a}="{_esc(str(b))}"' for a, b in labels)
+                out.append(f"{nome}{{{lab}}} {_num(v)}" if lab else f"{nome} {_num(v)}")
+    return "\n".join(out) + "\n"
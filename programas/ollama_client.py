@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+"""
+ollama_client.py — cliente HTTP persistente do Ollama (/api/generate)
+
+- Uma requests.Session por host (keep-alive) em vez de um `ollama run` por chamada
+- keep_alive mantém o modelo carregado entre pedidos (sem warm-up a cada recomendação)
+- format=json força a saída num objeto JSON; stream=True lê o NDJSON incrementalmente
+- Semáforo limita gerações simultâneas (CPU-only) e há um orçamento de tempo por chamada
+"""
+from __future__ import annotations
+import json
+import os
+import threading
+import time
+from typing import Any, Dict, Optional
+
+import requests
+
+OLLAMA_KEEP_ALIVE   = os.getenv("OLLAMA_KEEP_ALIVE", "30m")
+OLLAMA_CONCURRENCY  = int(os.getenv("OLLAMA_CONCURRENCY", "2"))
+OLLAMA_TIMEOUT      = float(os.getenv("OLLAMA_TIMEOUT", "30"))       # s: orçamento total da geração
+OLLAMA_NUM_PREDICT  = int(os.getenv("OLLAMA_NUM_PREDICT", "160"))    # teto de tokens (resposta curta)
+OLLAMA_STREAM       = os.getenv("OLLAMA_STREAM", "true").lower() in ("1","true","yes","y")
+
+class OllamaErro(RuntimeError):
+    pass
+
+class OllamaClient:
+    def __init__(self, host: str, keep_alive: str = OLLAMA_KEEP_ALIVE,
+                 concorrencia: int = OLLAMA_CONCURRENCY, timeout: float = OLLAMA_TIMEOUT):
+        from requests.adapters import HTTPAdapter
+        self.host = host.rstrip("/")
+        self.keep_alive = keep_alive
+        self.timeout = float(timeout)
+        n = max(1, int(concorrencia))
+        self._sem = threading.BoundedSemaphore(n)
+        self._s = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=n)
+        self._s.mount("http://", adapter)
+        self._s.mount("https://", adapter)
+
+    def gerar(self, model: str, prompt: str, formato: Optional[str] = "json", stream: bool = OLLAMA_STREAM,
+              timeout: Optional[float] = None, opcoes: Optional[Dict[str, Any]] = None) -> str:
+        """Texto gerado; OllamaErro em falha de conexão/HTTP ou orçamento estourado."""
+        orcamento = self.timeout if timeout is None else float(timeout)
+        prazo = time.monotonic() + orcamento
+        corpo: Dict[str, Any] = {
+            "model": model, "prompt": prompt, "stream": bool(stream), "keep_alive": self.keep_alive,
+            "options": {"num_predict": OLLAMA_NUM_PREDICT, **(opcoes or {})},
+        }
+        if formato:
+            corpo["format"] = formato
+        # a espera na fila também consome o orçamento
+        if not self._sem.acquire(timeout=orcamento):
+            raise OllamaErro(f"fila do Ollama cheia há {orcamento:.0f}s")
+        try:
+            restante = max(0.1, prazo - time.monotonic())
+            try:
+                r = self._s.post(f"{self.host}/api/generate", json=corpo, stream=bool(stream),
+                                 timeout=(min(5.0, restante), restante))
+            except requests.RequestException as e:
+                raise OllamaErro(str(e)) from e
+            with r:
+                if r.status_code != 200:
+                    raise OllamaErro(f"HTTP {r.status_code}: {r.text[:200]}")
+                if not stream:
+                    return str(r.json().get("response", "")).strip()
+                partes = []
+                try:
+                    for linha in r.iter_lines():
+                        if not linha:
+                            continue
+                        msg = json.loads(linha)
+                        if msg.get("error"):
+                            raise OllamaErro(str(msg["error"]))
+                        partes.append(msg.get("response", ""))
+                        # sem break no 'done': consumir até o fim devolve a conexão ao pool
+                        if not msg.get("done") and time.monotonic() > prazo:
+                            raise OllamaErro(f"geração excedeu {orcamento:.0f}s")
+                except requests.RequestException as e:
+                    raise OllamaErro(str(e)) from e
+                return "".join(partes).strip()
+        finally:
+            self._sem.release()
+
+_LOCK = threading.Lock()
+_CLIENTES: Dict[str, OllamaClient] = {}
+
+def cliente_ollama(host: str) -> OllamaClient:
+    """Cliente compartilhado por host (mesma sessão, semáforo e keep_alive para todo o processo)."""
+    with _LOCK:
+        c = _CLIENTES.get(host)
+        if c is None:
+            c = _CLIENTES[host] = OllamaClient(host)
+        return c
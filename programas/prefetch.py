@@ -0,0 +1,308 @@
+# -*- coding: utf-8 -*-
+"""
+prefetch.py — aquecimento em segundo plano das datas/locais mais pedidos
+
+- Locais quentes (PREFETCH_LOCAIS "nome:lat,lon[,peso];…" ou PREFETCH_LOCAIS_FILE JSON) × datas
+  quentes dos próximos PREFETCH_HORIZONTE_DIAS: feriados (PREFETCH_FERIADOS e, se instalado, o
+  pacote `holidays` de PREFETCH_PAIS) e fins de semana
+- Cada (local, data) vira uma tarefa numa fila de prioridade (feriado > fim de semana; mais
+  próxima e local mais popular primeiro), executada por PREFETCH_WORKERS threads
+- A tarefa roda o mesmo caminho de avaliar_evento (coalescido com as requisições de usuário):
+  baixa só os granules que faltam, grava os diários e aquece o cache da previsão
+- Locais diferentes pedem os mesmos granules (globais ou do mesmo recorte): cada worker baixa
+  só os links que nenhum outro está baixando e espera os demais → um download por granule
+- Replaneja a cada PREFETCH_INTERVALO_S (renova a previsão antes de expirar o TTL)
+- Fixa no cache raw (granule_catalog.py) os dias das janelas quentes → o despejo não os apaga
+
+Uso:
+  python prefetch.py --locais "SP:-23.55,-46.63;Rio:-22.91,-43.17" [--horizonte 30] [--uma-vez]
+"""
+from __future__ import annotations
+import argparse
+import itertools
+import json
+import os
+import queue
+import threading
+import time
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Set, Tuple
+
+import evento_V4 as core
+
+PREFETCH_ENABLE        = os.getenv("PREFETCH_ENABLE", "false").lower() in ("1","true","yes","y")
+PREFETCH_LOCAIS        = os.getenv("PREFETCH_LOCAIS", "").strip()
+PREFETCH_LOCAIS_FILE   = os.getenv("PREFETCH_LOCAIS_FILE", "").strip()
+PREFETCH_HORIZONTE_DIAS = int(os.getenv("PREFETCH_HORIZONTE_DIAS", "30"))
+PREFETCH_WORKERS       = int(os.getenv("PREFETCH_WORKERS", "2"))
+PREFETCH_INTERVALO_S   = float(os.getenv("PREFETCH_INTERVALO_S", "1800"))
+PREFETCH_FERIADOS      = os.getenv("PREFETCH_FERIADOS", "").strip()      # "2025-11-15,2025-12-25"
+PREFETCH_PAIS          = os.getenv("PREFETCH_PAIS", "BR").strip()
+PREFETCH_JANELA        = int(os.getenv("PREFETCH_JANELA", "1"))          # mesma janela da API
+
+FERIADO, FIM_DE_SEMANA = 0, 1
+
+class Local(NamedTuple):
+    nome: str
+    lat: float
+    lon: float
+    peso: float = 1.0       # popularidade relativa (maior = antes)
+
+def ler_locais(txt: str = PREFETCH_LOCAIS, arquivo: str = PREFETCH_LOCAIS_FILE) -> List[Local]:
+    """'nome:lat,lon[,peso];…' e/ou JSON [{nome, lat, lon, peso}]; entradas inválidas são ignoradas."""
+    locais: List[Local] = []
+    for item in (t.strip() for t in txt.split(";") if t.strip()):
+        nome, _, coords = item.rpartition(":")
+        try:
+            nums = [float(x) for x in coords.split(",")]
+            locais.append(Local(nome.strip() or coords, nums[0], nums[1], nums[2] if len(nums) > 2 else 1.0))
+        except (ValueError, IndexError):
+            print(f"⚠️ Prefetch: local inválido ignorado: {item!r}")
+    if arquivo:
+        try:
+            for d in json.loads(Path(arquivo).read_text(encoding="utf-8")):
+                locais.append(Local(str(d.get("nome") or d.get("name") or f"{d['lat']},{d['lon']}"),
+                                    float(d["lat"]), float(d["lon"]), float(d.get("peso", d.get("weight", 1.0)))))
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            print(f"⚠️ Prefetch: falha ao ler {arquivo}: {e}")
+    return locais
+
+def feriados(inicio: date, fim: date, extras: str = PREFETCH_FERIADOS, pais: str = PREFETCH_PAIS) -> Set[date]:
+    out: Set[date] = set()
+    for t in (t.strip() for t in extras.split(",") if t.strip()):
+        try:
+            out.add(date.fromisoformat(t))
+        except ValueError:
+            print(f"⚠️ Prefetch: feriado inválido ignorado: {t!r}")
+    if pais:
+        try:
+            import holidays   # opcional
+            cal = holidays.country_holidays(pais, years=range(inicio.year, fim.year + 1))
+            out |= set(cal)
+        except (ImportError, NotImplementedError, KeyError):
+            pass
+    return {d for d in out if inicio <= d <= fim}
+
+def datas_quentes(hoje: Optional[date] = None, horizonte: int = PREFETCH_HORIZONTE_DIAS,
+                  extras: str = PREFETCH_FERIADOS, pais: str = PREFETCH_PAIS) -> List[Tuple[date, int]]:
+    """[(data, classe)] dos próximos `horizonte` dias: feriados (0) e sábados/domingos (1)."""
+    hoje = hoje or date.today()
+    fim = hoje + timedelta(days=horizonte)
+    fer = feriados(hoje, fim, extras, pais)
+    out = []
+    for k in range(horizonte + 1):
+        d = hoje + timedelta(days=k)
+        if d in fer:
+            out.append((d, FERIADO))
+        elif d.weekday() >= 5:
+            out.append((d, FIM_DE_SEMANA))
+    return out
+
+class Prefetcher:
+    """Fila de prioridade de (local, data) + pool de workers + replanejamento periódico."""
+
+    def __init__(self, locais: Iterable[Local], horizonte: int = PREFETCH_HORIZONTE_DIAS,
+                 workers: int = PREFETCH_WORKERS, intervalo: float = PREFETCH_INTERVALO_S,
+                 janela: int = PREFETCH_JANELA):
+        self.locais = list(locais)
+        self.horizonte = horizonte
+        self.workers = max(1, int(workers))
+        self.intervalo = max(60.0, float(intervalo))
+        self.janela = janela
+        self._fila: "queue.PriorityQueue[Tuple[Tuple, int, Local, date]]" = queue.PriorityQueue()
+        self._seq = itertools.count()
+        self._pendentes: Set[Tuple[float, float, date]] = set()
+        self._lock = threading.Lock()
+        self._links_em_voo: Set[Tuple[str, str]] = set()     # (região, link) sendo baixados
+        self._cv_links = threading.Condition()
+        self._parar = threading.Event()
+        self._threads: List[threading.Thread] = []
+        self.concluidas = self.falhas = 0
+        self.ultimo_ciclo: Optional[str] = None
+        self.ultimo_erro: Optional[str] = None
+
+    def planejar(self, hoje: Optional[date] = None) -> int:
+        """Enfileira as tarefas do ciclo (sem duplicar as que ainda estão na fila)."""
+        hoje = hoje or date.today()
+        quentes = datas_quentes(hoje, self.horizonte)
+        cat = core._catalogo(core.GLDAS_RAW_DIR)
+        if cat is not None:
+            dias = set()
+            for d, _classe in quentes:
+                dias |= core.datas_janela(d.isoformat(), self.janela, core.HIST_ANOS)
+            cat.fixar(dias, "prefetch")
+        n = 0
+        for d, classe in quentes:
+            for loc in self.locais:
+                chave = (loc.lat, loc.lon, d)
+                with self._lock:
+                    if chave in self._pendentes:
+                        continue
+                    self._pendentes.add(chave)
+                self._fila.put(((classe, (d - hoje).days, -loc.peso), next(self._seq), loc, d))
+                n += 1
+        self.ultimo_ciclo = datetime.now().isoformat(timespec="seconds")
+        print(f"🔥 Prefetch: {n} tarefa(s) enfileirada(s) ({len(self.locais)} local(is), {self.horizonte} dias).")
+        return n
+
+    def _links_da_tarefa(self, loc: Local, d: date) -> Tuple[List[str], Any]:
+        """Links dos dias da janela que ainda faltam no store do local + região do download."""
+        datas = core.datas_janela(d.isoformat(), self.janela, core.HIST_ANOS)
+        if core.GLDAS_STORE_ENABLE:
+            df = core.DailyStore(core.GLDAS_STORE_FILE).get(loc.lat, loc.lon, datas)
+            datas = {x for x in datas if x not in df.index}
+        if not datas:
+            return [], None
+        txt = core.autodiscover_subset_file(core.SUBSET_FILE, core.DATA_DIR)
+        idx = core.carregar_indice(txt, core.read_links_from_txt, core.parse_y_doy_hhmm_from_url,
+                                   core.derive_dest_name)
+        links = idx.links_para_datas(datas)
+        if core.MAX_FILES:
+            links = links[:core.MAX_FILES]
+        return links, core._regiao_download([(loc.lat, loc.lon)])
+
+    def _baixar_compartilhado(self, loc: Local, d: date) -> None:
+        """Baixa os granules da tarefa sem repetir os que outro worker já está baixando."""
+        links, regiao = self._links_da_tarefa(loc, d)
+        chaves = [(regiao.nome if regiao is not None else "", u) for u in links]
+        with self._cv_links:
+            meus = [k for k in chaves if k not in self._links_em_voo]
+            alheios = [k for k in chaves if k in self._links_em_voo]
+            self._links_em_voo.update(meus)
+        try:
+            if meus:
+                core.download_gldas([u for _, u in meus], core.GLDAS_RAW_DIR, max_files=len(meus), regiao=regiao)
+        finally:
+            with self._cv_links:
+                self._links_em_voo.difference_update(meus)
+                self._cv_links.notify_all()
+        if alheios:
+            with self._cv_links:
+                self._cv_links.wait_for(lambda: not any(k in self._links_em_voo for k in alheios))
+
+    def _aquecer(self, loc: Local, d: date) -> None:
+        try:
+            self._baixar_compartilhado(loc, d)
+        except (Exception, SystemExit) as e:   # sem subset/índice etc. → o caminho normal decide (inclusive ERA5)
+            print(f"⚠️ Prefetch: download compartilhado falhou ({loc.nome}, {d}): {e}")
+        # mesmo cálculo (e mesma chave de coalescência) de avaliar_evento; granules já no disco
+        args = (loc.lat, loc.lon, d.isoformat(), core.SUBSET_FILE, core.GLDAS_RAW_DIR, core.MAX_FILES,
+                self.janela, core.HIST_ANOS, core.TIMEZONE)
+        if core.COALESCE_ENABLE:
+            chave = core._chave_avaliacao(loc.lat, loc.lon, d.isoformat(), self.janela, core.HIST_ANOS,
+                                          core.TIMEZONE, core.SUBSET_FILE, core.GLDAS_RAW_DIR, core.MAX_FILES)
+            core._EM_VOO.do(chave, core._historico_e_previsao, *args)
+        else:
+            core._historico_e_previsao(*args)
+
+    def _executar(self, item: Tuple[Tuple, int, Local, date]) -> None:
+        _prio, _seq, loc, d = item
+        try:
+            self._aquecer(loc, d)
+            self.concluidas += 1
+        except Exception as e:
+            self.falhas += 1
+            self.ultimo_erro = f"{loc.nome} {d}: {e}"
+            print(f"⚠️ Prefetch falhou ({loc.nome}, {d}): {e}")
+        finally:
+            with self._lock:
+                self._pendentes.discard((loc.lat, loc.lon, d))
+
+    def _worker(self) -> None:
+        while not self._parar.is_set():
+            try:
+                item = self._fila.get(timeout=1.0)
+            except queue.Empty:
+                continue
+            try:
+                self._executar(item)
+            finally:
+                self._fila.task_done()
+
+    def _agenda(self) -> None:
+        while not self._parar.is_set():
+            try:
+                self.planejar()
+            except Exception as e:
+                print(f"⚠️ Prefetch: falha ao planejar: {e}")
+            self._parar.wait(self.intervalo)
+
+    def iniciar(self) -> "Prefetcher":
+        if self._threads:
+            return self
+        self._parar.clear()
+        self._threads = [threading.Thread(target=self._worker, daemon=True, name=f"prefetch-{k}")
+                         for k in range(self.workers)]
+        self._threads.append(threading.Thread(target=self._agenda, daemon=True, name="prefetch-agenda"))
+        for t in self._threads:
+            t.start()
+        return self
+
+    def parar(self) -> None:
+        self._parar.set()
+        self._threads = []
+
+    def executar_uma_vez(self, hoje: Optional[date] = None) -> Dict[str, Any]:
+        """Um ciclo completo, bloqueante (CLI/cron)."""
+        self.planejar(hoje)
+        ts = [threading.Thread(target=self._worker, daemon=True) for _ in range(self.workers)]
+        for t in ts:
+            t.start()
+        self._fila.join()
+        self._parar.set()
+        for t in ts:
+            t.join()
+        self._parar.clear()
+        return self.estado()
+
+    def estado(self) -> Dict[str, Any]:
+        return {
+            "ativo": bool(self._threads), "locais": len(self.locais), "horizonte_dias": self.horizonte,
+            "workers": self.workers, "na_fila": self._fila.qsize(),
+            "concluidas": self.concluidas, "falhas": self.falhas,
+            "ultimo_ciclo": self.ultimo_ciclo, "ultimo_erro": self.ultimo_erro,
+        }
+
+_PREFETCHER: Optional[Prefetcher] = None
+
+def iniciar_prefetch() -> Optional[Prefetcher]:
+    """Sobe o agendador se PREFETCH_ENABLE e houver locais configurados (idempotente)."""
+    global _PREFETCHER
+    if _PREFETCHER is None and PREFETCH_ENABLE:
+        locais = ler_locais(PREFETCH_LOCAIS, PREFETCH_LOCAIS_FILE)
+        if not locais:
+            print("⚠️ Prefetch ligado, mas sem PREFETCH_LOCAIS/PREFETCH_LOCAIS_FILE.")
+            return None
+        _PREFETCHER = Prefetcher(locais).iniciar()
+    return _PREFETCHER
+
+def estado_prefetch() -> Dict[str, Any]:
+    return _PREFETCHER.estado() if _PREFETCHER else {"ativo": False}
+
+def _main() -> None:
+    ap = argparse.ArgumentParser(description="Pré-aquece GLDAS/climatologia/previsão dos locais e datas quentes")
+    ap.add_argument("--locais", default=PREFETCH_LOCAIS, help="'nome:lat,lon[,peso];…'")
+    ap.add_argument("--locais-file", default=PREFETCH_LOCAIS_FILE, help="JSON [{nome, lat, lon, peso}]")
+    ap.add_argument("--horizonte", type=int, default=PREFETCH_HORIZONTE_DIAS)
+    ap.add_argument("--workers", type=int, default=PREFETCH_WORKERS)
+    ap.add_argument("--uma-vez", action="store_true", help="roda um ciclo e sai (cron)")
+    args = ap.parse_args()
+
+    locais = ler_locais(args.locais, args.locais_file)
+    if not locais:
+        raise SystemExit("Informe --locais ou --locais-file.")
+    pf = Prefetcher(locais, horizonte=args.horizonte, workers=args.workers)
+    if args.uma_vez:
+        print(json.dumps(pf.executar_uma_vez(), ensure_ascii=False, indent=2))
+        return
+    pf.iniciar()
+    try:
+        while True:
+            time.sleep(60)
+            print(f"🔥 Prefetch: {json.dumps(pf.estado(), ensure_ascii=False)}")
+    except KeyboardInterrupt:
+        pf.parar()
+
+if __name__ == "__main__":
+    _main()
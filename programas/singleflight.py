@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+"""
+singleflight.py — coalescência de chamadas idênticas concorrentes
+
+Várias requisições com a mesma chave (ex.: célula GLDAS + data + janela + anos) que
+chegam enquanto a primeira ainda está calculando esperam por ela e recebem o mesmo
+resultado (cópia), em vez de repetir download/processamento/previsão.
+"""
+from __future__ import annotations
+import asyncio
+import copy
+import threading
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+class _Chamada:
+    __slots__ = ("evento", "resultado", "erro", "espera")
+
+    def __init__(self):
+        self.evento = threading.Event()
+        self.resultado: Any = None
+        self.erro: BaseException | None = None
+        self.espera = 0
+
+class SingleFlight:
+    """Uma execução em voo por chave; quem chega depois aguarda e recebe o resultado."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._em_voo: Dict[Hashable, _Chamada] = {}
+        self.coalescidas = 0  # nº de chamadas que reaproveitaram uma execução em voo
+
+    def do(self, key: Hashable, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        with self._lock:
+            chamada = self._em_voo.get(key)
+            lider = chamada is None
+            if lider:
+                chamada = self._em_voo[key] = _Chamada()
+            else:
+                chamada.espera += 1
+                self.coalescidas += 1
+
+        if not lider:
+            chamada.evento.wait()
+            if chamada.erro is not None:
+                raise chamada.erro
+            # cópia: quem recebe pode mexer no dict sem afetar os demais
+            return copy.deepcopy(chamada.resultado)
+
+        try:
+            chamada.resultado = fn(*args, **kwargs)
+        except BaseException as e:
+            chamada.erro = e
+            raise
+        finally:
+            with self._lock:
+                self._em_voo.pop(key, None)
+            chamada.evento.set()
+        return copy.deepcopy(chamada.resultado) if chamada.espera else chamada.resultado
+
+    def em_voo(self) -> int:
+        with self._lock:
+            return len(self._em_voo)
+
+class AsyncSingleFlight:
+    """Versão asyncio: uma task em voo por chave, aguardada por todos os que chegarem."""
+
+    def __init__(self):
+        self._em_voo: Dict[Hashable, "asyncio.Future[Any]"] = {}
+        self.coalescidas = 0
+
+    async def do(self, key: Hashable, fn: Callable[..., Awaitable[Any]], *args, **kwargs) -> Any:
+        fut = self._em_voo.get(key)
+        if fut is not None:
+            self.coalescidas += 1
+            # shield: o cancelamento de um cliente não derruba o cálculo dos outros
+            return copy.deepcopy(await asyncio.shield(fut))
+
+        fut = asyncio.ensure_future(fn(*args, **kwargs))
+        self._em_voo[key] = fut
+        fut.add_done_callback(lambda _f: self._em_voo.pop(key, None))
+        return copy.deepcopy(await asyncio.shield(fut))
+
+    def em_voo(self) -> int:
+        return len(self._em_voo)
@@ -1,11 +1,13 @@
 from __future__ import annotations
-import re, time
+import re
 from urllib.parse import urlparse, parse_qs, unquote, urlsplit, urlunsplit
 from pathlib import Path
 from datetime import datetime, timedelta
 from typing import List
 import requests
-import earthaccess as ea
+from .config import HIST_ANOS
+from .downloader import (DOWNLOAD_WORKERS, DOWNLOAD_RATE, RateLimiter, arquivo_valido,
+                         baixar_arquivo, executar_pool, preparar_sessao)
 
 def fix_gldas_url(u: str) -> str:
     u = re.sub(r"HTTP_s+er+v+ices\.cgi", "HTTP_services.cgi", u)
@@ -75,7 +77,7 @@ def dt_from_year_doy(year: int, doy: int) -> datetime:
     return datetime(year, 1, 1) + timedelta(days=doy - 1)
 
 def filter_links_for_event_window(links: list[str], data_evento: str, janela:int=1,
-                                  anos=(2020,2021,2022,2023,2024)) -> list[str]:
+                                  anos=HIST_ANOS) -> list[str]:
     import pandas as pd
     target = pd.to_datetime(data_evento)
     md = (target.month, target.day)
@@ -117,43 +119,48 @@ def derive_dest_name(url: str, for_direct: bool = False) -> str:
     last = Path(p.path).name
     return sanitize(last + ".nc4")
 
-def download_gldas(links: list[str], out_dir: Path, max_files: int) -> int:
+def download_gldas(links: list[str], out_dir: Path, max_files: int,
+                   workers: int = DOWNLOAD_WORKERS) -> int:
+    import earthaccess as ea   # import pesado → só quando há download
     ea.login(strategy="environment", persist=True)
-    sess = ea.get_requests_https_session()
+    sess = preparar_sessao(ea.get_requests_https_session(), workers)
     out_dir.mkdir(parents=True, exist_ok=True)
+    limiter = RateLimiter(DOWNLOAD_RATE)   # por host, no lugar do sleep fixo
+
     total = len(links) if max_files == 0 else min(max_files, len(links))
-    count = 0
-    for raw_url in links[:total]:
+
+    def _baixa_um(raw_url: str) -> int:
         url = prefer_data_host(fix_gldas_url(raw_url))
         dest_name = derive_dest_name(url)
         dest = out_dir / dest_name
         if dest.exists():
-            print(f"✅ Já existe: {dest.name}")
-            continue
+            if arquivo_valido(dest):
+                print(f"✅ Já existe: {dest.name}")
+                return 0
+            # truncado (ex.: crash de versões antigas) → baixar_arquivo o retoma como .part (com a trava)
+            print(f"♻️ Incompleto, retomando: {dest.name}")
+
         print(f"⬇️ Baixando (OTF): {dest.name}")
         try:
-            r = sess.get(url, stream=True, allow_redirects=True, timeout=300)
-            if r.status_code >= 400:
-                r.close()
+            try:
+                baixar_arquivo(sess, url, dest, limiter, timeout=300)
+            except requests.HTTPError as e:
+                status = getattr(e.response, "status_code", "?")
                 qs = parse_qs(urlparse(url).query)
                 fn = (qs.get("FILENAME") or qs.get("filename") or [None])[0]
                 if not fn:
-                    raise requests.HTTPError(f"OTF {r.status_code} sem FILENAME.")
+                    raise requests.HTTPError(f"OTF {status} sem FILENAME.")
                 direct = "https://data.gesdisc.earthdata.nasa.gov" + fn
                 dest = out_dir / derive_dest_name(direct, for_direct=True)
-                print(f"   ↪ OTF {r.status_code}. Direto: {direct}")
-                r = sess.get(direct, stream=True, allow_redirects=True, timeout=600)
-            r.raise_for_status()
-            with open(dest, "wb") as f:
-                for chunk in r.iter_content(1024 * 1024):
-                    if chunk: f.write(chunk)
+                print(f"   ↪ OTF {status}. Direto: {direct}")
+                if not (dest.exists() and arquivo_valido(dest)):
+                    baixar_arquivo(sess, direct, dest, limiter, timeout=600)
             print(f"✔ Concluído: {dest.name}")
-            count += 1
+            return 1
         except Exception as e:
             print(f"⚠️ Falha em {dest_name}: {e}")
-        finally:
-            try: r.close()
-            except: pass
-        time.sleep(0.5)
+            return 0
+
+    count = executar_pool(links[:total], _baixa_um, workers=workers)
     print(f"🛰️ Total baixado nesta execução: {count}")
     return count
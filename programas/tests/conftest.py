@@ -0,0 +1,12 @@
+# -*- coding: utf-8 -*-
+"""Testes dos módulos de programas/ (importados como no servidor: `import evento_V4`)."""
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+# evento_V4/config criam DATA_DIR no import → nunca no D:\ padrão durante os testes
+os.environ.setdefault("DATA_DIR", tempfile.mkdtemp(prefix="dcds_dados_"))
+os.environ.setdefault("OLLAMA_ENABLE", "false")
+os.environ.setdefault("GOOGLE_WEATHER_API_KEY", "")
@@ -0,0 +1,48 @@
+# -*- coding: utf-8 -*-
+import asyncio
+
+import pytest
+
+from circuit_breaker import ABERTO, MEIO_ABERTO, CircuitBreaker
+
+def _meio_aberto() -> CircuitBreaker:
+    cb = CircuitBreaker("teste", falhas=1, aberto_s=0)
+    cb.falha(0.0, "x")
+    assert cb.estado == ABERTO
+    assert cb.permitir() and cb.estado == MEIO_ABERTO   # esta é a chamada de teste
+    return cb
+
+def test_meio_aberto_deixa_passar_um_teste_por_vez():
+    cb = _meio_aberto()
+    assert not cb.permitir()
+    cb.falha(0.0, "x")
+    assert cb.estado == ABERTO
+
+def test_liberar_solta_o_teste_sem_contar_resultado():
+    cb = _meio_aberto()
+    cb.liberar()
+    assert cb.estado == MEIO_ABERTO and (cb.sucessos, cb.falhas) == (0, 1)
+    assert cb.permitir()
+
+def test_cancelar_teste_async_nao_prende_o_disjuntor(monkeypatch):
+    ev = pytest.importorskip("evento_V4")
+    cb = _meio_aberto()
+    cb.liberar()
+    monkeypatch.setattr(ev, "disjuntor", lambda nome: cb)
+
+    class _Cliente:
+        async def get(self, *a, **k):
+            await asyncio.sleep(10)
+
+    monkeypatch.setattr(ev, "cliente_async", lambda nome: _Cliente())
+
+    async def _rodar():
+        t = asyncio.create_task(ev.forecast_openmeteo_async(0.0, 0.0))
+        await asyncio.sleep(0.05)
+        t.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await t
+
+    asyncio.run(_rodar())
+    assert cb.estado == MEIO_ABERTO
+    assert cb.permitir()   # sem o fix, o teste cancelado deixava o disjuntor recusando tudo
@@ -0,0 +1,53 @@
+# -*- coding: utf-8 -*-
+import threading
+import time
+
+import downloader
+
+# arquivo NetCDF clássico mínimo: arquivo_valido só confere assinatura + tamanho
+DADOS = b"CDF\x01" + bytes(3 * 1024 * 1024)
+
+class _Resposta:
+    status_code = 200
+
+    def __init__(self):
+        self.headers = {"Content-Length": str(len(DADOS))}
+
+    def raise_for_status(self):
+        pass
+
+    def iter_content(self, n):
+        for k in range(0, len(DADOS), n):
+            time.sleep(0.02)   # download lento → as outras threads chegam no meio dele
+            yield DADOS[k:k + n]
+
+    def close(self):
+        pass
+
+class _Sessao:
+    def __init__(self):
+        self.gets = 0
+        self._lock = threading.Lock()
+
+    def get(self, *a, **k):
+        with self._lock:
+            self.gets += 1
+        return _Resposta()
+
+def test_baixar_arquivo_concorrente_baixa_uma_vez(tmp_path):
+    sess, dest, res = _Sessao(), tmp_path / "g.nc4", []
+    ts = [threading.Thread(target=lambda: res.append(downloader.baixar_arquivo(sess, "http://h/g", dest)))
+          for _ in range(6)]
+    for t in ts: t.start()
+    for t in ts: t.join()
+    assert sess.gets == 1
+    assert sorted(res) == [0] * 5 + [len(DADOS)]
+    assert dest.read_bytes() == DADOS
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["g.nc4"]   # sem .part/.lock sobrando
+
+def test_baixar_arquivo_retoma_destino_truncado(tmp_path):
+    dest = tmp_path / "g.nc4"
+    dest.write_bytes(b"lixo")
+    sess = _Sessao()
+    assert downloader.baixar_arquivo(sess, "http://h/g", dest) == len(DADOS)
+    assert sess.gets == 1 and dest.read_bytes() == DADOS
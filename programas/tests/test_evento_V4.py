@@ -0,0 +1,40 @@
+# -*- coding: utf-8 -*-
+from datetime import date
+
+import numpy as np
+import pandas as pd
+import pytest
+
+xr = pytest.importorskip("xarray")
+pytest.importorskip("netCDF4")
+
+import evento_V4 as ev
+from gldas_otf import Regiao
+
+SA = Regiao("sa", -11.0, -51.0, -9.0, -49.0)
+
+def _granulo(path, instante, regiao=SA):
+    lat = np.arange(regiao.s + 0.125, regiao.n, 0.25)
+    lon = np.arange(regiao.w + 0.125, regiao.e, 0.25)
+    ds = xr.Dataset({"Tair_f_inst": (("time", "lat", "lon"), np.full((1, lat.size, lon.size), 300.0))},
+                    coords={"time": [pd.Timestamp(instante)], "lat": lat, "lon": lon})
+    ds.to_netcdf(path, engine="netcdf4")
+    return str(path)
+
+def test_arquivos_por_dia_sem_catalogo_um_arquivo_valido_por_passo(tmp_path, monkeypatch):
+    monkeypatch.setattr(ev, "GRANULE_CATALOG_ENABLE", False)
+    monkeypatch.setattr(ev, "REGIOES", [SA])
+    base = "GLDAS_NOAH025_3H.A20200101.{}.021"
+    _granulo(tmp_path / f"{base.format('0000')}.nc4", "2020-01-01 00:00")
+    recorte = _granulo(tmp_path / f"{base.format('0000')}.R-sa.nc4", "2020-01-01 00:00")
+    truncado = tmp_path / f"{base.format('0300')}.nc4"
+    _granulo(truncado, "2020-01-01 03:00")
+    dados = truncado.read_bytes()
+    truncado.write_bytes(dados[:len(dados) // 2])   # EOF do superbloco HDF5 além do fim
+    so_global = _granulo(tmp_path / f"{base.format('0600')}.nc4", "2020-01-01 06:00")
+    _granulo(tmp_path / f"{base.format('0900')}.R-sa.nc4", "2020-01-01 09:00",   # recorte que não cobre a região
+             Regiao("sa", -11.0, -51.0, -10.0, -50.0))
+    _granulo(tmp_path / "GLDAS_NOAH025_3H.A20200102.0000.021.nc4", "2020-01-02 00:00")   # fora das datas
+
+    por_dia = ev.arquivos_por_dia(tmp_path, {date(2020, 1, 1)}, SA)
+    assert {d: sorted(fs) for d, fs in por_dia.items()} == {date(2020, 1, 1): sorted([recorte, so_global])}
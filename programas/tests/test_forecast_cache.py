@@ -0,0 +1,34 @@
+# -*- coding: utf-8 -*-
+import time
+
+import pytest
+
+from forecast_cache import CacheTTL
+
+def test_ttl_por_valor_expira_antes_o_fallback():
+    c = CacheTTL(3600, 3600, ttl_de=lambda v: 3600 if v["provider"] == "google" else 60)
+    c.guardar("g", {"ok": True, "provider": "google"})
+    c.guardar("o", {"ok": True, "provider": "open-meteo"})
+    for k in ("g", "o"):
+        ts, v = c._mem[c._k(k)]
+        c._mem[c._k(k)] = (ts - 120, v)
+    assert c.consultar("g")[1] == "fresh"
+    assert c.consultar("o")[1] == "stale"
+
+def test_fallback_open_meteo_nao_fica_no_cache_como_google(monkeypatch):
+    ev = pytest.importorskip("evento_V4")
+    monkeypatch.setattr(ev, "GOOGLE_WEATHER_API_KEY", "chave")
+    chamadas = []
+    def _busca(lat, lon, days=7, timezone="auto"):
+        chamadas.append(lat)
+        return {"ok": True, "daily": [], "provider": "open-meteo"}
+    monkeypatch.setattr(ev, "_previsao_7_dias", _busca)
+    monkeypatch.setattr(ev, "_PREV_CACHE", CacheTTL(ev.FORECAST_TTL, 0, ttl_de=ev._ttl_previsao))
+    monkeypatch.setattr(ev, "FORECAST_CACHE_ENABLE", True)
+    monkeypatch.setattr(ev, "FORECAST_FALLBACK_TTL", 0.05)
+    ev.previsao_7_dias(-10.0, -50.0)
+    ev.previsao_7_dias(-10.0, -50.0)
+    assert len(chamadas) == 1
+    time.sleep(0.1)
+    ev.previsao_7_dias(-10.0, -50.0)   # fallback vencido → tenta o Google de novo
+    assert len(chamadas) == 2
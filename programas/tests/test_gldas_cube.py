@@ -0,0 +1,38 @@
+# -*- coding: utf-8 -*-
+import numpy as np
+import pandas as pd
+import pytest
+
+xr = pytest.importorskip("xarray")
+pytest.importorskip("zarr")
+pytest.importorskip("netCDF4")
+
+import gldas_cube
+
+def _granulo(path, instante):
+    lat, lon = np.arange(-10.125, -9.0, 0.25), np.arange(-50.125, -49.0, 0.25)
+    ds = xr.Dataset({"Tair_f_inst": (("time", "lat", "lon"), np.full((1, lat.size, lon.size), 300.0))},
+                    coords={"time": [pd.Timestamp(instante)], "lat": lat, "lon": lon})
+    ds.to_netcdf(path, engine="netcdf4")
+    return path
+
+def test_manifesto_so_registra_granulos_anexados(tmp_path):
+    bons = [_granulo(tmp_path / f"A2020010{d}.0000.nc4", f"2020-01-0{d}") for d in (1, 2)]
+    ruim = tmp_path / "A20200103.0000.nc4"
+    ruim.write_bytes(b"\x89HDF\r\n\x1a\n truncado")
+    cube = tmp_path / "cubo.zarr"
+
+    assert gldas_cube.ingerir_granulos([*bons, ruim], cube, bbox=None, variaveis=("Tair_f_inst",)) == 2
+    assert gldas_cube.granulos_ingeridos(cube) == {p.name for p in bons}
+
+    # arquivo consertado (ex.: baixado de novo) entra na próxima ingestão
+    ruim.unlink()
+    _granulo(ruim, "2020-01-03")
+    assert gldas_cube.ingerir_granulos([*bons, ruim], cube, bbox=None, variaveis=("Tair_f_inst",)) == 1
+    assert gldas_cube.abrir_cubo(cube).sizes["time"] == 3
+
+def test_tile_do_nome_inverte_tile_de():
+    for lat, lon in [(-33, 177), (-33, -178), (12.3, -0.1), (0, 0)]:
+        t = gldas_cube.tile_de(lat, lon)
+        assert gldas_cube.tile_do_nome(t.nome) == t
+    assert gldas_cube.tile_do_nome("sa") is None
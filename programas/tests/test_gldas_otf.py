@@ -0,0 +1,30 @@
+# -*- coding: utf-8 -*-
+from gldas_otf import Regiao, cobre_regiao, ler_regioes, restricao_opendap
+from gldas_store import GLDAS_NLON, celula_borda
+
+def _fatia_lon(regiao):
+    ce = restricao_opendap(["Tair_f_inst"], regiao, celula_borda)
+    lon = next(p for p in ce.split(",") if p.startswith("lon["))
+    j0, _, j1 = lon[4:-1].split(":")
+    return int(j0), int(j1)
+
+def test_restricao_opendap_globo_inteiro():
+    ce = restricao_opendap(["Tair_f_inst"], Regiao("g", -60, -180, 90, 180), celula_borda)
+    assert "lon[0:1:1439]" in ce and "lat[0:1:599]" in ce
+
+def test_restricao_opendap_borda_leste_180_nao_da_a_volta():
+    j0, j1 = _fatia_lon(Regiao("tS35E175", -35, 175, -30, 180))
+    assert j1 == GLDAS_NLON - 1 and 0 < j0 < j1
+
+def test_restricao_opendap_borda_oeste_menos_180():
+    j0, j1 = _fatia_lon(Regiao("tS35W180", -35, -180, -30, -175))
+    assert j0 == 0 and j1 < 40
+
+def test_ler_regioes_recusa_antimeridiano_e_fora_da_faixa():
+    assert ler_regioes("pac:-10,170,10,-170;ruim:-10,-200,10,0", "") == []
+    assert [r.nome for r in ler_regioes("sa:-35,-80,10,-30", "")] == ["sa"]
+
+def test_cobre_regiao_arquivo_ilegivel(tmp_path):
+    p = tmp_path / "x.R-sa.nc4"
+    p.write_bytes(b"nada")
+    assert not cobre_regiao(p, Regiao("sa", -35, -80, 10, -30))
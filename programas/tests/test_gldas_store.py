@@ -0,0 +1,24 @@
+# -*- coding: utf-8 -*-
+from datetime import date
+
+import numpy as np
+import pandas as pd
+
+from gldas_store import DAILY_COLS, DailyStore
+
+def test_put_get_so_grava_os_dias_completos(tmp_path):
+    st = DailyStore(tmp_path / "daily.sqlite")
+    dias = [date(2020, 12, 31), date(2021, 1, 1), date(2021, 1, 2)]
+    df = pd.DataFrame({c: [1.5 + k, 2.5 + k, 3.5 + k] for k, c in enumerate(DAILY_COLS)},
+                      index=pd.Index(dias, name="date"))
+    df.loc[dias[1], "rh_mean_pct"] = np.nan
+
+    # o último dia está incompleto (menos de 8 passos) → fica de fora
+    assert st.put(-10.1, -50.1, df, only_dates=dias[:2]) == 2
+    assert st.missing(-10.1, -50.1, dias) == [dias[2]]
+
+    got = st.get(-10.05, -50.05, dias)   # mesma célula 0.25°
+    assert list(got.index) == dias[:2]
+    pd.testing.assert_frame_equal(got, df.loc[dias[:2], list(got.columns)], check_names=False)
+    assert np.isnan(got.loc[dias[1], "rh_mean_pct"])
+    assert st.get(-10.1, -50.1, [dias[2]]).empty